@@ -1,5 +1,23 @@
-from src.ui.gui_app import run_application
+import sys
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # Chế độ chạy file thao tác không cần giao diện: không import giao diện Tk.
+        from src.ui.batch_app import main
+
+        sys.exit(main(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from src.ui.http_server import main
+
+        sys.exit(main(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "serve-async":
+        from src.ui.async_server import main
+
+        sys.exit(main(sys.argv[2:]))
+
+    from src.ui.gui_app import run_application
+
     run_application()
@@ -0,0 +1,90 @@
+from typing import Dict, Iterable, List
+
+from src.core.models import Account, SavingDeposit, Transaction
+
+
+SAVINGS_TOTAL_KEYS = ("active_count", "total_principal", "total_interest", "total_maturity")
+
+
+def create_savings_totals() -> Dict[str, int]:
+    return {key: 0 for key in SAVINGS_TOTAL_KEYS}
+
+
+def add_to_savings_totals(totals: Dict[str, int], saving_deposit: SavingDeposit, sign: int) -> None:
+    """Cộng (sign = 1) hoặc trừ (sign = -1) một sổ đang hoạt động vào bộ số liệu tiết kiệm."""
+    totals["active_count"] += sign
+    totals["total_principal"] += sign * int(saving_deposit.principal_amount)
+    totals["total_interest"] += sign * int(saving_deposit.interest_earned)
+    totals["total_maturity"] += sign * int(saving_deposit.maturity_amount)
+
+
+def count_transaction_types(transactions: Iterable[Transaction]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for transaction in transactions:
+        counts[transaction.transaction_type] = counts.get(transaction.transaction_type, 0) + 1
+    return counts
+
+
+def add_type_counts(counts: Dict[str, int], added_counts: Dict[str, int]) -> None:
+    for transaction_type, count in added_counts.items():
+        counts[transaction_type] = counts.get(transaction_type, 0) + count
+
+
+class BankAggregates:
+    """
+    Số liệu tổng hợp được cập nhật dần trong các hàm nghiệp vụ, để màn hình tổng quan chỉ việc đọc:
+    - total_balance: tổng số dư của mọi tài khoản (tổng tiền khách đang gửi)
+    - savings_totals_by_account / bank_savings_totals: số sổ đang hoạt động, tổng gốc, lãi, tiền khi đáo hạn
+    - transaction_type_counts(_by_account): số giao dịch theo loại. Phần này cần duyệt lịch sử
+      (có thể đang đọc lười) nên chỉ dựng ở lần đọc đầu tiên, sau đó mới cập nhật dần.
+    """
+
+    def __init__(self, accounts: Iterable[Account]):
+        self.total_balance = 0
+        self.savings_totals_by_account: Dict[str, Dict[str, int]] = {}
+        self.bank_savings_totals = create_savings_totals()
+        self.transaction_type_counts = None
+        self.transaction_type_counts_by_account: Dict[str, Dict[str, int]] = {}
+
+        for account in accounts:
+            self.total_balance += int(account.balance)
+
+    def add_active_deposit(self, saving_deposit: SavingDeposit, sign: int) -> None:
+        account_totals = self.savings_totals_by_account.setdefault(saving_deposit.account_id, create_savings_totals())
+        add_to_savings_totals(account_totals, saving_deposit, sign)
+        add_to_savings_totals(self.bank_savings_totals, saving_deposit, sign)
+
+    def add_transaction(self, transaction: Transaction, account_ids: List[str]) -> None:
+        """Đếm thêm một giao dịch vào các bộ đếm đã dựng (bộ đếm chưa dựng sẽ tự tính đủ khi dựng)."""
+        transaction_type = transaction.transaction_type
+        if self.transaction_type_counts is not None:
+            self.transaction_type_counts[transaction_type] = self.transaction_type_counts.get(transaction_type, 0) + 1
+        for account_id in account_ids:
+            counts = self.transaction_type_counts_by_account.get(account_id)
+            if counts is not None:
+                counts[transaction_type] = counts.get(transaction_type, 0) + 1
+
+    def add_transactions(self, transactions: List[Transaction], transactions_by_account: Dict[str, List[Transaction]]) -> None:
+        """Đếm thêm cả khối giao dịch (lô, chi lương): mỗi bộ đếm được cộng một lần theo số đếm của khối."""
+        if self.transaction_type_counts is not None:
+            add_type_counts(self.transaction_type_counts, count_transaction_types(transactions))
+        for account_id, account_transactions in transactions_by_account.items():
+            counts = self.transaction_type_counts_by_account.get(account_id)
+            if counts is not None:
+                add_type_counts(counts, count_transaction_types(account_transactions))
+
+    def to_dictionary(self) -> Dict[str, object]:
+        """Ảnh chụp các số liệu đang có (dùng để so sánh khi kiểm tra)."""
+        return {
+            "total_balance": self.total_balance,
+            "bank_savings_totals": dict(self.bank_savings_totals),
+            "savings_totals_by_account": {
+                account_id: dict(totals)
+                for account_id, totals in self.savings_totals_by_account.items()
+                if totals != create_savings_totals()
+            },
+            "transaction_type_counts": None if self.transaction_type_counts is None else dict(self.transaction_type_counts),
+            "transaction_type_counts_by_account": {
+                account_id: dict(counts) for account_id, counts in self.transaction_type_counts_by_account.items()
+            },
+        }
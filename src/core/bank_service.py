@@ -1,8 +1,51 @@
-from calendar import monthrange
+import gc
+import threading
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple
-
-from src.core.models import Account, SavingDeposit, Transaction, get_current_datetime, get_current_time_text
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.aggregates import BankAggregates, count_transaction_types, create_savings_totals
+from src.core.id_allocator import IdAllocator
+from src.core.interest_engine import group_payouts_by_month, project_savings_book
+from src.core.maturity_scheduler import MaturityScheduler
+from src.core.models import (
+    BATCH_OPERATION_TRANSACTION_TYPES,
+    Account,
+    SavingDeposit,
+    Transaction,
+    add_months_to_timestamp,
+    datetime_to_timestamp,
+    encode_json_text,
+    get_current_datetime,
+    get_current_time_text,
+    get_transaction_time_key,
+    get_transaction_type_code,
+    time_text_to_timestamp,
+    timestamp_to_datetime,
+    timestamp_to_time_text,
+)
+from src.core.search_index import TransactionSearchIndex
+from src.core.transaction_index import TransactionTimeIndex
+from src.core.transaction_query import AccountQueryIndexes, TransactionQuery, get_history_order_key, matches_transaction_query
+
+# Các thao tác được nhận trong BankService.apply_batch và loại giao dịch chúng sinh ra.
+BATCH_OPERATION_TYPES = tuple(BATCH_OPERATION_TRANSACTION_TYPES)
+BATCH_TRANSACTION_TYPES = ("DEPOSIT", "WITHDRAW", "TRANSFER_OUT", "TRANSFER_IN")
+
+
+@contextmanager
+def paused_garbage_collection() -> Iterator[None]:
+    """
+    Tạm tắt bộ thu gom rác vòng (gc) khi tạo hàng chục nghìn đối tượng liền một lúc:
+    các đối tượng này không tạo vòng tham chiếu, nhưng gc vẫn quét lại cả bộ nhớ nhiều lần.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
 
 
 class BankService:
@@ -13,26 +56,93 @@ class BankService:
     - Nạp / Rút / Chuyển khoản
     - Gửi tiết kiệm theo lãi suất
     - Lấy số dư và lịch sử giao dịch
+
+    thread_safe=True: dùng được từ nhiều luồng (ví dụ sau một máy chủ nhiều luồng).
+    - Mỗi tài khoản có một khóa riêng, bảo vệ số dư và các chỉ mục riêng của tài khoản đó
+      (thời gian, tìm kiếm, truy vấn, bộ đếm loại giao dịch). Thao tác trên nhiều tài khoản khóa theo thứ tự
+      số tài khoản để không bị deadlock, nên thao tác trên các tài khoản khác nhau chạy song song.
+    - state_lock chỉ bao đoạn ngắn đụng tới dữ liệu dùng chung: cấp mã, nối vào danh sách giao dịch và journal,
+      số liệu tổng hợp, chỉ mục sổ tiết kiệm. Luôn lấy SAU các khóa tài khoản.
     """
 
-    def __init__(self, bank_data: Dict[str, Any]):
+    def __init__(self, bank_data: Dict[str, Any], thread_safe: bool = False):
         self.bank_data = bank_data
+        self.thread_safe = thread_safe
+        self.state_lock = threading.RLock() if thread_safe else nullcontext()
+        self.account_locks: Dict[str, threading.RLock] = {}
+        self.account_locks_guard = threading.Lock()
+        self.account_id_allocator = IdAllocator(self.bank_data, "next_account_id")
+        self.transaction_id_allocator = IdAllocator(self.bank_data, "next_transaction_number")
+        self.saving_deposit_id_allocator = IdAllocator(self.bank_data, "next_saving_deposit_number")
 
         self.accounts_by_id: Dict[str, Account] = {}
         self.transaction_list: List[Transaction] = []
         self.saving_deposits: List[SavingDeposit] = []
-
+        # Chỉ mục sổ tiết kiệm: theo mã sổ, và theo tài khoản (sổ đang hoạt động / đã tất toán tách riêng,
+        # mỗi nhóm là dict mã sổ -> sổ theo thứ tự mở). Cập nhật trong create_saving_deposit / settle_saving_deposit.
+        self.saving_deposits_by_id: Dict[str, SavingDeposit] = {}
+        self.active_deposits_by_account: Dict[str, Dict[str, SavingDeposit]] = {}
+        self.closed_deposits_by_account: Dict[str, Dict[str, SavingDeposit]] = {}
+
+        # Chỉ mục giao dịch theo tài khoản, mỗi chỉ mục xếp theo thời gian tăng dần (cũ trước, mới sau).
+        # Chế độ đọc lười: bank_data["transactions"] là một nguồn giao dịch (có load_account_transactions)
+        # thay vì danh sách. Khi đó transaction_list chỉ chứa giao dịch phát sinh trong phiên này,
+        # còn lịch sử cũ của một tài khoản chỉ được nạp vào chỉ mục khi cần.
+        self.transaction_source = None
+        self.transactions_by_account: Dict[str, TransactionTimeIndex] = {}
+        # Chỉ mục thời gian của cả ngân hàng (cho báo cáo), chỉ dựng ở lần truy vấn đầu tiên.
+        self.bank_time_index: Optional[TransactionTimeIndex] = None
+        # Chỉ mục tìm kiếm theo từ khóa của từng tài khoản, dựng ở lần tìm đầu tiên rồi cập nhật dần.
+        self.search_indexes_by_account: Dict[str, TransactionSearchIndex] = {}
+        # Chỉ mục theo loại / tài khoản đối ứng / số tiền cho query_transactions, cũng dựng khi cần.
+        self.query_indexes_by_account: Dict[str, AccountQueryIndexes] = {}
+        transactions = self.bank_data.get("transactions", [])
+        if hasattr(transactions, "load_account_transactions"):
+            self.transaction_source = transactions
+            transactions = []
+
+        # Các thay đổi chưa được ghi nối tiếp vào file journal.
+        self.journal_records: List[Dict[str, Any]] = []
+        self.unjournaled_transactions: List[Transaction] = []
+
+        # Dữ liệu có thể là dict (đọc từ JSON / SQLite) hoặc đối tượng model đã dựng sẵn (bộ đọc theo luồng).
         for account_dict in self.bank_data.get("accounts", []):
-            account = Account.from_dictionary(account_dict)
+            account = account_dict if isinstance(account_dict, Account) else Account.from_dictionary(account_dict)
             self.accounts_by_id[account.account_id] = account
 
-        for transaction_dict in self.bank_data.get("transactions", []):
-            transaction = Transaction.from_dictionary(transaction_dict)
+        # Số liệu tổng hợp (tổng số dư, tiết kiệm, số giao dịch theo loại), cập nhật dần trong các hàm nghiệp vụ.
+        self.aggregates = BankAggregates(self.accounts_by_id.values())
+        # Lịch đáo hạn của các sổ đang hoạt động (xem process_matured_deposits).
+        self.maturity_scheduler = MaturityScheduler()
+        # Thời điểm đáo hạn của từng sổ đổi sẵn ra số giây, để kiểm tra đáo hạn không phải đọc lại chuỗi.
+        self.maturity_keys_by_deposit_id: Dict[str, int] = {}
+
+        account_histories: Dict[str, List[Transaction]] = {}
+        for transaction_dict in transactions:
+            transaction = transaction_dict if isinstance(transaction_dict, Transaction) else Transaction.from_dictionary(transaction_dict)
             self.transaction_list.append(transaction)
+            for account_id in self.get_transaction_account_ids(transaction):
+                account_histories.setdefault(account_id, []).append(transaction)
+        for account_id, history in account_histories.items():
+            self.transactions_by_account[account_id] = TransactionTimeIndex(history)
 
         for saving_dict in self.bank_data.get("saving_deposits", []):
-            saving_deposit = SavingDeposit.from_dictionary(saving_dict)
+            saving_deposit = saving_dict if isinstance(saving_dict, SavingDeposit) else SavingDeposit.from_dictionary(saving_dict)
             self.saving_deposits.append(saving_deposit)
+            self.index_saving_deposit(saving_deposit)
+
+        # Không giữ thêm bản sao dữ liệu gốc; build_snapshot_data sẽ dựng lại khi cần.
+        self.bank_data["accounts"] = []
+        self.bank_data["transactions"] = []
+        self.bank_data["saving_deposits"] = []
+
+        # Bộ nhớ đệm chuỗi JSON đã mã hóa của từng đối tượng, dùng lại khi ghi bản chụp.
+        # Chỉ các đối tượng bị đổi (dirty) hoặc giao dịch mới thêm mới phải mã hóa lại.
+        self.account_fragments: Dict[str, str] = {}
+        self.saving_fragments: Dict[str, str] = {}
+        self.transaction_fragments: List[str] = []
+        self.dirty_accounts: Dict[str, Account] = dict(self.accounts_by_id)
+        self.dirty_deposits: Dict[str, SavingDeposit] = {saving.deposit_id: saving for saving in self.saving_deposits}
 
     # -------------------------
     # Các hàm kiểm tra dữ liệu
@@ -64,24 +174,39 @@ class BankService:
     # -------------------------
     # Hàm tiện ích cho tiết kiệm
     # -------------------------
+    def get_current_time_key(self) -> int:
+        """Thời điểm hiện tại dưới dạng số giây (cùng mốc với các timestamp trong models)."""
+        return datetime_to_timestamp(get_current_datetime())
+
+    def get_time_key(self, time_text: str) -> int:
+        """
+        Đổi "YYYY-MM-DD HH:MM:SS" thành số giây bằng bộ đọc định dạng cố định (có bộ nhớ đệm theo ngày),
+        không qua strptime. Sai định dạng thì báo ValueError như strptime.
+        """
+        time_key = time_text_to_timestamp(str(time_text))
+        if time_key is None:
+            raise ValueError(f"Thời gian không đúng định dạng YYYY-MM-DD HH:MM:SS: {time_text}")
+        return time_key
+
     def parse_time_text(self, time_text: str) -> datetime:
-        return datetime.strptime(str(time_text), "%Y-%m-%d %H:%M:%S")
+        return timestamp_to_datetime(self.get_time_key(time_text))
 
     def add_months(self, time_text: str, months: int) -> str:
-        base_time = self.parse_time_text(time_text)
-        total_month = base_time.month - 1 + int(months)
-        target_year = base_time.year + total_month // 12
-        target_month = total_month % 12 + 1
-        target_day = min(base_time.day, monthrange(target_year, target_month)[1])
-        target_time = base_time.replace(year=target_year, month=target_month, day=target_day)
-        return target_time.strftime("%Y-%m-%d %H:%M:%S")
+        return timestamp_to_time_text(add_months_to_timestamp(self.get_time_key(time_text), int(months)))
 
     def calculate_saving_interest(self, principal_amount: int, annual_interest_rate: float, term_months: int) -> int:
         interest_value = int(round(int(principal_amount) * float(annual_interest_rate) * int(term_months) / 1200))
         return max(interest_value, 0)
 
+    def get_maturity_key(self, saving_deposit: SavingDeposit) -> int:
+        """Thời điểm đáo hạn (số giây), đã đổi sẵn khi nạp hoặc mở sổ."""
+        maturity_key = self.maturity_keys_by_deposit_id.get(saving_deposit.deposit_id)
+        if maturity_key is None:
+            maturity_key = self.get_time_key(saving_deposit.maturity_at)
+        return maturity_key
+
     def is_saving_matured(self, saving_deposit: SavingDeposit) -> bool:
-        return get_current_datetime() >= self.parse_time_text(saving_deposit.maturity_at)
+        return self.get_current_time_key() >= self.get_maturity_key(saving_deposit)
 
     def get_saving_settlement_preview(self, saving_deposit: SavingDeposit) -> Dict[str, Any]:
         if self.is_saving_matured(saving_deposit):
@@ -106,29 +231,147 @@ class BankService:
     # Tạo ID
     # -------------------------
     def create_new_account_id(self) -> str:
-        new_id = str(int(self.bank_data["next_account_id"]))
-        self.bank_data["next_account_id"] = int(self.bank_data["next_account_id"]) + 1
-        return new_id
+        return str(self.account_id_allocator.allocate())
 
     def create_new_transaction_id(self) -> str:
-        number = int(self.bank_data["next_transaction_number"])
-        self.bank_data["next_transaction_number"] = number + 1
+        number = self.transaction_id_allocator.allocate()
         return f"TRANSACTION_{number:08d}"
 
     def create_new_saving_deposit_id(self) -> str:
-        number = int(self.bank_data["next_saving_deposit_number"])
-        self.bank_data["next_saving_deposit_number"] = number + 1
+        number = self.saving_deposit_id_allocator.allocate()
         return f"STK_{number:06d}"
 
+    # -------------------------
+    # Khóa cho chế độ nhiều luồng
+    # -------------------------
+    def get_account_lock(self, account_id: str) -> threading.RLock:
+        # RLock: hàm đọc đang giữ khóa tài khoản vẫn gọi được get_account_time_index (cũng khóa tài khoản đó).
+        account_lock = self.account_locks.get(account_id)
+        if account_lock is None:
+            with self.account_locks_guard:
+                account_lock = self.account_locks.setdefault(account_id, threading.RLock())
+        return account_lock
+
+    @contextmanager
+    def lock_accounts(self, account_ids: Iterable[str]) -> Iterator[None]:
+        """
+        Giữ khóa của các tài khoản trong suốt khối with. Luôn khóa theo thứ tự số tài khoản tăng dần,
+        nên hai thao tác chuyển ngược chiều nhau không thể chờ nhau mãi. Không làm gì khi thread_safe=False.
+        """
+        if not self.thread_safe:
+            yield
+            return
+        account_locks = [self.get_account_lock(account_id) for account_id in sorted(set(str(item) for item in account_ids))]
+        for account_lock in account_locks:
+            account_lock.acquire()
+        try:
+            yield
+        finally:
+            for account_lock in reversed(account_locks):
+                account_lock.release()
+
     # -------------------------
     # Đồng bộ dữ liệu để lưu file
     # -------------------------
     def build_snapshot_data(self) -> Dict[str, Any]:
         self.bank_data["accounts"] = [account.to_dictionary() for account in self.accounts_by_id.values()]
-        self.bank_data["transactions"] = [transaction.to_dictionary() for transaction in self.transaction_list]
+        self.bank_data["transactions"] = [transaction.to_dictionary() for transaction in self.get_all_transactions()]
         self.bank_data["saving_deposits"] = [saving.to_dictionary() for saving in self.saving_deposits]
         return self.bank_data
 
+    def build_snapshot_fragments(self) -> Dict[str, Any]:
+        """
+        Dựng bản chụp dưới dạng các chuỗi JSON đã mã hóa sẵn của từng đối tượng.
+        Chỉ mã hóa lại tài khoản / sổ bị đổi và giao dịch mới thêm từ lần chụp trước,
+        các đối tượng không đổi dùng lại chuỗi cũ.
+        Danh sách giao dịch chỉ được thêm vào cuối, nên bản chụp giữ tham chiếu kèm số lượng
+        thay vì sao chép cả danh sách.
+        """
+        with self.state_lock:
+            return self.build_snapshot_fragments_locked()
+
+    def build_snapshot_fragments_locked(self) -> Dict[str, Any]:
+        for account_id, account in self.dirty_accounts.items():
+            self.account_fragments[account_id] = encode_json_text(account.to_dictionary())
+        self.dirty_accounts = {}
+
+        for deposit_id, saving_deposit in self.dirty_deposits.items():
+            self.saving_fragments[deposit_id] = encode_json_text(saving_deposit.to_dictionary())
+        self.dirty_deposits = {}
+
+        for transaction in self.transaction_list[len(self.transaction_fragments):]:
+            self.transaction_fragments.append(encode_json_text(transaction.to_dictionary()))
+
+        return {
+            "header": {
+                "next_account_id": int(self.bank_data["next_account_id"]),
+                "next_transaction_number": int(self.bank_data["next_transaction_number"]),
+                "next_saving_deposit_number": int(self.bank_data["next_saving_deposit_number"]),
+                "journal_seq": int(self.bank_data.get("journal_seq", 0)),
+            },
+            "accounts": list(self.account_fragments.values()),
+            # Chế độ đọc lười: giao dịch cũ do nguồn tự chép sang bản chụp mới, trước các giao dịch trong phiên.
+            "stored_transactions": self.transaction_source,
+            "transactions": self.transaction_fragments,
+            "transaction_count": len(self.transaction_fragments),
+            "saving_deposits": list(self.saving_fragments.values()),
+        }
+
+    # -------------------------
+    # Nhật ký thay đổi (journal)
+    # -------------------------
+    def record_change(
+        self,
+        operation: str,
+        accounts: List[Account],
+        saving_deposits: Optional[List[SavingDeposit]] = None,
+        payroll: Optional[Dict[str, Any]] = None,
+        batch: Optional[Dict[str, Any]] = None,
+    ) -> List[Transaction]:
+        """
+        Ghi lại một thay đổi dưới dạng bản ghi gọn:
+        trạng thái mới của các tài khoản / sổ bị ảnh hưởng và các giao dịch vừa thêm.
+        Khi đọc lại, chỉ cần áp các bản ghi này lên bản chụp (snapshot) gần nhất.
+        payroll: các giao dịch con của một lần chi lương ở dạng rút gọn, nằm sau các giao dịch trong bản ghi
+        (xem pay_payroll và json_storage.get_record_transaction_dicts).
+        batch: tương tự cho các giao dịch của một lô (xem apply_batch).
+        Gọi khi đang giữ state_lock, cùng lần giữ khóa với các add_transaction của thao tác.
+        Trả về các giao dịch vừa ghi, để người gọi cập nhật chỉ mục riêng của tài khoản sau khi nhả state_lock.
+        """
+        journal_seq = int(self.bank_data.get("journal_seq", 0)) + 1
+        self.bank_data["journal_seq"] = journal_seq
+
+        for account in accounts:
+            self.dirty_accounts[account.account_id] = account
+        for saving_deposit in saving_deposits or []:
+            self.dirty_deposits[saving_deposit.deposit_id] = saving_deposit
+
+        record = {
+            "seq": journal_seq,
+            "op": operation,
+            "next_account_id": int(self.bank_data["next_account_id"]),
+            "next_transaction_number": int(self.bank_data["next_transaction_number"]),
+            "next_saving_deposit_number": int(self.bank_data["next_saving_deposit_number"]),
+            "accounts": [account.to_dictionary() for account in accounts],
+            "transactions": [transaction.to_dictionary() for transaction in self.unjournaled_transactions],
+            "saving_deposits": [saving.to_dictionary() for saving in (saving_deposits or [])],
+        }
+        if payroll is not None:
+            record["payroll"] = payroll
+        if batch is not None:
+            record["batch"] = batch
+        transactions = self.unjournaled_transactions
+        self.unjournaled_transactions = []
+        self.journal_records.append(record)
+        return transactions
+
+    def take_journal_records(self) -> List[Dict[str, Any]]:
+        """Lấy ra các bản ghi journal đang chờ lưu (và xóa khỏi hàng đợi)."""
+        with self.state_lock:
+            records = self.journal_records
+            self.journal_records = []
+        return records
+
     # -------------------------
     # API chính
     # -------------------------
@@ -152,17 +395,22 @@ class BankService:
             balance=int(initial_balance),
             created_at=get_current_time_text(),
         )
-        self.accounts_by_id[account_id] = new_account
-
-        if initial_balance > 0:
-            self.add_transaction(
-                transaction_type="DEPOSIT",
-                amount=int(initial_balance),
-                note="Nạp tiền ban đầu",
-                from_account_id=None,
-                to_account_id=account_id,
-            )
-
+        with self.lock_accounts([account_id]):
+            with self.state_lock:
+                self.accounts_by_id[account_id] = new_account
+                self.aggregates.total_balance += int(initial_balance)
+
+                if initial_balance > 0:
+                    self.add_transaction(
+                        transaction_type="DEPOSIT",
+                        amount=int(initial_balance),
+                        note="Nạp tiền ban đầu",
+                        from_account_id=None,
+                        to_account_id=account_id,
+                    )
+
+                transactions = self.record_change("create_account", [new_account])
+            self.index_account_transactions(transactions)
         return True, f"Tạo tài khoản thành công. Số tài khoản: {account_id}", account_id
 
     def authenticate_login(self, account_id: str, pin_code: str) -> Tuple[bool, str]:
@@ -189,17 +437,93 @@ class BankService:
         note: str,
         from_account_id: Optional[str],
         to_account_id: Optional[str],
-    ) -> None:
-        transaction = Transaction(
-            transaction_id=self.create_new_transaction_id(),
-            transaction_type=transaction_type,
-            amount=int(amount),
-            time_text=get_current_time_text(),
-            note=note.strip(),
-            from_account_id=from_account_id,
-            to_account_id=to_account_id,
-        )
-        self.transaction_list.append(transaction)
+    ) -> Transaction:
+        """
+        Cấp mã và nối một giao dịch mới vào phần dữ liệu dùng chung (gọi khi đang giữ state_lock).
+        Chỉ mục riêng của tài khoản được cập nhật sau, bằng index_account_transactions.
+        """
+        # Cấp mã và nối vào danh sách trong cùng một lần giữ khóa, để thứ tự mã khớp thứ tự ghi nhận.
+        with self.state_lock:
+            transaction = Transaction(
+                transaction_id=self.create_new_transaction_id(),
+                transaction_type=transaction_type,
+                amount=int(amount),
+                time_text=get_current_time_text(),
+                note=note.strip(),
+                from_account_id=from_account_id,
+                to_account_id=to_account_id,
+            )
+            self.append_transaction(transaction)
+        return transaction
+
+    def append_transaction(self, transaction: Transaction) -> None:
+        """Nối một giao dịch đã có mã vào danh sách, journal, số liệu tổng hợp và chỉ mục của cả ngân hàng."""
+        with self.state_lock:
+            self.transaction_list.append(transaction)
+            self.unjournaled_transactions.append(transaction)
+            self.count_transaction(transaction, self.get_transaction_account_ids(transaction))
+
+    def count_transaction(self, transaction: Transaction, account_ids: List[str]) -> None:
+        """Phần dùng chung của một giao dịch vừa nối: số liệu tổng hợp và chỉ mục thời gian của cả ngân hàng (gọi khi đang giữ state_lock)."""
+        self.aggregates.add_transaction(transaction, account_ids)
+        if self.bank_time_index is not None:
+            self.bank_time_index.add(transaction)
+
+    def append_transaction_block(self, transactions: List[Transaction]) -> Dict[str, List[Transaction]]:
+        """
+        Nối cả khối giao dịch mà journal ghi ở dạng rút gọn (lô, giao dịch con của lần chi lương) nên không vào
+        unjournaled_transactions: nối danh sách một lần, số liệu tổng hợp cộng một lần cho mỗi tài khoản (gọi khi đang giữ state_lock).
+        Trả về giao dịch nhóm theo tài khoản, để index_transaction_groups cập nhật chỉ mục riêng sau khi nhả state_lock.
+        """
+        transactions_by_account: Dict[str, List[Transaction]] = {}
+        for transaction in transactions:
+            for account_id in self.get_transaction_account_ids(transaction):
+                transactions_by_account.setdefault(account_id, []).append(transaction)
+        self.transaction_list.extend(transactions)
+        self.aggregates.add_transactions(transactions, transactions_by_account)
+        if self.bank_time_index is not None:
+            self.bank_time_index.extend(transactions)
+        return transactions_by_account
+
+    def index_transaction_groups(self, transactions_by_account: Dict[str, List[Transaction]]) -> None:
+        """Như index_transaction nhưng cho cả khối: mỗi chỉ mục của một tài khoản được cập nhật một lần (gọi khi đang giữ khóa các tài khoản đó)."""
+        for account_id, transactions in transactions_by_account.items():
+            time_index = self.transactions_by_account.get(account_id)
+            if time_index is None:
+                if self.transaction_source is not None:
+                    continue
+                time_index = TransactionTimeIndex()
+                self.transactions_by_account[account_id] = time_index
+            time_index.extend(transactions)
+            search_index = self.search_indexes_by_account.get(account_id)
+            if search_index is not None:
+                search_index.extend(transactions)
+            query_indexes = self.query_indexes_by_account.get(account_id)
+            if query_indexes is not None:
+                query_indexes.extend(transactions)
+
+    def index_account_transactions(self, transactions: List[Transaction]) -> None:
+        """Đưa các giao dịch vừa ghi vào chỉ mục riêng của từng tài khoản liên quan (gọi khi đang giữ khóa các tài khoản đó)."""
+        for transaction in transactions:
+            self.index_transaction(transaction, self.get_transaction_account_ids(transaction))
+
+    def index_transaction(self, transaction: Transaction, account_ids: List[str]) -> None:
+        """Cập nhật các chỉ mục đã dựng của từng tài khoản (gọi khi đang giữ khóa các tài khoản đó, không cần state_lock)."""
+        for account_id in account_ids:
+            time_index = self.transactions_by_account.get(account_id)
+            if time_index is None:
+                if self.transaction_source is not None:
+                    # Chế độ đọc lười: lịch sử chưa nạp, khi nạp sẽ lấy cả giao dịch này từ transaction_list.
+                    continue
+                time_index = TransactionTimeIndex()
+                self.transactions_by_account[account_id] = time_index
+            time_index.add(transaction)
+            search_index = self.search_indexes_by_account.get(account_id)
+            if search_index is not None:
+                search_index.add(transaction)
+            query_indexes = self.query_indexes_by_account.get(account_id)
+            if query_indexes is not None:
+                query_indexes.add(transaction)
 
     def deposit_money(self, account_id: str, amount: int, note: str) -> Tuple[bool, str]:
         account = self.get_account(account_id)
@@ -209,15 +533,19 @@ class BankService:
         if not self.is_amount_valid(amount):
             return False, "Số tiền nạp phải là số nguyên dương."
 
-        account.balance = account.balance + int(amount)
-
-        self.add_transaction(
-            transaction_type="DEPOSIT",
-            amount=int(amount),
-            note=note,
-            from_account_id=None,
-            to_account_id=account.account_id,
-        )
+        with self.lock_accounts([account.account_id]):
+            self.adjust_balance(account, int(amount))
+
+            with self.state_lock:
+                self.add_transaction(
+                    transaction_type="DEPOSIT",
+                    amount=int(amount),
+                    note=note,
+                    from_account_id=None,
+                    to_account_id=account.account_id,
+                )
+                transactions = self.record_change("deposit_money", [account])
+            self.index_account_transactions(transactions)
         return True, "Nạp tiền thành công."
 
     def withdraw_money(self, account_id: str, amount: int, note: str) -> Tuple[bool, str]:
@@ -228,18 +556,23 @@ class BankService:
         if not self.is_amount_valid(amount):
             return False, "Số tiền rút phải là số nguyên dương."
 
-        if int(amount) > account.balance:
-            return False, "Không đủ số dư để rút."
-
-        account.balance = account.balance - int(amount)
-
-        self.add_transaction(
-            transaction_type="WITHDRAW",
-            amount=int(amount),
-            note=note,
-            from_account_id=account.account_id,
-            to_account_id=None,
-        )
+        with self.lock_accounts([account.account_id]):
+            # Kiểm tra số dư và trừ tiền trong cùng một lần giữ khóa tài khoản.
+            if int(amount) > account.balance:
+                return False, "Không đủ số dư để rút."
+
+            self.adjust_balance(account, -int(amount))
+
+            with self.state_lock:
+                self.add_transaction(
+                    transaction_type="WITHDRAW",
+                    amount=int(amount),
+                    note=note,
+                    from_account_id=account.account_id,
+                    to_account_id=None,
+                )
+                transactions = self.record_change("withdraw_money", [account])
+            self.index_account_transactions(transactions)
         return True, "Rút tiền thành công."
 
     def transfer_money(self, from_account_id: str, to_account_id: str, amount: int, note: str) -> Tuple[bool, str]:
@@ -257,28 +590,32 @@ class BankService:
         if not self.is_amount_valid(amount):
             return False, "Số tiền chuyển phải là số nguyên dương."
 
-        if int(amount) > from_account.balance:
-            return False, "Không đủ số dư để chuyển."
-
         money = int(amount)
-        from_account.balance = from_account.balance - money
-        to_account.balance = to_account.balance + money
-
-        self.add_transaction(
-            transaction_type="TRANSFER_OUT",
-            amount=money,
-            note=note,
-            from_account_id=from_account.account_id,
-            to_account_id=to_account.account_id,
-        )
-        self.add_transaction(
-            transaction_type="TRANSFER_IN",
-            amount=money,
-            note=note,
-            from_account_id=from_account.account_id,
-            to_account_id=to_account.account_id,
-        )
-
+        with self.lock_accounts([from_account.account_id, to_account.account_id]):
+            if money > from_account.balance:
+                return False, "Không đủ số dư để chuyển."
+
+            self.adjust_balance(from_account, -money)
+            self.adjust_balance(to_account, money)
+
+            with self.state_lock:
+                self.add_transaction(
+                    transaction_type="TRANSFER_OUT",
+                    amount=money,
+                    note=note,
+                    from_account_id=from_account.account_id,
+                    to_account_id=to_account.account_id,
+                )
+                self.add_transaction(
+                    transaction_type="TRANSFER_IN",
+                    amount=money,
+                    note=note,
+                    from_account_id=from_account.account_id,
+                    to_account_id=to_account.account_id,
+                )
+
+                transactions = self.record_change("transfer_money", [from_account, to_account])
+            self.index_account_transactions(transactions)
         return True, "Chuyển khoản thành công."
 
     def create_saving_deposit(
@@ -302,20 +639,76 @@ class BankService:
         if not self.is_term_months_valid(term_months):
             return False, "Kỳ hạn phải là số nguyên dương theo tháng.", None
 
-        if int(principal_amount) > account.balance:
-            return False, "Không đủ số dư để mở sổ tiết kiệm.", None
-
-        opened_at = get_current_time_text()
+        with self.lock_accounts([account.account_id]):
+            if int(principal_amount) > account.balance:
+                return False, "Không đủ số dư để mở sổ tiết kiệm.", None
+
+            with self.state_lock:
+                saving_deposit = self.open_saving_deposit(account, int(principal_amount), float(annual_interest_rate), int(term_months), note)
+                transactions = self.record_change("create_saving_deposit", [account], [saving_deposit])
+            self.index_account_transactions(transactions)
+        return True, f"Mở sổ tiết kiệm thành công: {saving_deposit.deposit_id}", saving_deposit.deposit_id
+
+    def adjust_balance(self, account: Account, amount: int) -> None:
+        """
+        Cộng (hoặc trừ khi amount âm) vào số dư tài khoản, đồng thời cập nhật tổng số dư của ngân hàng.
+        Số dư chỉ cần khóa của tài khoản (người gọi đang giữ); state_lock chỉ bao phép cộng vào tổng.
+        """
+        account.balance = int(account.balance) + int(amount)
+        with self.state_lock:
+            self.aggregates.total_balance += int(amount)
+
+    def is_saving_deposit_active(self, saving_deposit: SavingDeposit) -> bool:
+        return str(saving_deposit.status).upper() == "ACTIVE"
+
+    def index_saving_deposit(self, saving_deposit: SavingDeposit) -> None:
+        """Đưa một sổ vào chỉ mục theo mã sổ và vào nhóm đang hoạt động / đã tất toán của tài khoản."""
+        self.saving_deposits_by_id[saving_deposit.deposit_id] = saving_deposit
+        maturity_key = time_text_to_timestamp(str(saving_deposit.maturity_at))
+        if maturity_key is not None:
+            self.maturity_keys_by_deposit_id[saving_deposit.deposit_id] = maturity_key
+        if self.is_saving_deposit_active(saving_deposit):
+            group = self.active_deposits_by_account
+        else:
+            group = self.closed_deposits_by_account
+        group.setdefault(saving_deposit.account_id, {})[saving_deposit.deposit_id] = saving_deposit
+        if group is self.active_deposits_by_account:
+            self.aggregates.add_active_deposit(saving_deposit, 1)
+            # Sổ có ngày đáo hạn sai định dạng (dữ liệu cũ) không được xếp lịch.
+            if maturity_key is not None:
+                self.maturity_scheduler.add(saving_deposit.deposit_id, maturity_key)
+
+    def mark_saving_deposit_closed(self, saving_deposit: SavingDeposit) -> None:
+        """Chuyển sổ từ nhóm đang hoạt động sang nhóm đã tất toán của tài khoản."""
+        active_deposits = self.active_deposits_by_account.get(saving_deposit.account_id, {})
+        if active_deposits.pop(saving_deposit.deposit_id, None) is not None:
+            self.aggregates.add_active_deposit(saving_deposit, -1)
+        if len(active_deposits) == 0:
+            self.active_deposits_by_account.pop(saving_deposit.account_id, None)
+        self.closed_deposits_by_account.setdefault(saving_deposit.account_id, {})[saving_deposit.deposit_id] = saving_deposit
+
+    def open_saving_deposit(
+        self,
+        account: Account,
+        principal_amount: int,
+        annual_interest_rate: float,
+        term_months: int,
+        note: str,
+        opened_at: Optional[str] = None,
+    ) -> SavingDeposit:
+        """Trừ tiền và mở sổ (đã kiểm tra hợp lệ, chưa ghi journal). opened_at mặc định là lúc này."""
+        if opened_at is None:
+            opened_at = get_current_time_text()
         maturity_at = self.add_months(opened_at, int(term_months))
         interest_earned = self.calculate_saving_interest(principal_amount, annual_interest_rate, term_months)
         maturity_amount = int(principal_amount) + int(interest_earned)
         deposit_id = self.create_new_saving_deposit_id()
 
-        account.balance = int(account.balance) - int(principal_amount)
+        self.adjust_balance(account, -int(principal_amount))
 
         saving_deposit = SavingDeposit(
             deposit_id=deposit_id,
-            account_id=str(account_id),
+            account_id=account.account_id,
             principal_amount=int(principal_amount),
             annual_interest_rate=float(annual_interest_rate),
             term_months=int(term_months),
@@ -328,6 +721,7 @@ class BankService:
             maturity_amount=int(maturity_amount),
         )
         self.saving_deposits.append(saving_deposit)
+        self.index_saving_deposit(saving_deposit)
 
         open_note = note.strip()
         if open_note == "":
@@ -342,43 +736,34 @@ class BankService:
             from_account_id=account.account_id,
             to_account_id=None,
         )
-        return True, f"Mở sổ tiết kiệm thành công: {deposit_id}", deposit_id
+        return saving_deposit
 
     def get_saving_deposit(self, account_id: str, deposit_id: str) -> Optional[SavingDeposit]:
-        for saving_deposit in self.saving_deposits:
-            if saving_deposit.account_id == str(account_id) and saving_deposit.deposit_id == str(deposit_id):
-                return saving_deposit
-        return None
+        saving_deposit = self.saving_deposits_by_id.get(str(deposit_id))
+        if saving_deposit is None or saving_deposit.account_id != str(account_id):
+            return None
+        return saving_deposit
 
     def get_saving_deposits(self, account_id: str, only_active: bool = False) -> List[SavingDeposit]:
-        result = []
-        for saving_deposit in self.saving_deposits:
-            if saving_deposit.account_id != str(account_id):
-                continue
-            if only_active and str(saving_deposit.status).upper() != "ACTIVE":
-                continue
-            result.append(saving_deposit)
+        """Các sổ của một tài khoản, mở gần nhất trước. Chỉ đọc sổ của chính tài khoản đó."""
+        result = list(self.active_deposits_by_account.get(str(account_id), {}).values())
+        if not only_active:
+            result.extend(self.closed_deposits_by_account.get(str(account_id), {}).values())
+        # Sổ mở cùng thời điểm giữ thứ tự theo mã sổ (thứ tự mở), như khi còn duyệt danh sách chung.
+        result.sort(key=lambda item: item.deposit_id)
         result.sort(key=lambda item: item.opened_at, reverse=True)
         return result
 
-    def settle_saving_deposit(self, account_id: str, deposit_id: str) -> Tuple[bool, str]:
-        account = self.get_account(account_id)
-        if account is None:
-            return False, "Không tồn tại số tài khoản."
-
-        saving_deposit = self.get_saving_deposit(account_id, deposit_id)
-        if saving_deposit is None:
-            return False, "Không tìm thấy sổ tiết kiệm."
-
-        if str(saving_deposit.status).upper() != "ACTIVE":
-            return False, "Sổ tiết kiệm này đã được tất toán trước đó."
-
+    def close_saving_deposit(self, account: Account, saving_deposit: SavingDeposit) -> str:
+        """Tất toán sổ đang hoạt động vào tài khoản (chưa ghi journal). Trả về ON_TIME hoặc EARLY."""
         preview = self.get_saving_settlement_preview(saving_deposit)
         payout_amount = int(preview["payout_amount"])
         interest_earned = int(preview["interest_earned"])
         settlement_type = str(preview["settlement_type"])
 
-        account.balance = int(account.balance) + payout_amount
+        self.adjust_balance(account, payout_amount)
+        # Rời nhóm đang hoạt động trước khi sửa tiền lãi / tiền nhận, để số liệu tổng hợp trừ đúng giá trị cũ.
+        self.mark_saving_deposit_closed(saving_deposit)
         saving_deposit.status = "CLOSED"
         saving_deposit.settled_at = get_current_time_text()
         saving_deposit.interest_earned = interest_earned
@@ -399,30 +784,672 @@ class BankService:
             from_account_id=None,
             to_account_id=account.account_id,
         )
+        return settlement_type
+
+    def settle_saving_deposit(self, account_id: str, deposit_id: str) -> Tuple[bool, str]:
+        account = self.get_account(account_id)
+        if account is None:
+            return False, "Không tồn tại số tài khoản."
+
+        saving_deposit = self.get_saving_deposit(account_id, deposit_id)
+        if saving_deposit is None:
+            return False, "Không tìm thấy sổ tiết kiệm."
+
+        with self.lock_accounts([account.account_id]):
+            if str(saving_deposit.status).upper() != "ACTIVE":
+                return False, "Sổ tiết kiệm này đã được tất toán trước đó."
+
+            with self.state_lock:
+                settlement_type = self.close_saving_deposit(account, saving_deposit)
+                transactions = self.record_change("settle_saving_deposit", [account], [saving_deposit])
+            self.index_account_transactions(transactions)
 
         if settlement_type == "ON_TIME":
             return True, "Tất toán sổ tiết kiệm thành công. Bạn đã nhận cả gốc và lãi."
         return True, "Tất toán trước hạn thành công. Bạn chỉ nhận lại tiền gốc."
 
+    def process_matured_deposits(self, rollover: bool = False) -> Tuple[bool, str, List[str]]:
+        """
+        Xử lý cuối kỳ: lấy từ lịch đáo hạn mọi sổ đã đến hạn và tất toán đúng hạn vào tài khoản,
+        hoặc (rollover=True) tái tục: tất toán rồi mở sổ mới cùng kỳ hạn, lãi suất với gốc là tiền nhận được,
+        tính từ ngày đáo hạn cũ. Cả đợt chỉ ghi một bản ghi journal. Trả về (thành công, thông báo, mã các sổ đã xử lý).
+        """
+        now_key = self.get_current_time_key()
+        changed_accounts: Dict[str, Account] = {}
+        changed_deposits: List[SavingDeposit] = []
+        processed_ids: List[str] = []
+
+        with self.state_lock:
+            due_ids = self.maturity_scheduler.pop_due(now_key)
+            locked_account_ids = set()
+            for deposit_id in due_ids:
+                saving_deposit = self.saving_deposits_by_id.get(deposit_id)
+                if saving_deposit is not None:
+                    locked_account_ids.add(str(saving_deposit.account_id))
+
+        with self.lock_accounts(locked_account_ids):
+            with self.state_lock:
+                # Sổ tái tục có thể đã đến hạn luôn (lâu ngày không chạy), nên lặp tới khi lịch không còn sổ đến hạn.
+                while len(due_ids) > 0:
+                    skipped_deposits: List[SavingDeposit] = []
+                    for deposit_id in due_ids:
+                        saving_deposit = self.saving_deposits_by_id.get(deposit_id)
+                        if saving_deposit is None or not self.is_saving_deposit_active(saving_deposit):
+                            # Sổ đã được tất toán tay trước đó.
+                            continue
+                        if self.thread_safe and str(saving_deposit.account_id) not in locked_account_ids:
+                            # Sổ vừa được mở ở luồng khác sau lúc khóa: để lại cho lần quét sau.
+                            skipped_deposits.append(saving_deposit)
+                            continue
+                        account = self.get_account(saving_deposit.account_id)
+                        if account is None:
+                            continue
+
+                        self.close_saving_deposit(account, saving_deposit)
+                        changed_accounts[account.account_id] = account
+                        changed_deposits.append(saving_deposit)
+                        processed_ids.append(deposit_id)
+
+                        if rollover:
+                            new_deposit = self.open_saving_deposit(
+                                account,
+                                int(saving_deposit.maturity_amount),
+                                float(saving_deposit.annual_interest_rate),
+                                int(saving_deposit.term_months),
+                                f"Tái tục {saving_deposit.deposit_id}",
+                                opened_at=saving_deposit.maturity_at,
+                            )
+                            changed_deposits.append(new_deposit)
+                    due_ids = self.maturity_scheduler.pop_due(now_key)
+                    for saving_deposit in skipped_deposits:
+                        self.maturity_scheduler.add(saving_deposit.deposit_id, self.get_maturity_key(saving_deposit))
+
+                if len(processed_ids) == 0:
+                    return True, "Không có sổ tiết kiệm đến hạn.", []
+
+                transactions = self.record_change("process_matured_deposits", list(changed_accounts.values()), changed_deposits)
+            self.index_account_transactions(transactions)
+        action_text = "tái tục" if rollover else "tất toán"
+        return True, f"Đã {action_text} {len(processed_ids)} sổ tiết kiệm đến hạn.", processed_ids
+
     def get_savings_summary(self, account_id: str) -> Dict[str, int]:
-        active_deposits = self.get_saving_deposits(account_id, only_active=True)
-        total_principal = sum(int(item.principal_amount) for item in active_deposits)
-        total_interest = sum(int(item.interest_earned) for item in active_deposits)
-        total_maturity = sum(int(item.maturity_amount) for item in active_deposits)
-        return {
-            "active_count": len(active_deposits),
-            "total_principal": total_principal,
-            "total_interest": total_interest,
-            "total_maturity": total_maturity,
-        }
+        """Số sổ đang hoạt động và tổng gốc / lãi / tiền đáo hạn của tài khoản (đọc từ số liệu tổng hợp)."""
+        totals = self.aggregates.savings_totals_by_account.get(str(account_id))
+        return dict(totals) if totals is not None else create_savings_totals()
+
+    def get_savings_projection(self, annual_interest_rate: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Báo cáo cho toàn bộ sổ đang hoạt động, tính theo loạt (xem interest_engine): tiền lãi phải trả,
+        tổng tiền đáo hạn và tiền phải trả theo từng tháng đáo hạn. annual_interest_rate để thử một lãi suất khác.
+        """
+        active_deposits = [
+            saving_deposit
+            for account_deposits in self.active_deposits_by_account.values()
+            for saving_deposit in account_deposits.values()
+        ]
+        projection = project_savings_book(active_deposits, annual_interest_rate)
+        projection["payouts_by_month"] = group_payouts_by_month(projection["maturity_keys"], projection["payouts"])
+        return projection
+
+    def get_transaction_count(self) -> int:
+        """Tổng số giao dịch của ngân hàng (không cần nạp lịch sử khi đang ở chế độ đọc lười)."""
+        if self.transaction_source is None:
+            return len(self.transaction_list)
+        return self.transaction_source.count() + len(self.transaction_list)
+
+    def get_all_transactions(self) -> List[Transaction]:
+        """Toàn bộ giao dịch theo thứ tự ghi nhận. Ở chế độ đọc lười, việc này phải nạp cả lịch sử từ nguồn."""
+        if self.transaction_source is None:
+            return self.transaction_list
+        return self.transaction_source.load_all_transactions() + self.transaction_list
+
+    # -------------------------
+    # Thao tác theo lô
+    # -------------------------
+    def prepare_batch_operation(self, operation: Dict[str, Any]) -> Tuple[bool, str, Optional[Tuple[Any, ...]]]:
+        """
+        Kiểm tra một thao tác trong lô (chưa xét số dư). Thao tác là dict:
+        {"op": "deposit" | "withdraw" | "transfer", "account_id": ..., "to_account_id": ... (chỉ với transfer),
+        "amount": ..., "note": ...}.
+        Trả về (hợp lệ, thông báo, (loại, tài khoản bị trừ, tài khoản được cộng, số tiền, ghi chú)).
+        """
+        if not isinstance(operation, dict):
+            return False, "Thao tác phải là một đối tượng JSON.", None
+        operation_type = str(operation.get("op", "")).strip().lower()
+        if operation_type not in BATCH_OPERATION_TYPES:
+            return False, f"Loại thao tác không hợp lệ: {operation_type or '(trống)'}.", None
+
+        account = self.get_account(str(operation.get("account_id", "")))
+        if account is None:
+            return False, "Không tồn tại số tài khoản.", None
+
+        amount = operation.get("amount")
+        if not self.is_amount_valid(amount):
+            return False, "Số tiền phải là số nguyên dương.", None
+        note = str(operation.get("note", "")).strip()
+
+        if operation_type == "deposit":
+            return True, "Hợp lệ.", (operation_type, None, account, amount, note)
+        if operation_type == "withdraw":
+            return True, "Hợp lệ.", (operation_type, account, None, amount, note)
+
+        to_account = self.get_account(str(operation.get("to_account_id", "")))
+        if to_account is None:
+            return False, "Tài khoản nhận không tồn tại.", None
+        if to_account.account_id == account.account_id:
+            return False, "Không thể chuyển khoản cho chính mình.", None
+        return True, "Hợp lệ.", (operation_type, account, to_account, amount, note)
+
+    def apply_batch(self, operations: List[Dict[str, Any]]) -> Tuple[bool, str, List[Dict[str, Any]]]:
+        """
+        Thực hiện cả lô nạp / rút / chuyển khoản theo kiểu tất cả hoặc không gì cả:
+        - Kiểm tra mọi thao tác trước (số dư được tính lần lượt theo thứ tự trong lô).
+        - Có thao tác lỗi thì không thay đổi gì; kết quả từng dòng cho biết dòng nào lỗi và vì sao.
+        - Hợp lệ hết thì giữ trước một khối mã giao dịch, mọi giao dịch dùng chung một thời điểm,
+          cập nhật số dư, số liệu và chỉ mục mỗi tài khoản một lần, và chỉ ghi một bản ghi journal rút gọn
+          (người gọi lưu một lần).
+        Trả về (thành công, thông báo, [{"index", "ok", "message"}, ...]).
+        """
+        results: List[Dict[str, Any]] = []
+        prepared_items = []
+        for index, operation in enumerate(operations):
+            ok, message, prepared_item = self.prepare_batch_operation(operation)
+            results.append({"index": index, "ok": ok, "message": message})
+            prepared_items.append(prepared_item)
+
+        if len(prepared_items) == 0:
+            return True, "Lô không có thao tác nào.", results
+        if any(not result["ok"] for result in results):
+            return self.reject_batch(results)
+
+        account_ids = set()
+        for _, source, target, _, _ in prepared_items:
+            if source is not None:
+                account_ids.add(source.account_id)
+            if target is not None:
+                account_ids.add(target.account_id)
+
+        with self.lock_accounts(account_ids):
+            # Số dư tạm theo từng bước của lô, chưa đụng tới tài khoản thật.
+            balances: Dict[str, int] = {}
+            for index, (_, source, target, amount, _) in enumerate(prepared_items):
+                if source is not None:
+                    balance = balances.get(source.account_id, source.balance)
+                    if amount > balance:
+                        results[index]["ok"] = False
+                        results[index]["message"] = "Không đủ số dư."
+                        continue
+                    balances[source.account_id] = balance - amount
+                if target is not None:
+                    balances[target.account_id] = balances.get(target.account_id, target.balance) + amount
+            if any(not result["ok"] for result in results):
+                return self.reject_batch(results)
+
+            with paused_garbage_collection():
+                changed_accounts = []
+                for account_id, balance in balances.items():
+                    account = self.accounts_by_id[account_id]
+                    self.adjust_balance(account, balance - account.balance)
+                    changed_accounts.append(account)
+                with self.state_lock:
+                    transactions_by_account, batch = self.write_batch_transactions(prepared_items)
+                    self.record_change("apply_batch", changed_accounts, batch=batch)
+                self.index_transaction_groups(transactions_by_account)
+
+        for result in results:
+            result["message"] = "Thành công."
+        return True, f"Đã thực hiện {len(results)} thao tác.", results
+
+    def reject_batch(self, results: List[Dict[str, Any]]) -> Tuple[bool, str, List[Dict[str, Any]]]:
+        failed_count = 0
+        for result in results:
+            if result["ok"]:
+                result["ok"] = False
+                result["message"] = "Chưa thực hiện vì lô có thao tác lỗi."
+            else:
+                failed_count += 1
+        return False, f"Lô có {failed_count} thao tác lỗi, không thao tác nào được thực hiện.", results
+
+    def write_batch_transactions(self, prepared_items: List[Tuple[Any, ...]]) -> Tuple[Dict[str, List[Transaction]], Dict[str, Any]]:
+        """
+        Ghi giao dịch của cả lô với một khối mã liên tiếp và chung một thời điểm (gọi khi đang giữ state_lock).
+        Trả về (giao dịch nhóm theo tài khoản, phần "batch" của bản ghi journal):
+        mỗi thao tác là [loại, tài khoản bị trừ, tài khoản được cộng, số tiền, ghi chú], chuyển khoản tách thành
+        TRANSFER_OUT rồi TRANSFER_IN (xem json_storage.get_record_transaction_dicts).
+        """
+        transaction_count = sum(2 if item[0] == "transfer" else 1 for item in prepared_items)
+        number = self.transaction_id_allocator.allocate(transaction_count)
+        time_text = get_current_time_text()
+        timestamp = time_text_to_timestamp(time_text)
+        type_codes = {transaction_type: get_transaction_type_code(transaction_type) for transaction_type in BATCH_TRANSACTION_TYPES}
+        batch = {"first_number": number, "time_text": time_text, "items": []}
+
+        transactions = []
+        for operation_type, source, target, amount, note in prepared_items:
+            from_account_id = source.account_id if source is not None else None
+            to_account_id = target.account_id if target is not None else None
+            for transaction_type in BATCH_OPERATION_TRANSACTION_TYPES[operation_type]:
+                transactions.append(Transaction.from_parts(
+                    number, type_codes[transaction_type], amount, timestamp, note, from_account_id, to_account_id
+                ))
+                number += 1
+            batch["items"].append([operation_type, from_account_id, to_account_id, amount, note])
+        return self.append_transaction_block(transactions), batch
+
+    # -------------------------
+    # Chi lương cho nhiều người nhận
+    # -------------------------
+    def pay_payroll(
+        self,
+        from_account_id: str,
+        payments: List[Tuple[str, int]],
+        note: str,
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        Chi lương từ một tài khoản cho nhiều người nhận, payments là danh sách (số tài khoản nhận, số tiền):
+        - Kiểm tra tổng tiền với số dư một lần và trừ một lần (giao dịch cha PAYROLL_OUT).
+        - Cộng cho từng người nhận trong một lượt duyệt, mỗi người một giao dịch con PAYROLL_IN gọn:
+          không ghi tài khoản chi, ghi chú là mã giao dịch cha (thông tin đầy đủ nằm ở giao dịch cha).
+        - Journal chỉ ghi các giao dịch con dưới dạng [số tài khoản, số tiền].
+        Trả về (thành công, thông báo, mã giao dịch cha).
+        """
+        from_account = self.get_account(from_account_id)
+        if from_account is None:
+            return False, "Tài khoản chi không tồn tại.", None
+        if len(payments) == 0:
+            return False, "Danh sách chi lương trống.", None
+
+        # Cả lượt tạo hàng chục nghìn đối tượng, gc chạy giữa chừng còn tốn hơn chính việc cộng tiền.
+        with paused_garbage_collection():
+            recipients: List[Tuple[Account, int]] = []
+            total_amount = 0
+            for index, (to_account_id, amount) in enumerate(payments):
+                to_account = self.get_account(to_account_id)
+                if to_account is None:
+                    return False, f"Dòng {index + 1}: tài khoản nhận {to_account_id} không tồn tại.", None
+                if to_account is from_account:
+                    return False, f"Dòng {index + 1}: không thể chi lương cho chính tài khoản chi.", None
+                if not self.is_amount_valid(amount):
+                    return False, f"Dòng {index + 1}: số tiền phải là số nguyên dương.", None
+                recipients.append((to_account, amount))
+                total_amount += amount
+
+            account_ids = [from_account.account_id] + [to_account.account_id for to_account, _ in recipients]
+            with self.lock_accounts(account_ids):
+                if total_amount > from_account.balance:
+                    return False, "Không đủ số dư để chi lương.", None
+
+                # Số dư chỉ cần khóa tài khoản; tổng số dư ngân hàng không đổi (trừ bên chi bao nhiêu, cộng bên nhận bấy nhiêu).
+                from_account.balance -= total_amount
+                changed_accounts = {from_account.account_id: from_account}
+                items = []
+                for to_account, amount in recipients:
+                    to_account.balance += amount
+                    changed_accounts[to_account.account_id] = to_account
+                    items.append([to_account.account_id, amount])
+
+                with self.state_lock:
+                    number = self.transaction_id_allocator.allocate(len(recipients) + 1)
+                    time_text = get_current_time_text()
+                    timestamp = time_text_to_timestamp(time_text)
+                    parent = Transaction.from_parts(
+                        number, get_transaction_type_code("PAYROLL_OUT"), total_amount, timestamp, note.strip(),
+                        from_account.account_id, None,
+                    )
+                    self.append_transaction(parent)
+
+                    # Giao dịch con không vào unjournaled_transactions: journal ghi chúng ở dạng rút gọn trong payroll.
+                    parent_id = parent.transaction_id
+                    child_type_code = get_transaction_type_code("PAYROLL_IN")
+                    children = [
+                        Transaction.from_parts(number + offset, child_type_code, amount, timestamp, parent_id, None, to_account.account_id)
+                        for offset, (to_account, amount) in enumerate(recipients, start=1)
+                    ]
+                    children_by_account = self.append_transaction_block(children)
+
+                    payroll = {"parent_id": parent_id, "first_number": number + 1, "time_text": time_text, "items": items}
+                    transactions = self.record_change("pay_payroll", list(changed_accounts.values()), payroll=payroll)
+
+                self.index_account_transactions(transactions)
+                self.index_transaction_groups(children_by_account)
+
+        return True, f"Đã chi lương cho {len(recipients)} người nhận.", parent_id
+
+    # -------------------------
+    # Chỉ mục giao dịch theo tài khoản
+    # -------------------------
+    def get_transaction_account_ids(self, transaction: Transaction) -> List[str]:
+        """Các tài khoản có giao dịch này trong lịch sử (bên chuyển và bên nhận, không lặp)."""
+        account_ids = []
+        for account_id in [transaction.from_account_id, transaction.to_account_id]:
+            if account_id is not None and str(account_id) not in account_ids:
+                account_ids.append(str(account_id))
+        return account_ids
+
+    def get_account_time_index(self, account_id: str) -> TransactionTimeIndex:
+        """
+        Chỉ mục thời gian của một tài khoản (dùng nội bộ, không được sửa trực tiếp).
+        Chế độ đọc lười: lần đầu hỏi tới thì nạp từ nguồn, cộng các giao dịch mới trong phiên.
+        Việc nạp chỉ giữ khóa của tài khoản này: không giao dịch nào của nó được thêm giữa lúc nạp và lúc đưa vào chỉ mục,
+        còn thao tác trên tài khoản khác vẫn chạy.
+        """
+        account_id_text = str(account_id)
+        time_index = self.transactions_by_account.get(account_id_text)
+        if time_index is not None:
+            return time_index
+        if self.transaction_source is None:
+            return TransactionTimeIndex()
+
+        with self.lock_accounts([account_id_text]):
+            time_index = self.transactions_by_account.get(account_id_text)
+            if time_index is not None:
+                return time_index
+            history = self.transaction_source.load_account_transactions(account_id_text)
+            with self.state_lock:
+                session_transactions = list(self.transaction_list)
+            for transaction in session_transactions:
+                if account_id_text in self.get_transaction_account_ids(transaction):
+                    history.append(transaction)
+            time_index = TransactionTimeIndex(history)
+            self.transactions_by_account[account_id_text] = time_index
+        return time_index
+
+    def get_account_transactions(self, account_id: str) -> List[Transaction]:
+        """Lịch sử giao dịch của một tài khoản theo thứ tự thời gian tăng dần (danh sách nội bộ, không được sửa)."""
+        return self.get_account_time_index(account_id).transactions
+
+    def get_account_transaction_count(self, account_id: str) -> int:
+        return len(self.get_account_transactions(account_id))
+
+    # -------------------------
+    # Xem lịch sử theo trang
+    # -------------------------
+    def format_history_cursor(self, transaction: Transaction) -> str:
+        """Con trỏ trang: thời gian + mã của giao dịch cuối cùng đã trả về. Người gọi chỉ cần giữ nguyên và gửi lại."""
+        return f"{get_transaction_time_key(transaction)}|{transaction.transaction_id}"
+
+    def find_cursor_position(self, time_index: TransactionTimeIndex, cursor: str) -> int:
+        """Vị trí giao dịch mà con trỏ trỏ tới; trang tiếp theo gồm các giao dịch đứng trước vị trí này."""
+        time_text, _, transaction_id = str(cursor).partition("|")
+        try:
+            time_key = int(time_text)
+        except ValueError:
+            raise ValueError(f"Con trỏ trang không hợp lệ: {cursor}")
+
+        index = time_index.find_after(time_key) - 1
+        while index >= 0 and time_index.timestamps[index] == time_key:
+            if time_index.transactions[index].transaction_id == transaction_id:
+                return index
+            index -= 1
+        # Không thấy đúng giao dịch (hoặc con trỏ chỉ có thời gian): bỏ qua mọi giao dịch cùng thời điểm.
+        return index + 1
+
+    def get_transaction_page(
+        self,
+        account_id: str,
+        page_size: int,
+        cursor: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+    ) -> Tuple[Iterator[Transaction], Optional[str]]:
+        """
+        Một trang lịch sử của tài khoản, mới nhất trước.
+        Trả về (generator các giao dịch của trang, con trỏ trang sau). Con trỏ là None khi đã hết lịch sử.
+        start_time / end_time (tùy chọn, xem read_time_range): chỉ lấy giao dịch trong khoảng thời gian đó.
+        Chỉ tốn O(page_size) (cộng vài lần tìm kiếm nhị phân), không dựng cả danh sách.
+        """
+        ok, message, time_range = self.read_time_range(start_time, end_time)
+        if not ok:
+            raise ValueError(message)
+
+        time_index = self.get_account_time_index(account_id)
+        history = time_index.transactions
+        low, high = time_index.find_range(time_range[0], time_range[1])
+        start = high if cursor is None else min(self.find_cursor_position(time_index, cursor), high)
+        stop = max(start - max(int(page_size), 1), low)
+
+        next_cursor = None
+        if low < stop < start:
+            next_cursor = self.format_history_cursor(history[stop])
+        rows = (history[index] for index in range(start - 1, stop - 1, -1))
+        return rows, next_cursor
 
     def get_transaction_history(self, account_id: str) -> List[Transaction]:
+        """Toàn bộ lịch sử của tài khoản, mới nhất trước (đi ngược chỉ mục, không cần sắp xếp)."""
+        return self.get_account_transactions(account_id)[::-1]
+
+    # -------------------------
+    # Truy vấn theo khoảng thời gian
+    # -------------------------
+    def parse_time_bound(self, time_text: str, is_end: bool) -> Optional[int]:
+        """
+        Đổi mốc thời gian "YYYY-MM-DD HH:MM:SS" hoặc "YYYY-MM-DD" thành số giây.
+        Chỉ có ngày: mốc đầu tính từ 00:00:00, mốc cuối tính đến hết 23:59:59 của ngày đó.
+        Trả về None nếu sai định dạng.
+        """
+        text = str(time_text).strip()
+        if len(text) == 10:
+            text = text + (" 23:59:59" if is_end else " 00:00:00")
+        return time_text_to_timestamp(text)
+
+    def read_time_range(
+        self,
+        start_time: Optional[str],
+        end_time: Optional[str],
+    ) -> Tuple[bool, str, Tuple[Optional[int], Optional[int]]]:
+        """Kiểm tra và đổi khoảng thời gian. Mốc bỏ trống (None hoặc chuỗi rỗng) nghĩa là không giới hạn phía đó."""
+        start_key = None
+        end_key = None
+        if start_time is not None and str(start_time).strip() != "":
+            start_key = self.parse_time_bound(start_time, is_end=False)
+            if start_key is None:
+                return False, "Thời điểm bắt đầu không hợp lệ (YYYY-MM-DD hoặc YYYY-MM-DD HH:MM:SS).", (None, None)
+        if end_time is not None and str(end_time).strip() != "":
+            end_key = self.parse_time_bound(end_time, is_end=True)
+            if end_key is None:
+                return False, "Thời điểm kết thúc không hợp lệ (YYYY-MM-DD hoặc YYYY-MM-DD HH:MM:SS).", (None, None)
+        if start_key is not None and end_key is not None and start_key > end_key:
+            return False, "Thời điểm bắt đầu phải trước thời điểm kết thúc.", (None, None)
+        return True, "OK", (start_key, end_key)
+
+    def get_transactions_between(
+        self,
+        account_id: str,
+        start_time: Optional[str],
+        end_time: Optional[str],
+    ) -> Tuple[bool, str, List[Transaction]]:
+        """
+        Giao dịch của một tài khoản trong khoảng thời gian (tính cả hai mốc), theo thứ tự thời gian tăng dần
+        như trên sao kê. Chỉ là hai lần bisect trên chỉ mục thời gian rồi cắt lát.
+        """
+        ok, message, time_range = self.read_time_range(start_time, end_time)
+        if not ok:
+            return False, message, []
+        time_index = self.get_account_time_index(account_id)
+        low, high = time_index.find_range(time_range[0], time_range[1])
+        return True, "OK", time_index.transactions[low:high]
+
+    def get_bank_time_index(self) -> TransactionTimeIndex:
+        """Chỉ mục thời gian của mọi giao dịch trong ngân hàng (dựng một lần, sau đó cập nhật dần trong count_transaction)."""
+        if self.bank_time_index is None:
+            with self.state_lock:
+                if self.bank_time_index is None:
+                    self.bank_time_index = TransactionTimeIndex(list(self.get_all_transactions()))
+        return self.bank_time_index
+
+    def get_bank_transactions_between(
+        self,
+        start_time: Optional[str],
+        end_time: Optional[str],
+    ) -> Tuple[bool, str, List[Transaction]]:
+        """Giao dịch của mọi tài khoản trong khoảng thời gian (dùng cho báo cáo), theo thứ tự thời gian tăng dần."""
+        ok, message, time_range = self.read_time_range(start_time, end_time)
+        if not ok:
+            return False, message, []
+        time_index = self.get_bank_time_index()
+        low, high = time_index.find_range(time_range[0], time_range[1])
+        return True, "OK", time_index.transactions[low:high]
+
+    # -------------------------
+    # Tìm kiếm theo từ khóa
+    # -------------------------
+    def get_account_search_index(self, account_id: str) -> TransactionSearchIndex:
+        # Dựng và đưa vào bảng trong cùng một lần giữ khóa tài khoản, để không sót giao dịch thêm giữa hai bước.
         account_id_text = str(account_id)
-        history: List[Transaction] = []
+        search_index = self.search_indexes_by_account.get(account_id_text)
+        if search_index is None:
+            with self.lock_accounts([account_id_text]):
+                search_index = self.search_indexes_by_account.get(account_id_text)
+                if search_index is None:
+                    search_index = TransactionSearchIndex(self.get_account_transactions(account_id_text))
+                    self.search_indexes_by_account[account_id_text] = search_index
+        return search_index
+
+    def search_account_transactions(
+        self,
+        account_id: str,
+        keyword: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+    ) -> Tuple[bool, str, List[Transaction]]:
+        """
+        Giao dịch của tài khoản khớp mọi từ trong keyword (theo tiền tố, không phân biệt dấu:
+        "chuyen" khớp "Chuyển"), có thể giới hạn thêm theo khoảng thời gian. Mới nhất trước.
+        """
+        query = TransactionQuery(account_id=str(account_id), keyword=str(keyword), start_time=start_time or "", end_time=end_time or "")
+        return self.query_transactions(query)
 
-        for transaction in self.transaction_list:
-            if transaction.from_account_id == account_id_text or transaction.to_account_id == account_id_text:
-                history.append(transaction)
+    # -------------------------
+    # Truy vấn lịch sử có cấu trúc
+    # -------------------------
+    def get_account_query_indexes(self, account_id: str) -> AccountQueryIndexes:
+        # Như get_account_search_index: dựng và đưa vào bảng khi đang giữ khóa tài khoản.
+        account_id_text = str(account_id)
+        query_indexes = self.query_indexes_by_account.get(account_id_text)
+        if query_indexes is None:
+            with self.lock_accounts([account_id_text]):
+                query_indexes = self.query_indexes_by_account.get(account_id_text)
+                if query_indexes is None:
+                    query_indexes = AccountQueryIndexes(account_id_text, self.get_account_transactions(account_id_text))
+                    self.query_indexes_by_account[account_id_text] = query_indexes
+        return query_indexes
+
+    def query_transactions(self, query: TransactionQuery) -> Tuple[bool, str, List[Transaction]]:
+        """
+        Lịch sử của query.account_id thỏa mọi điều kiện trong query, mới nhất trước.
+        Ước lượng số ứng viên của từng chỉ mục dùng được (thời gian, loại, đối ứng, số tiền, từ khóa),
+        chỉ duyệt ứng viên của chỉ mục hẹp nhất rồi kiểm tra các điều kiện còn lại trên từng dòng.
+        """
+        ok, message, time_range = self.read_time_range(query.start_time, query.end_time)
+        if not ok:
+            return False, message, []
+        start_key, end_key = time_range
+        if query.min_amount is not None and query.max_amount is not None and query.min_amount > query.max_amount:
+            return False, "Số tiền tối thiểu không được lớn hơn số tiền tối đa.", []
+
+        account_id = str(query.account_id)
+        time_index = self.get_account_time_index(account_id)
+        low, high = time_index.find_range(start_key, end_key)
+        # Mỗi phương án là (số ứng viên, danh sách các khúc ứng viên).
+        best_plan = (high - low, [(time_index.transactions, low, high)])
+
+        if query.has_filters():
+            query_indexes = self.get_account_query_indexes(account_id)
+            plans = []
+            if len(query.transaction_types) > 0:
+                parts = []
+                for transaction_type in set(query.transaction_types):
+                    type_index = query_indexes.by_type.get(transaction_type, TransactionTimeIndex())
+                    type_low, type_high = type_index.find_range(start_key, end_key)
+                    parts.append((type_index.transactions, type_low, type_high))
+                plans.append((sum(part_high - part_low for _, part_low, part_high in parts), parts))
+            counterparty_text = query.counterparty_id.strip()
+            if counterparty_text != "":
+                counterparty_index = query_indexes.by_counterparty.get(counterparty_text, TransactionTimeIndex())
+                counterparty_low, counterparty_high = counterparty_index.find_range(start_key, end_key)
+                plans.append((counterparty_high - counterparty_low, [(counterparty_index.transactions, counterparty_low, counterparty_high)]))
+            if query.min_amount is not None or query.max_amount is not None:
+                amount_low, amount_high = query_indexes.find_amount_range(query.min_amount, query.max_amount)
+                plans.append((amount_high - amount_low, [(query_indexes.by_amount, amount_low, amount_high)]))
+            for plan in plans:
+                if plan[0] < best_plan[0]:
+                    best_plan = plan
+
+        # Từ khóa: kết quả tìm trong chỉ mục đảo vừa là một phương án, vừa là tập để lọc.
+        keyword_ids = None
+        if query.keyword.strip() != "":
+            keyword_matches = self.get_account_search_index(account_id).search(query.keyword)
+            keyword_ids = {id(transaction) for transaction in keyword_matches}
+            if len(keyword_matches) < best_plan[0]:
+                best_plan = (len(keyword_matches), [(keyword_matches, 0, len(keyword_matches))])
+
+        result = []
+        for candidates, part_low, part_high in best_plan[1]:
+            for position in range(part_low, part_high):
+                transaction = candidates[position]
+                if keyword_ids is not None and id(transaction) not in keyword_ids:
+                    continue
+                if matches_transaction_query(query, transaction, start_key, end_key):
+                    result.append(transaction)
+        result.sort(key=get_history_order_key, reverse=True)
+        return True, "OK", result
 
-        history.sort(key=lambda item: item.time_text, reverse=True)
-        return history
+    # -------------------------
+    # Số liệu tổng hợp
+    # -------------------------
+    def get_total_balance(self) -> int:
+        """Tổng số dư của mọi tài khoản."""
+        return self.aggregates.total_balance
+
+    def get_bank_savings_summary(self) -> Dict[str, int]:
+        """Như get_savings_summary nhưng cho toàn ngân hàng."""
+        return dict(self.aggregates.bank_savings_totals)
+
+    def get_transaction_type_counts(self, account_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Số giao dịch theo loại của một tài khoản (hoặc cả ngân hàng khi account_id là None).
+        Lần đầu phải đếm trên lịch sử, các lần sau chỉ đọc bộ đếm được cập nhật trong add_transaction.
+        """
+        if account_id is None:
+            with self.state_lock:
+                if self.aggregates.transaction_type_counts is None:
+                    self.aggregates.transaction_type_counts = count_transaction_types(self.get_all_transactions())
+                return dict(self.aggregates.transaction_type_counts)
+
+        # Giữ khóa tài khoản lúc đếm (không có giao dịch mới của tài khoản), state_lock lúc đưa vào số liệu tổng hợp.
+        account_id_text = str(account_id)
+        with self.lock_accounts([account_id_text]):
+            counts = self.aggregates.transaction_type_counts_by_account.get(account_id_text)
+            if counts is None:
+                counts = count_transaction_types(self.get_account_transactions(account_id_text))
+                with self.state_lock:
+                    self.aggregates.transaction_type_counts_by_account[account_id_text] = counts
+            return dict(counts)
+
+    def rebuild_aggregates(self) -> BankAggregates:
+        """Tính lại từ đầu mọi số liệu tổng hợp đang có (bộ đếm giao dịch chưa dựng thì vẫn để chưa dựng)."""
+        aggregates = BankAggregates(self.accounts_by_id.values())
+        for saving_deposit in self.saving_deposits:
+            if self.is_saving_deposit_active(saving_deposit):
+                aggregates.add_active_deposit(saving_deposit, 1)
+        if self.aggregates.transaction_type_counts is not None:
+            aggregates.transaction_type_counts = count_transaction_types(self.get_all_transactions())
+        for account_id in self.aggregates.transaction_type_counts_by_account:
+            aggregates.transaction_type_counts_by_account[account_id] = count_transaction_types(self.get_account_transactions(account_id))
+        return aggregates
+
+    def verify_aggregates(self, repair: bool = False) -> Tuple[bool, str, List[str]]:
+        """
+        Chế độ kiểm tra: so số liệu đang cập nhật dần với số liệu tính lại từ đầu.
+        Trả về (khớp?, thông báo, danh sách mục bị lệch). repair=True thì thay bằng số liệu vừa tính lại.
+        """
+        expected = self.rebuild_aggregates()
+        current_data = self.aggregates.to_dictionary()
+        expected_data = expected.to_dictionary()
+        drifted_keys = [key for key in expected_data if current_data[key] != expected_data[key]]
+        if len(drifted_keys) == 0:
+            return True, "Số liệu tổng hợp khớp với dữ liệu.", []
+        if repair:
+            self.aggregates = expected
+            return False, f"Số liệu tổng hợp bị lệch ({', '.join(drifted_keys)}), đã tính lại.", drifted_keys
+        return False, f"Số liệu tổng hợp bị lệch: {', '.join(drifted_keys)}.", drifted_keys
@@ -0,0 +1,22 @@
+import threading
+from typing import Any, Dict
+
+
+class IdAllocator:
+    """
+    Cấp số thứ tự tăng dần cho một loại mã (tài khoản, giao dịch, sổ tiết kiệm), an toàn giữa nhiều luồng.
+    Bộ đếm vẫn nằm trong bank_data[key] để được ghi vào journal / bản chụp như trước.
+    Khóa chỉ bao đúng một phép đọc-cộng-ghi, và có thể giữ trước cả một khối số trong một lần.
+    """
+
+    def __init__(self, bank_data: Dict[str, Any], key: str):
+        self.bank_data = bank_data
+        self.key = key
+        self.lock = threading.Lock()
+
+    def allocate(self, count: int = 1) -> int:
+        """Giữ count số liên tiếp, trả về số đầu tiên."""
+        with self.lock:
+            first_number = int(self.bank_data[self.key])
+            self.bank_data[self.key] = first_number + int(count)
+        return first_number
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.core.models import (
+    MISSING_TIMESTAMP_KEY,
+    SECONDS_PER_DAY,
+    SavingDeposit,
+    add_months_to_timestamp,
+    time_text_to_timestamp,
+    timestamp_to_time_text,
+)
+
+# NumPy là tùy chọn: có thì tính cả sổ sách bằng phép toán trên mảng, không có thì lặp từng sổ.
+# Hai cách cho kết quả giống hệt nhau (cùng thứ tự phép tính số thực, cùng cách làm tròn).
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def build_deposit_columns(saving_deposits: Sequence[SavingDeposit]) -> Dict[str, List[Any]]:
+    """Tách danh sách sổ thành các cột: mã sổ, gốc, lãi suất, kỳ hạn và thời điểm mở (số giây)."""
+    opened_keys = []
+    for saving_deposit in saving_deposits:
+        opened_key = time_text_to_timestamp(str(saving_deposit.opened_at))
+        opened_keys.append(MISSING_TIMESTAMP_KEY if opened_key is None else opened_key)
+    return {
+        "deposit_ids": [saving_deposit.deposit_id for saving_deposit in saving_deposits],
+        "principals": [int(saving_deposit.principal_amount) for saving_deposit in saving_deposits],
+        "rates": [float(saving_deposit.annual_interest_rate) for saving_deposit in saving_deposits],
+        "terms": [int(saving_deposit.term_months) for saving_deposit in saving_deposits],
+        "opened_keys": opened_keys,
+    }
+
+
+def calculate_interest_batch(principals: Sequence[int], rates: Sequence[float], terms: Sequence[int]) -> List[int]:
+    """Như BankService.calculate_saving_interest nhưng cho cả loạt sổ: round(gốc * lãi suất * số tháng / 1200), không âm."""
+    if numpy is not None and len(principals) > 0:
+        values = numpy.asarray(principals, dtype=numpy.float64) * numpy.asarray(rates, dtype=numpy.float64)
+        values = values * numpy.asarray(terms, dtype=numpy.int64) / 1200
+        # numpy.round làm tròn nửa về số chẵn, giống round() của Python.
+        return numpy.maximum(numpy.round(values), 0).astype(numpy.int64).tolist()
+    return [
+        max(int(round(int(principal) * float(rate) * int(term) / 1200)), 0)
+        for principal, rate, term in zip(principals, rates, terms)
+    ]
+
+
+def calculate_maturity_keys_batch(opened_keys: Sequence[int], terms: Sequence[int]) -> List[int]:
+    """
+    Như BankService.add_months cho cả loạt sổ, trên số giây: ngày đáo hạn = ngày mở + kỳ hạn,
+    lùi về cuối tháng nếu tháng đích ngắn hơn. Sổ có ngày mở sai định dạng giữ MISSING_TIMESTAMP_KEY.
+    """
+    if numpy is not None and len(opened_keys) > 0:
+        opened = numpy.asarray(opened_keys, dtype=numpy.int64)
+        missing = opened == MISSING_TIMESTAMP_KEY
+        opened = numpy.where(missing, 0, opened)
+        day_numbers = opened // SECONDS_PER_DAY
+        seconds = opened - day_numbers * SECONDS_PER_DAY
+
+        days = day_numbers.astype("datetime64[D]")
+        months = days.astype("datetime64[M]")
+        day_offsets = (days - months.astype("datetime64[D]")).astype(numpy.int64)
+        target_months = months + numpy.asarray(terms, dtype=numpy.int64).astype("timedelta64[M]")
+        target_starts = target_months.astype("datetime64[D]")
+        month_lengths = ((target_months + numpy.timedelta64(1, "M")).astype("datetime64[D]") - target_starts).astype(numpy.int64)
+        target_days = target_starts.astype(numpy.int64) + numpy.minimum(day_offsets, month_lengths - 1)
+
+        maturity_keys = target_days * SECONDS_PER_DAY + seconds
+        return numpy.where(missing, MISSING_TIMESTAMP_KEY, maturity_keys).tolist()
+    return [
+        MISSING_TIMESTAMP_KEY if opened_key == MISSING_TIMESTAMP_KEY else add_months_to_timestamp(opened_key, term)
+        for opened_key, term in zip(opened_keys, terms)
+    ]
+
+
+def project_savings_book(
+    saving_deposits: Sequence[SavingDeposit],
+    annual_interest_rate: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Tính cho cả danh sách sổ: tiền lãi, tiền nhận khi đáo hạn và thời điểm đáo hạn (số giây).
+    annual_interest_rate: nếu có thì tính lại mọi sổ theo lãi suất này (giả định "nếu đổi lãi suất thì sao").
+    """
+    columns = build_deposit_columns(saving_deposits)
+    rates = columns["rates"] if annual_interest_rate is None else [float(annual_interest_rate)] * len(columns["rates"])
+    interests = calculate_interest_batch(columns["principals"], rates, columns["terms"])
+    payouts = [principal + interest for principal, interest in zip(columns["principals"], interests)]
+    return {
+        "deposit_ids": columns["deposit_ids"],
+        "interests": interests,
+        "payouts": payouts,
+        "maturity_keys": calculate_maturity_keys_batch(columns["opened_keys"], columns["terms"]),
+        "total_principal": sum(columns["principals"]),
+        "total_interest": sum(interests),
+        "total_payout": sum(payouts),
+    }
+
+
+def group_payouts_by_month(maturity_keys: Sequence[int], payouts: Sequence[int]) -> Dict[str, int]:
+    """Tổng tiền phải trả theo tháng đáo hạn ("YYYY-MM"), tháng sớm nhất trước. Bỏ qua sổ không rõ ngày đáo hạn."""
+    totals: Dict[str, int] = {}
+    for maturity_key, payout in zip(maturity_keys, payouts):
+        if maturity_key == MISSING_TIMESTAMP_KEY:
+            continue
+        month_text = timestamp_to_time_text(maturity_key)[:7]
+        totals[month_text] = totals.get(month_text, 0) + int(payout)
+    return dict(sorted(totals.items()))
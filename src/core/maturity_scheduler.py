@@ -0,0 +1,30 @@
+import heapq
+from typing import List, Optional, Tuple
+
+
+class MaturityScheduler:
+    """
+    Hàng đợi ưu tiên (min-heap) các sổ tiết kiệm đang hoạt động theo thời điểm đáo hạn.
+    Sổ bị tất toán tay vẫn nằm trong heap; khi tới lượt, người gọi tự bỏ qua sổ không còn hoạt động.
+    Lấy k sổ đến hạn tốn O(k log n), không phải duyệt toàn bộ sổ.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def add(self, deposit_id: str, maturity_key: int) -> None:
+        """Đưa sổ vào lịch với thời điểm đáo hạn đã đổi sẵn ra số giây."""
+        heapq.heappush(self.heap, (int(maturity_key), str(deposit_id)))
+
+    def get_next_maturity_key(self) -> Optional[int]:
+        return self.heap[0][0] if len(self.heap) > 0 else None
+
+    def pop_due(self, now_key: int) -> List[str]:
+        """Lấy ra mã các sổ có thời điểm đáo hạn <= now_key, sớm nhất trước."""
+        due_ids = []
+        while len(self.heap) > 0 and self.heap[0][0] <= now_key:
+            due_ids.append(heapq.heappop(self.heap)[1])
+        return due_ids
@@ -1,5 +1,9 @@
+import json
+import sys
+import threading
 from dataclasses import dataclass
-from datetime import datetime
+from calendar import monthrange
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, Any
 
 
@@ -9,7 +13,12 @@ def get_current_datetime() -> datetime:
 
 def get_current_time_text() -> str:
     """Trả về thời gian hiện tại theo định dạng dễ đọc."""
-    return get_current_datetime().strftime("%Y-%m-%d %H:%M:%S")
+    return timestamp_to_time_text(datetime_to_timestamp(get_current_datetime()))
+
+
+def encode_json_text(data: Dict[str, Any]) -> str:
+    """Mã hóa một bản ghi thành chuỗi JSON gọn trên một dòng (dùng cho bản chụp và journal)."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
 
 
 @dataclass
@@ -41,16 +50,204 @@ class Account:
         )
 
 
-@dataclass
+TRANSACTION_ID_PREFIX = "TRANSACTION_"
+
+# Mã số nguyên của từng loại giao dịch. Loại lạ (dữ liệu cũ) được cấp mã mới khi gặp lần đầu.
+TRANSACTION_TYPES = ["DEPOSIT", "WITHDRAW", "TRANSFER_IN", "TRANSFER_OUT", "SAVINGS_OPEN", "SAVINGS_CLOSE", "PAYROLL_OUT", "PAYROLL_IN"]
+TRANSACTION_TYPE_CODES = {transaction_type: code for code, transaction_type in enumerate(TRANSACTION_TYPES)}
+# Cấp mã cho loại lạ có thể chạy từ nhiều luồng xử lý (BankService thread_safe=True): cấp dưới khóa để không trùng mã.
+transaction_type_lock = threading.Lock()
+
+# Loại giao dịch mà mỗi thao tác trong lô sinh ra, theo thứ tự mã (BankService.apply_batch và bản ghi journal "batch").
+BATCH_OPERATION_TRANSACTION_TYPES = {
+    "deposit": ("DEPOSIT",),
+    "withdraw": ("WITHDRAW",),
+    "transfer": ("TRANSFER_OUT", "TRANSFER_IN"),
+}
+
+EPOCH_DATETIME = datetime(1970, 1, 1)
+EPOCH_DATE = EPOCH_DATETIME.date()
+SECONDS_PER_DAY = 86400
+MISSING_TIMESTAMP_KEY = -(2 ** 62)
+
+# Bộ nhớ đệm theo ngày: giao dịch dồn vào số ít ngày, nên phần ngày chỉ phải tính một lần.
+day_number_by_date_text: Dict[str, int] = {}
+date_text_by_day_number: Dict[int, str] = {}
+
+
+def get_transaction_type_code(transaction_type: str) -> int:
+    code = TRANSACTION_TYPE_CODES.get(transaction_type)
+    if code is None:
+        with transaction_type_lock:
+            code = TRANSACTION_TYPE_CODES.get(transaction_type)
+            if code is None:
+                # Thêm tên trước rồi mới công bố mã, để ai thấy mã cũng đọc được tên.
+                code = len(TRANSACTION_TYPES)
+                TRANSACTION_TYPES.append(transaction_type)
+                TRANSACTION_TYPE_CODES[transaction_type] = code
+    return code
+
+
+def get_day_number(date_text: str) -> Optional[int]:
+    """Số ngày kể từ 1970-01-01 của chuỗi "YYYY-MM-DD" (None nếu sai định dạng)."""
+    day_number = day_number_by_date_text.get(date_text)
+    if day_number is None:
+        try:
+            day_number = (datetime.strptime(date_text, "%Y-%m-%d") - EPOCH_DATETIME).days
+        except ValueError:
+            return None
+        # strptime chấp nhận cả "2024-1-5"; chỉ nhận chuỗi đổi ngược ra đúng như cũ.
+        if (EPOCH_DATETIME + timedelta(days=day_number)).strftime("%Y-%m-%d") != date_text:
+            return None
+        day_number_by_date_text[date_text] = day_number
+        date_text_by_day_number[day_number] = date_text
+    return day_number
+
+
+def time_text_to_timestamp(time_text: str) -> Optional[int]:
+    """
+    Đổi "YYYY-MM-DD HH:MM:SS" thành số giây kể từ 1970-01-01 (coi giờ ghi trong chuỗi là mốc, không đổi múi giờ).
+    Trả về None nếu chuỗi không đúng định dạng.
+    """
+    if len(time_text) != 19 or time_text[10] != " " or time_text[13] != ":" or time_text[16] != ":":
+        return None
+    day_number = get_day_number(time_text[:10])
+    clock_text = time_text[11:13] + time_text[14:16] + time_text[17:19]
+    if day_number is None or not clock_text.isdigit():
+        return None
+    hour, minute, second = int(clock_text[0:2]), int(clock_text[2:4]), int(clock_text[4:6])
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return day_number * SECONDS_PER_DAY + hour * 3600 + minute * 60 + second
+
+
+def datetime_to_timestamp(value: datetime) -> int:
+    """Đổi datetime (không múi giờ) thành số giây kể từ 1970-01-01, bỏ phần lẻ của giây."""
+    day_number = (value.date() - EPOCH_DATE).days
+    return day_number * SECONDS_PER_DAY + value.hour * 3600 + value.minute * 60 + value.second
+
+
+def timestamp_to_datetime(timestamp: int) -> datetime:
+    return EPOCH_DATETIME + timedelta(seconds=int(timestamp))
+
+
+def timestamp_to_time_text(timestamp: int) -> str:
+    day_number, seconds = divmod(int(timestamp), SECONDS_PER_DAY)
+    date_text = date_text_by_day_number.get(day_number)
+    if date_text is None:
+        date_text = (EPOCH_DATETIME + timedelta(days=day_number)).strftime("%Y-%m-%d")
+        date_text_by_day_number[day_number] = date_text
+        day_number_by_date_text[date_text] = day_number
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return f"{date_text} {hour:02d}:{minute:02d}:{second:02d}"
+
+
+def add_months_to_timestamp(timestamp: int, months: int) -> int:
+    """
+    Cộng số tháng vào mốc thời gian (số giây), giữ nguyên giờ trong ngày.
+    Ngày vượt quá cuối tháng đích thì lùi về ngày cuối tháng (31/01 + 1 tháng = 28 hoặc 29/02).
+    """
+    day_number, seconds = divmod(int(timestamp), SECONDS_PER_DAY)
+    base_date = EPOCH_DATE + timedelta(days=day_number)
+    total_month = base_date.month - 1 + int(months)
+    target_year = base_date.year + total_month // 12
+    target_month = total_month % 12 + 1
+    target_day = min(base_date.day, monthrange(target_year, target_month)[1])
+    return (date(target_year, target_month, target_day) - EPOCH_DATE).days * SECONDS_PER_DAY + seconds
+
+
+def parse_transaction_number(transaction_id: str) -> Optional[int]:
+    """Lấy phần số của mã dạng TRANSACTION_00000001. Trả về None nếu mã không theo mẫu này."""
+    if not transaction_id.startswith(TRANSACTION_ID_PREFIX):
+        return None
+    number_text = transaction_id[len(TRANSACTION_ID_PREFIX):]
+    if not number_text.isdigit() or not number_text.isascii():
+        return None
+    # Chỉ nhận dạng chuẩn f"{số:08d}" để đổi ngược ra đúng chuỗi cũ.
+    if len(number_text) < 8 or (len(number_text) > 8 and number_text[0] == "0"):
+        return None
+    return int(number_text)
+
+
+def get_transaction_time_key(transaction: "Transaction") -> int:
+    """Khóa sắp xếp theo thời gian. Giao dịch có thời gian sai định dạng (dữ liệu cũ) xếp trước mọi giao dịch khác."""
+    if transaction.timestamp is None:
+        return MISSING_TIMESTAMP_KEY
+    return transaction.timestamp
+
+
 class Transaction:
-    """Thông tin một giao dịch."""
-    transaction_id: str
-    transaction_type: str  # DEPOSIT, WITHDRAW, TRANSFER_IN, TRANSFER_OUT, SAVINGS_OPEN, SAVINGS_CLOSE
-    amount: int
-    time_text: str
-    note: str
-    from_account_id: Optional[str]
-    to_account_id: Optional[str]
+    """
+    Thông tin một giao dịch, lưu gọn để giữ được hàng triệu dòng trong bộ nhớ:
+    - Dùng __slots__ (không có __dict__ riêng cho từng đối tượng).
+    - Mã giao dịch lưu bằng số (number), loại giao dịch bằng mã số (type_code),
+      thời gian bằng số giây (timestamp); số tài khoản được intern để các giao dịch dùng chung một chuỗi.
+    Vẫn đọc được như trước qua transaction_id / transaction_type / time_text.
+    Mã hoặc thời gian không theo định dạng chuẩn (dữ liệu cũ) được giữ nguyên dạng chuỗi.
+    """
+
+    __slots__ = (
+        "number",
+        "type_code",
+        "amount",
+        "timestamp",
+        "note",
+        "from_account_id",
+        "to_account_id",
+        "raw_transaction_id",
+        "raw_time_text",
+    )
+
+    def __init__(
+        self,
+        transaction_id: str,
+        transaction_type: str,  # DEPOSIT, WITHDRAW, TRANSFER_IN, TRANSFER_OUT, SAVINGS_OPEN, SAVINGS_CLOSE, PAYROLL_OUT, PAYROLL_IN
+        amount: int,
+        time_text: str,
+        note: str,
+        from_account_id: Optional[str],
+        to_account_id: Optional[str],
+    ):
+        transaction_id = str(transaction_id)
+        time_text = str(time_text)
+        self.number = parse_transaction_number(transaction_id)
+        self.raw_transaction_id = transaction_id if self.number is None else None
+        self.type_code = get_transaction_type_code(str(transaction_type))
+        self.amount = amount
+        self.timestamp = time_text_to_timestamp(time_text)
+        self.raw_time_text = time_text if self.timestamp is None else None
+        self.note = note
+        self.from_account_id = sys.intern(from_account_id) if isinstance(from_account_id, str) else from_account_id
+        self.to_account_id = sys.intern(to_account_id) if isinstance(to_account_id, str) else to_account_id
+
+    @property
+    def transaction_id(self) -> str:
+        if self.number is None:
+            return self.raw_transaction_id
+        return f"{TRANSACTION_ID_PREFIX}{self.number:08d}"
+
+    @property
+    def transaction_type(self) -> str:
+        return TRANSACTION_TYPES[self.type_code]
+
+    @property
+    def time_text(self) -> str:
+        if self.timestamp is None:
+            return self.raw_time_text
+        return timestamp_to_time_text(self.timestamp)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return self.to_dictionary() == other.to_dictionary()
+
+    def __repr__(self) -> str:
+        return (
+            f"Transaction(transaction_id={self.transaction_id!r}, transaction_type={self.transaction_type!r}, "
+            f"amount={self.amount!r}, time_text={self.time_text!r}, note={self.note!r}, "
+            f"from_account_id={self.from_account_id!r}, to_account_id={self.to_account_id!r})"
+        )
 
     def to_dictionary(self) -> Dict[str, Any]:
         return {
@@ -65,16 +262,46 @@ class Transaction:
 
     @staticmethod
     def from_dictionary(data: Dict[str, Any]) -> "Transaction":
+        # Chỉ lấy giờ hiện tại khi thiếu time_text (đọc hàng triệu dòng thì không gọi strftime thừa).
+        time_text = data.get("time_text")
+        if time_text is None:
+            time_text = get_current_time_text()
         return Transaction(
             transaction_id=str(data["transaction_id"]),
             transaction_type=str(data["transaction_type"]),
             amount=int(data["amount"]),
-            time_text=str(data.get("time_text", get_current_time_text())),
+            time_text=str(time_text),
             note=str(data.get("note", "")),
             from_account_id=data.get("from_account_id"),
             to_account_id=data.get("to_account_id"),
         )
 
+    @staticmethod
+    def from_parts(
+        number: int,
+        type_code: int,
+        amount: int,
+        timestamp: int,
+        note: str,
+        from_account_id: Optional[str],
+        to_account_id: Optional[str],
+    ) -> "Transaction":
+        """
+        Dựng giao dịch từ các phần đã ở dạng lưu trữ (số thứ tự, mã loại, số giây), không phải đọc lại chuỗi.
+        Dùng khi ghi cả lô giao dịch cùng lúc; số tài khoản nên là chuỗi dùng chung (account.account_id), không tạo chuỗi mới.
+        """
+        transaction = Transaction.__new__(Transaction)
+        transaction.number = number
+        transaction.raw_transaction_id = None
+        transaction.type_code = type_code
+        transaction.amount = amount
+        transaction.timestamp = timestamp
+        transaction.raw_time_text = None
+        transaction.note = note
+        transaction.from_account_id = from_account_id
+        transaction.to_account_id = to_account_id
+        return transaction
+
 
 @dataclass
 class SavingDeposit:
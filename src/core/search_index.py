@@ -0,0 +1,134 @@
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set
+
+from src.core.models import Transaction
+
+
+# Từ tiếng Việt hiển thị cho từng loại giao dịch, để gõ "nạp", "chuyển"... cũng tìm được.
+# Giao dịch chuyển khoản chỉ có hai loại theo chiều (TRANSFER_OUT / TRANSFER_IN), nên "chuyển khoản" khớp cả hai.
+TRANSACTION_TYPE_SEARCH_TERMS = {
+    "DEPOSIT": "nạp tiền",
+    "WITHDRAW": "rút tiền",
+    "TRANSFER_OUT": "chuyển đi chuyển khoản",
+    "TRANSFER_IN": "nhận tiền chuyển khoản",
+    "SAVINGS_OPEN": "gửi tiết kiệm",
+    "SAVINGS_CLOSE": "tất toán tiết kiệm",
+    "PAYROLL_OUT": "chi lương",
+    "PAYROLL_IN": "nhận lương",
+}
+
+# Một từ là chuỗi chữ/số, có thể nối bằng - : . _ (ngày giờ, mã giao dịch, loại giao dịch).
+SEARCH_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-:._][a-z0-9]+)*")
+SEARCH_TOKEN_PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_search_text(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt (kể cả đ -> d) để tìm kiếm không phân biệt dấu."""
+    lowered = str(text).lower()
+    if lowered.isascii():
+        return lowered
+    decomposed = unicodedata.normalize("NFD", lowered)
+    without_marks = "".join(character for character in decomposed if unicodedata.category(character) != "Mn")
+    return without_marks.replace("đ", "d")
+
+
+def tokenize_search_text(text: str) -> List[str]:
+    """Tách chuỗi truy vấn thành các từ đã chuẩn hóa (giữ nguyên từ ghép như 2024-01-05)."""
+    return SEARCH_TOKEN_PATTERN.findall(normalize_search_text(text))
+
+
+def get_transaction_search_tokens(transaction: Transaction) -> Set[str]:
+    """Các từ được đánh chỉ mục của một giao dịch: mã, thời gian, loại, số tiền, ghi chú, hai tài khoản."""
+    parts = [
+        transaction.transaction_id,
+        transaction.time_text,
+        transaction.transaction_type,
+        TRANSACTION_TYPE_SEARCH_TERMS.get(str(transaction.transaction_type).upper(), ""),
+        str(transaction.amount),
+        transaction.note,
+        transaction.from_account_id,
+        transaction.to_account_id,
+    ]
+    tokens: Set[str] = set()
+    for token in SEARCH_TOKEN_PATTERN.findall(normalize_search_text(" ".join(str(part) for part in parts))):
+        tokens.add(token)
+        # Từ ghép cũng được tìm theo từng phần: "out" khớp transfer_out, "05" khớp 2024-01-05.
+        tokens.update(SEARCH_TOKEN_PART_PATTERN.findall(token))
+    return tokens
+
+
+class TransactionSearchIndex:
+    """
+    Chỉ mục đảo (inverted index) cho ô tìm kiếm lịch sử: từ -> tập số thứ tự giao dịch chứa từ đó.
+    Danh sách từ được giữ đã sắp xếp để tìm theo tiền tố bằng bisect (gõ tới đâu khớp tới đó),
+    nên một lần tìm chỉ tốn theo số kết quả, không theo độ dài lịch sử.
+    """
+
+    def __init__(self, transactions: Optional[List[Transaction]] = None):
+        self.transactions: List[Transaction] = []
+        self.postings: Dict[str, Set[int]] = {}
+        for transaction in transactions or []:
+            self.add_postings(transaction)
+        # Dựng lần đầu: sắp xếp danh sách từ một lần, thay vì chèn từng từ.
+        self.sorted_tokens: List[str] = sorted(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.transactions)
+
+    def add_postings(self, transaction: Transaction) -> List[str]:
+        """Ghi giao dịch vào các tập của từng từ; trả về những từ lần đầu xuất hiện."""
+        number = len(self.transactions)
+        self.transactions.append(transaction)
+        new_tokens = []
+        for token in get_transaction_search_tokens(transaction):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = set()
+                self.postings[token] = posting
+                new_tokens.append(token)
+            posting.add(number)
+        return new_tokens
+
+    def add(self, transaction: Transaction) -> None:
+        for token in self.add_postings(transaction):
+            insort(self.sorted_tokens, token)
+
+    def extend(self, transactions: List[Transaction]) -> None:
+        """Thêm cả khối giao dịch: các từ mới được xếp vào danh sách từ một lần."""
+        new_tokens = []
+        for transaction in transactions:
+            new_tokens.extend(self.add_postings(transaction))
+        if len(new_tokens) > 0:
+            self.sorted_tokens.extend(new_tokens)
+            self.sorted_tokens.sort()
+
+    def find_prefix(self, prefix: str) -> Set[int]:
+        """Số thứ tự các giao dịch có ít nhất một từ bắt đầu bằng prefix (không sửa tập trả về)."""
+        position = bisect_left(self.sorted_tokens, prefix)
+        matched_sets = []
+        while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(prefix):
+            matched_sets.append(self.postings[self.sorted_tokens[position]])
+            position += 1
+        if len(matched_sets) == 1:
+            return matched_sets[0]
+        return set().union(*matched_sets)
+
+    def search(self, query: str) -> List[Transaction]:
+        """
+        Các giao dịch khớp mọi từ trong query (mỗi từ khớp theo tiền tố, không phân biệt dấu).
+        Trả về theo thứ tự được thêm vào chỉ mục. Query rỗng trả về danh sách rỗng.
+        """
+        query_tokens = tokenize_search_text(query)
+        if len(query_tokens) == 0:
+            return []
+
+        # Giao từ tập nhỏ nhất trước để các tập trung gian luôn nhỏ.
+        candidate_sets = sorted((self.find_prefix(token) for token in set(query_tokens)), key=len)
+        matched = set(candidate_sets[0])
+        for candidate_set in candidate_sets[1:]:
+            if len(matched) == 0:
+                break
+            matched &= candidate_set
+        return [self.transactions[number] for number in sorted(matched)]
@@ -0,0 +1,58 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+
+from src.core.models import Transaction, get_transaction_time_key
+
+
+class TransactionTimeIndex:
+    """
+    Danh sách giao dịch xếp theo thời gian tăng dần (cũ trước, mới sau),
+    kèm mảng số nguyên timestamps song song để tìm theo thời gian bằng bisect.
+    Giao dịch cùng thời điểm giữ thứ tự được thêm vào.
+    """
+
+    def __init__(self, transactions: Optional[List[Transaction]] = None):
+        if not transactions:
+            # Chỉ mục rỗng được tạo rất nhiều (mỗi tài khoản mới một cái), nên bỏ qua bước sắp xếp.
+            self.transactions: List[Transaction] = []
+            self.timestamps = array("q")
+            return
+        # Dữ liệu đọc từ file gần như đã đúng thứ tự thời gian, nên sắp xếp lại chỉ tốn O(n).
+        self.transactions = sorted(transactions, key=get_transaction_time_key)
+        self.timestamps = array("q", [get_transaction_time_key(transaction) for transaction in self.transactions])
+
+    def __len__(self) -> int:
+        return len(self.transactions)
+
+    def add(self, transaction: Transaction) -> None:
+        time_key = get_transaction_time_key(transaction)
+        if len(self.timestamps) == 0 or self.timestamps[-1] <= time_key:
+            self.transactions.append(transaction)
+            self.timestamps.append(time_key)
+            return
+        # Đồng hồ máy bị chỉnh lùi: chèn vào sau các giao dịch cùng thời điểm.
+        position = bisect_right(self.timestamps, time_key)
+        self.transactions.insert(position, transaction)
+        self.timestamps.insert(position, time_key)
+
+    def extend(self, transactions: List[Transaction]) -> None:
+        """Thêm cả khối giao dịch (lô, chi lương). Khối đã theo thứ tự thời gian và không lùi so với cuối chỉ mục thì nối một lần."""
+        time_keys = [get_transaction_time_key(transaction) for transaction in transactions]
+        is_ordered = all(time_keys[index] <= time_keys[index + 1] for index in range(len(time_keys) - 1))
+        if is_ordered and (len(self.timestamps) == 0 or len(time_keys) == 0 or self.timestamps[-1] <= time_keys[0]):
+            self.transactions.extend(transactions)
+            self.timestamps.extend(time_keys)
+            return
+        for transaction in transactions:
+            self.add(transaction)
+
+    def find_after(self, time_key: int) -> int:
+        """Vị trí đầu tiên có thời gian lớn hơn time_key."""
+        return bisect_right(self.timestamps, time_key)
+
+    def find_range(self, start_key: Optional[int], end_key: Optional[int]) -> Tuple[int, int]:
+        """Khoảng vị trí [đầu, cuối) của các giao dịch có start_key <= thời gian <= end_key (None = không giới hạn)."""
+        low = 0 if start_key is None else bisect_left(self.timestamps, start_key)
+        high = len(self.timestamps) if end_key is None else bisect_right(self.timestamps, end_key)
+        return low, max(low, high)
@@ -0,0 +1,132 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.core.models import Transaction, get_transaction_time_key
+from src.core.transaction_index import TransactionTimeIndex
+
+
+@dataclass
+class TransactionQuery:
+    """
+    Bộ lọc lịch sử giao dịch của một tài khoản. Trường để trống (rỗng / None) nghĩa là không lọc theo trường đó.
+    - transaction_types: các loại giao dịch được nhận (DEPOSIT, WITHDRAW, ...)
+    - min_amount / max_amount: khoảng số tiền (tính cả hai đầu)
+    - counterparty_id: tài khoản đối ứng của giao dịch chuyển khoản
+    - start_time / end_time: khoảng thời gian (xem BankService.read_time_range)
+    - keyword: từ khóa tìm trong chỉ mục tìm kiếm (xem TransactionSearchIndex)
+    """
+    account_id: str
+    transaction_types: Tuple[str, ...] = ()
+    min_amount: Optional[int] = None
+    max_amount: Optional[int] = None
+    counterparty_id: str = ""
+    start_time: str = ""
+    end_time: str = ""
+    keyword: str = ""
+
+    def has_filters(self) -> bool:
+        """Có điều kiện nào ngoài khoảng thời gian hay không (chỉ lọc thời gian thì phân trang thẳng trên chỉ mục)."""
+        return (
+            len(self.transaction_types) > 0
+            or self.min_amount is not None
+            or self.max_amount is not None
+            or self.counterparty_id.strip() != ""
+            or self.keyword.strip() != ""
+        )
+
+
+def get_counterparty_id(transaction: Transaction, account_id: str) -> Optional[str]:
+    """Tài khoản ở phía bên kia của giao dịch (None với nạp / rút / tiết kiệm)."""
+    if transaction.to_account_id == account_id:
+        return transaction.from_account_id
+    return transaction.to_account_id
+
+
+def get_history_order_key(transaction: Transaction) -> Tuple[int, int]:
+    """
+    Khóa sắp xếp đúng như thứ tự trong lịch sử: theo thời gian, cùng thời điểm thì theo thứ tự ghi nhận
+    (số thứ tự trong mã giao dịch luôn tăng dần theo thứ tự ghi nhận).
+    """
+    number = transaction.number if transaction.number is not None else -1
+    return get_transaction_time_key(transaction), number
+
+
+class AccountQueryIndexes:
+    """
+    Các chỉ mục phụ của một tài khoản cho TransactionQuery: theo loại, theo tài khoản đối ứng
+    (mỗi nhóm là một TransactionTimeIndex nên lọc được thêm khoảng thời gian) và theo số tiền.
+    """
+
+    def __init__(self, account_id: str, transactions: List[Transaction]):
+        self.account_id = str(account_id)
+        type_histories: Dict[str, List[Transaction]] = {}
+        counterparty_histories: Dict[str, List[Transaction]] = {}
+        for transaction in transactions:
+            type_histories.setdefault(transaction.transaction_type, []).append(transaction)
+            counterparty_id = get_counterparty_id(transaction, self.account_id)
+            if counterparty_id is not None:
+                counterparty_histories.setdefault(counterparty_id, []).append(transaction)
+
+        self.by_type = {key: TransactionTimeIndex(history) for key, history in type_histories.items()}
+        self.by_counterparty = {key: TransactionTimeIndex(history) for key, history in counterparty_histories.items()}
+        # Sắp xếp ổn định: cùng số tiền thì giữ thứ tự thời gian.
+        self.by_amount: List[Transaction] = sorted(transactions, key=lambda transaction: transaction.amount)
+        self.amounts = array("q", [transaction.amount for transaction in self.by_amount])
+
+    def add(self, transaction: Transaction) -> None:
+        self.by_type.setdefault(transaction.transaction_type, TransactionTimeIndex()).add(transaction)
+        counterparty_id = get_counterparty_id(transaction, self.account_id)
+        if counterparty_id is not None:
+            self.by_counterparty.setdefault(counterparty_id, TransactionTimeIndex()).add(transaction)
+        position = bisect_right(self.amounts, transaction.amount)
+        self.amounts.insert(position, transaction.amount)
+        self.by_amount.insert(position, transaction)
+
+    def extend(self, transactions: List[Transaction]) -> None:
+        """Thêm cả khối giao dịch: mỗi nhóm nối một lần, danh sách theo số tiền được xếp lại một lần."""
+        type_histories: Dict[str, List[Transaction]] = {}
+        counterparty_histories: Dict[str, List[Transaction]] = {}
+        for transaction in transactions:
+            type_histories.setdefault(transaction.transaction_type, []).append(transaction)
+            counterparty_id = get_counterparty_id(transaction, self.account_id)
+            if counterparty_id is not None:
+                counterparty_histories.setdefault(counterparty_id, []).append(transaction)
+        for key, history in type_histories.items():
+            self.by_type.setdefault(key, TransactionTimeIndex()).extend(history)
+        for key, history in counterparty_histories.items():
+            self.by_counterparty.setdefault(key, TransactionTimeIndex()).extend(history)
+        # Sắp xếp ổn định: giao dịch mới đứng sau giao dịch cũ cùng số tiền, giống như add.
+        self.by_amount = sorted(self.by_amount + transactions, key=lambda transaction: transaction.amount)
+        self.amounts = array("q", [transaction.amount for transaction in self.by_amount])
+
+    def find_amount_range(self, min_amount: Optional[int], max_amount: Optional[int]) -> Tuple[int, int]:
+        """Khoảng vị trí [đầu, cuối) trong by_amount của các giao dịch có min_amount <= số tiền <= max_amount."""
+        low = 0 if min_amount is None else bisect_left(self.amounts, min_amount)
+        high = len(self.amounts) if max_amount is None else bisect_right(self.amounts, max_amount)
+        return low, max(low, high)
+
+
+def matches_transaction_query(
+    query: TransactionQuery,
+    transaction: Transaction,
+    start_key: Optional[int],
+    end_key: Optional[int],
+) -> bool:
+    """Kiểm tra các điều kiện có cấu trúc (không gồm keyword, phần này đối chiếu bằng chỉ mục tìm kiếm)."""
+    if len(query.transaction_types) > 0 and transaction.transaction_type not in query.transaction_types:
+        return False
+    if query.min_amount is not None and transaction.amount < query.min_amount:
+        return False
+    if query.max_amount is not None and transaction.amount > query.max_amount:
+        return False
+    counterparty_text = query.counterparty_id.strip()
+    if counterparty_text != "" and get_counterparty_id(transaction, str(query.account_id)) != counterparty_text:
+        return False
+    time_key = get_transaction_time_key(transaction)
+    if start_key is not None and time_key < start_key:
+        return False
+    if end_key is not None and time_key > end_key:
+        return False
+    return True
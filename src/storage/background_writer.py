@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class BackgroundWriter:
+    """
+    Luồng ghi dữ liệu nền cho giao diện Tk:
+    - Luồng giao diện chỉ lấy ra các bản ghi thay đổi (và bản chụp khi cần checkpoint) rồi gửi vào hàng đợi.
+    - Luồng nền gom các yêu cầu lưu đến sát nhau thành một lần ghi, rồi gọi storage.persist_changes.
+    - Kết quả (thành công / lỗi) được đưa vào hàng đợi kết quả để giao diện đọc và hiện lên thanh trạng thái.
+    """
+
+    def __init__(self, storage, coalesce_delay_ms: int = 150):
+        self.storage = storage
+        self.coalesce_delay_seconds = max(int(coalesce_delay_ms), 0) / 1000
+
+        self.condition = threading.Condition()
+        # Nhiều luồng cùng gọi request_save (máy chủ HTTP): lấy bản ghi và đưa vào hàng đợi phải liền một mạch,
+        # để bản ghi vào hàng đợi đúng thứ tự seq.
+        self.request_lock = threading.Lock()
+        self.pending_records: List[Dict[str, Any]] = []
+        self.pending_snapshot: Optional[Dict[str, Any]] = None
+        self.pending_request_count = 0
+        self.is_writing = False
+        self.is_closing = False
+        self.results: "queue.Queue[Tuple[bool, str]]" = queue.Queue()
+
+        self.thread = threading.Thread(target=self.run, name="bank-writer")
+        self.thread.start()
+
+    def request_save(self, bank_service) -> None:
+        """
+        Gọi từ luồng giao diện. Việc lấy bản ghi / dựng bản chụp làm ở đây vì chỉ luồng giao diện
+        được đụng vào bank_service; phần ghi file nặng để luồng nền làm.
+        """
+        with self.request_lock:
+            records = bank_service.take_journal_records()
+            snapshot = None
+            with self.condition:
+                need_snapshot = self.pending_snapshot is None and self.storage.should_checkpoint_at(
+                    int(bank_service.bank_data.get("journal_seq", 0))
+                )
+            if need_snapshot:
+                snapshot = bank_service.build_snapshot_fragments()
+
+            with self.condition:
+                self.pending_records.extend(records)
+                if snapshot is not None:
+                    self.pending_snapshot = snapshot
+                self.pending_request_count += 1
+                self.condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.pending_request_count == 0 and not self.is_closing:
+                    self.condition.wait()
+                if self.pending_request_count == 0 and self.is_closing:
+                    return
+
+            # Chờ thêm một chút để gom các lần lưu liên tiếp thành một lần ghi.
+            if not self.is_closing and self.coalesce_delay_seconds > 0:
+                time.sleep(self.coalesce_delay_seconds)
+
+            with self.condition:
+                records = self.pending_records
+                snapshot = self.pending_snapshot
+                request_count = self.pending_request_count
+                self.pending_records = []
+                self.pending_snapshot = None
+                self.pending_request_count = 0
+                self.is_writing = True
+
+            try:
+                self.storage.persist_changes(records, snapshot)
+                if request_count > 1:
+                    self.results.put((True, f"Đã lưu dữ liệu (gộp {request_count} lần lưu)."))
+                else:
+                    self.results.put((True, "Đã lưu dữ liệu."))
+                # Lỗi của việc ghi chạy ngoài luồng này (checkpoint nền, commit theo hẹn giờ) cũng báo lên giao diện.
+                error = self.storage.take_last_error()
+                if error is not None:
+                    self.results.put((False, f"Lưu dữ liệu thất bại: {error}"))
+            except Exception as error:
+                # Trả các bản ghi chưa lưu được về hàng đợi để lần lưu sau thử lại.
+                with self.condition:
+                    self.pending_records = records + self.pending_records
+                self.results.put((False, f"Lưu dữ liệu thất bại: {error}"))
+            finally:
+                with self.condition:
+                    self.is_writing = False
+                    self.condition.notify_all()
+
+    def take_results(self) -> List[Tuple[bool, str]]:
+        """Lấy các kết quả ghi đã có (gọi từ luồng giao diện, không bị chặn)."""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def close(self) -> None:
+        """Ghi nốt các yêu cầu còn lại rồi dừng luồng nền (chờ cho tới khi xong)."""
+        with self.condition:
+            self.is_closing = True
+            self.condition.notify_all()
+        self.thread.join()
+
+        # Còn bản ghi từ lần ghi lỗi trước đó: thử ghi lần cuối ngay tại đây.
+        if len(self.pending_records) > 0:
+            records = self.pending_records
+            self.pending_records = []
+            self.storage.persist_changes(records)
@@ -0,0 +1,225 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.storage.group_commit import GroupCommitPolicy
+from src.storage.json_storage import (
+    append_journal_records,
+    build_snapshot_fragments_from_data,
+    compact_journal,
+    get_journal_path,
+    install_checkpoint,
+    load_checkpoint_and_journal,
+    prepare_checkpoint,
+    sync_file,
+    write_checkpoint,
+)
+
+
+DEFAULT_CHECKPOINT_RECORDS = 1000
+DEFAULT_CHECKPOINT_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_REPLAY_RECORDS = 10000
+
+
+class CheckpointManager:
+    """
+    Quản lý việc lưu dữ liệu theo kiểu journal + checkpoint:
+    - Mỗi lần lưu chỉ ghi nối tiếp các thay đổi vào journal.
+    - Khi journal vượt ngưỡng số bản ghi hoặc dung lượng, ghi một bản chụp mới ở luồng nền
+      rồi cắt bớt journal, chỉ giữ phần đuôi phía sau bản chụp trước đó.
+    - max_replay_records là trần số bản ghi chưa được checkpoint. Khi chạm trần,
+      checkpoint được ghi ngay, nên thời gian khởi động không tăng theo lịch sử.
+    - commit_policy quyết định khi nào fsync journal (mỗi N bản ghi hoặc mỗi T mili giây).
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        checkpoint_records: int = DEFAULT_CHECKPOINT_RECORDS,
+        checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+        max_replay_records: int = DEFAULT_MAX_REPLAY_RECORDS,
+        commit_policy: Optional[GroupCommitPolicy] = None,
+    ):
+        self.file_path = file_path
+        self.checkpoint_records = int(checkpoint_records)
+        self.checkpoint_bytes = int(checkpoint_bytes)
+        self.max_replay_records = max(int(max_replay_records), 1)
+
+        # Khóa bảo vệ file journal: ghi nối tiếp và cắt bớt không được chạy chồng lên nhau.
+        self.journal_lock = threading.Lock()
+        self.checkpoint_thread: Optional[threading.Thread] = None
+        self.commit_policy = commit_policy if commit_policy is not None else GroupCommitPolicy()
+        self.commit_timer: Optional[threading.Timer] = None
+
+        self.checkpoint_seq = 0
+        self.previous_checkpoint_seq = 0
+        self.last_appended_seq = 0
+        self.bytes_since_checkpoint = 0
+        self.last_error: Optional[str] = None
+
+    def load(self, lazy_transactions: bool = False) -> Dict[str, Any]:
+        """
+        Đọc checkpoint mới nhất + phần đuôi journal. Nếu phần đuôi quá dài thì checkpoint ngay.
+        lazy_transactions=True: giao dịch cũ nằm yên trong file bản chụp (SnapshotTransactionSource).
+        """
+        data, snapshot_seq, replayed_count = load_checkpoint_and_journal(self.file_path, lazy_transactions)
+        self.checkpoint_seq = int(snapshot_seq)
+        self.previous_checkpoint_seq = int(snapshot_seq)
+        self.last_appended_seq = int(data.get("journal_seq", 0))
+        self.bytes_since_checkpoint = 0
+
+        if replayed_count >= self.max_replay_records:
+            # Dữ liệu đã đọc xong, checkpoint lỗi không làm hỏng lần mở này: báo ở lần persist đầu tiên.
+            self.try_run_checkpoint(build_snapshot_fragments_from_data(data), 0)
+        return data
+
+    def get_pending_replay_records(self) -> int:
+        """Số bản ghi journal phải áp lại nếu khởi động ngay lúc này."""
+        return max(self.last_appended_seq - self.checkpoint_seq, 0)
+
+    def is_checkpoint_running(self) -> bool:
+        return self.checkpoint_thread is not None and self.checkpoint_thread.is_alive()
+
+    def should_checkpoint(self) -> bool:
+        if self.get_pending_replay_records() >= self.checkpoint_records:
+            return True
+        return self.bytes_since_checkpoint >= self.checkpoint_bytes
+
+    def append_records(self, records: List[Dict[str, Any]]) -> None:
+        """Ghi nối tiếp các bản ghi vào journal (an toàn khi checkpoint nền đang chạy)."""
+        if len(records) == 0:
+            return
+        with self.journal_lock:
+            written_bytes = append_journal_records(self.file_path, records)
+            self.last_appended_seq = max(self.last_appended_seq, int(records[-1]["seq"]))
+            self.bytes_since_checkpoint += written_bytes
+
+            self.commit_policy.add_operations(len(records))
+            if self.commit_policy.is_commit_due():
+                self.sync_journal()
+            elif self.commit_policy.max_delay_ms > 0 and self.commit_timer is None:
+                self.commit_timer = threading.Timer(self.commit_policy.get_delay_seconds(), self.flush)
+                self.commit_timer.daemon = True
+                self.commit_timer.start()
+
+    def sync_journal(self) -> None:
+        """fsync journal một lần cho cả nhóm bản ghi đang chờ. Chỉ gọi khi đang giữ journal_lock."""
+        sync_file(get_journal_path(self.file_path))
+        self.commit_policy.mark_committed()
+        if self.commit_timer is not None:
+            self.commit_timer.cancel()
+            self.commit_timer = None
+
+    def flush(self) -> None:
+        """Đồng bộ ngay các bản ghi journal chưa được fsync."""
+        with self.journal_lock:
+            if self.commit_policy.has_pending():
+                self.sync_journal()
+            self.commit_timer = None
+
+    def persist(self, bank_service) -> None:
+        """
+        Lưu các thay đổi mới của bank_service.
+        Bản chụp cho checkpoint được tạo ngay tại luồng gọi hàm (luồng đang sở hữu bank_service),
+        còn việc ghi file nặng thì chạy ở luồng nền.
+        Checkpoint nền lần trước bị lỗi thì báo lỗi ngay tại đây, trước khi lấy bản ghi mới
+        (các thay đổi vẫn nằm trong bank_service để lần lưu sau ghi tiếp).
+        """
+        error = self.take_last_error()
+        if error is not None:
+            raise OSError(f"Ghi checkpoint thất bại: {error}")
+        self.append_records(bank_service.take_journal_records())
+
+        if self.get_pending_replay_records() >= self.max_replay_records:
+            # Chạm trần: chờ checkpoint nền (nếu có), nếu vẫn còn vượt trần thì ghi ngay.
+            self.wait()
+            if self.get_pending_replay_records() >= self.max_replay_records:
+                self.run_checkpoint(bank_service.build_snapshot_fragments(), self.bytes_since_checkpoint)
+            return
+
+        if self.should_checkpoint() and not self.is_checkpoint_running():
+            self.start_checkpoint(bank_service.build_snapshot_fragments())
+
+    def should_checkpoint_at(self, journal_seq: int) -> bool:
+        """
+        Dùng cho luồng ghi nền: với journal_seq hiện tại của bank_service,
+        có cần chụp bản mới (sau khi các bản ghi đang chờ được ghi xong) hay không.
+        """
+        if self.is_checkpoint_running():
+            return False
+        if int(journal_seq) - self.checkpoint_seq >= self.checkpoint_records:
+            return True
+        return self.bytes_since_checkpoint >= self.checkpoint_bytes
+
+    def persist_changes(self, records: List[Dict[str, Any]], snapshot: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Ghi các bản ghi đã lấy sẵn từ bank_service, rồi ghi checkpoint ngay tại luồng gọi (nếu có snapshot).
+        Không đụng tới bank_service nên an toàn khi gọi từ luồng ghi nền.
+        Checkpoint lỗi thì ném lỗi ra; các bản ghi đã nằm trong journal, nếu người gọi ghi lại thì load bỏ qua theo seq.
+        """
+        self.append_records(records)
+        if snapshot is not None:
+            self.wait()
+            self.run_checkpoint(snapshot, self.bytes_since_checkpoint)
+
+    def take_last_error(self) -> Optional[str]:
+        """Lấy (và xóa) lỗi của checkpoint chạy ở luồng nền hoặc lúc load, None nếu không có."""
+        error = self.last_error
+        self.last_error = None
+        return error
+
+    def start_checkpoint(self, snapshot: Dict[str, Any]) -> None:
+        """Ghi checkpoint ở luồng nền từ bản chụp dạng chuỗi JSON (BankService.build_snapshot_fragments)."""
+        self.checkpoint_thread = threading.Thread(
+            target=self.try_run_checkpoint,
+            args=(snapshot, self.bytes_since_checkpoint),
+            name="bank-checkpoint",
+        )
+        self.checkpoint_thread.start()
+
+    def run_checkpoint(self, snapshot: Dict[str, Any], covered_bytes: int) -> None:
+        """
+        Ghi bản chụp rồi cắt journal.
+        Journal vẫn giữ các bản ghi sau checkpoint thế hệ trước, để nếu bản chụp mới bị hỏng
+        thì load vẫn khôi phục được từ file .prev.
+        Lỗi được ném ra cho người gọi.
+        """
+        snapshot_seq = int(snapshot["header"]["journal_seq"])
+        stored_transactions = snapshot.get("stored_transactions")
+        if stored_transactions is None:
+            write_checkpoint(self.file_path, snapshot)
+        else:
+            # Ghi file tạm không cần chặn người đọc lịch sử; chỉ lúc đổi tên file và chuyển nguồn đọc lười
+            # sang file mới mới phải chờ các lượt đọc đang mở xong.
+            transactions_offset, line_count, stored_size = prepare_checkpoint(self.file_path, snapshot)
+            with stored_transactions.replacing_snapshot():
+                install_checkpoint(self.file_path)
+                stored_transactions.relocate(self.file_path, transactions_offset, line_count, stored_size)
+        with self.journal_lock:
+            # compact_journal ghi lại journal kèm fsync, nên nhóm bản ghi đang chờ cũng đã an toàn.
+            compact_journal(self.file_path, self.checkpoint_seq)
+            self.commit_policy.mark_committed()
+            self.previous_checkpoint_seq = self.checkpoint_seq
+            self.checkpoint_seq = snapshot_seq
+            self.bytes_since_checkpoint = max(self.bytes_since_checkpoint - int(covered_bytes), 0)
+
+    def try_run_checkpoint(self, snapshot: Dict[str, Any], covered_bytes: int) -> None:
+        # Dùng cho checkpoint nền và checkpoint lúc load, khi không có ai nhận lỗi: giữ lại trong last_error,
+        # lần persist sau (hoặc luồng ghi nền qua take_last_error) sẽ báo ra.
+        try:
+            self.run_checkpoint(snapshot, covered_bytes)
+        except Exception as error:
+            self.last_error = str(error)
+
+    def wait(self) -> None:
+        """Chờ checkpoint nền (nếu có) chạy xong."""
+        thread = self.checkpoint_thread
+        if thread is not None:
+            thread.join()
+        self.checkpoint_thread = None
+
+    def close(self, bank_service=None) -> None:
+        """Lưu nốt thay đổi còn lại (nếu có) và chờ mọi việc ghi nền kết thúc."""
+        if bank_service is not None:
+            self.append_records(bank_service.take_journal_records())
+        self.wait()
+        self.flush()
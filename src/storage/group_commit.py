@@ -0,0 +1,43 @@
+import time
+from typing import Optional
+
+
+class GroupCommitPolicy:
+    """
+    Chính sách gom nhiều thao tác rồi mới fsync / commit một lần:
+    - max_operations: đủ N thao tác chưa được đồng bộ thì đồng bộ ngay.
+    - max_delay_ms: thao tác chưa đồng bộ lâu nhất không được chờ quá T mili giây (0 = không giới hạn theo thời gian).
+    Mặc định max_operations=1 nghĩa là mỗi lần lưu đều fsync (an toàn nhất).
+    """
+
+    def __init__(self, max_operations: int = 1, max_delay_ms: int = 0):
+        self.max_operations = max(int(max_operations), 1)
+        self.max_delay_ms = max(int(max_delay_ms), 0)
+        self.pending_operations = 0
+        self.first_pending_time: Optional[float] = None
+
+    def add_operations(self, operation_count: int) -> None:
+        if operation_count <= 0:
+            return
+        if self.pending_operations == 0:
+            self.first_pending_time = time.monotonic()
+        self.pending_operations += int(operation_count)
+
+    def has_pending(self) -> bool:
+        return self.pending_operations > 0
+
+    def get_delay_seconds(self) -> float:
+        return self.max_delay_ms / 1000
+
+    def is_commit_due(self) -> bool:
+        if self.pending_operations == 0:
+            return False
+        if self.pending_operations >= self.max_operations:
+            return True
+        if self.max_delay_ms > 0 and self.first_pending_time is not None:
+            return time.monotonic() - self.first_pending_time >= self.get_delay_seconds()
+        return False
+
+    def mark_committed(self) -> None:
+        self.pending_operations = 0
+        self.first_pending_time = None
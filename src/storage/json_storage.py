@@ -1,69 +1,631 @@
 import json
 import os
-from typing import Dict, Any
+from array import array
+from itertools import chain, islice
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from src.core.models import BATCH_OPERATION_TRANSACTION_TYPES, TRANSACTION_ID_PREFIX, Account, SavingDeposit, Transaction, encode_json_text
+from src.storage.json_stream import iter_snapshot_items
+from src.storage.transaction_source import (
+    SnapshotIndex,
+    SnapshotTransactionSource,
+    get_fragment_account_ids,
+    get_snapshot_index_path,
+    write_snapshot_index,
+)
 
 
 DEFAULT_BANK_DATA = {
     "next_account_id": 100001,
     "next_transaction_number": 1,
     "next_saving_deposit_number": 1,
+    "journal_seq": 0,
     "accounts": [],
     "transactions": [],
     "saving_deposits": [],
 }
 
 
+SNAPSHOT_HEADER_KEYS = ["next_account_id", "next_transaction_number", "next_saving_deposit_number", "journal_seq"]
+
+
+def create_default_bank_data() -> Dict[str, Any]:
+    """Tạo một bản dữ liệu mặc định mới (không dùng chung list với DEFAULT_BANK_DATA)."""
+    data = dict(DEFAULT_BANK_DATA)
+    data["accounts"] = []
+    data["transactions"] = []
+    data["saving_deposits"] = []
+    return data
+
+
 def ensure_folder_exists(file_path: str) -> None:
     folder_path = os.path.dirname(file_path)
     if folder_path and not os.path.exists(folder_path):
         os.makedirs(folder_path, exist_ok=True)
 
 
-def load_bank_data(file_path: str) -> Dict[str, Any]:
+def get_journal_path(file_path: str) -> str:
+    """File journal nằm cạnh file dữ liệu, ví dụ: data/bank_data.json.journal"""
+    return file_path + ".journal"
+
+
+def get_previous_checkpoint_path(file_path: str) -> str:
+    """Bản chụp (checkpoint) thế hệ trước, giữ lại để dự phòng khi bản mới nhất bị lỗi."""
+    return file_path + ".prev"
+
+
+def read_snapshot_file(file_path: str) -> Dict[str, Any]:
     """
-    Đọc dữ liệu ngân hàng từ file JSON.
-    - Nếu file chưa tồn tại: tạo dữ liệu mặc định.
-    - Nếu file bị lỗi: đổi tên file lỗi và tạo dữ liệu mới.
+    Đọc một file bản chụp theo luồng: mỗi phần tử của accounts / transactions / saving_deposits
+    được giải mã rồi chuyển ngay thành đối tượng Account / Transaction / SavingDeposit.
+    Không giữ cả nội dung file hay danh sách dict trung gian trong bộ nhớ.
+    Bổ sung các khóa còn thiếu. Ném lỗi nếu file hỏng.
     """
-    if not os.path.exists(file_path):
-        ensure_folder_exists(file_path)
-        save_bank_data(file_path, DEFAULT_BANK_DATA)
-        return dict(DEFAULT_BANK_DATA)
-
-    try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
+    data = create_default_bank_data()
+    model_types = {"accounts": Account, "transactions": Transaction, "saving_deposits": SavingDeposit}
 
-        for key, value in DEFAULT_BANK_DATA.items():
-            if key not in data:
+    with open(file_path, "r", encoding="utf-8") as file:
+        for key, value in iter_snapshot_items(file):
+            model_type = model_types.get(key)
+            if model_type is None:
+                data[key] = value
+            elif isinstance(data[key], list) and isinstance(value, dict):
+                data[key].append(model_type.from_dictionary(value))
+            else:
                 data[key] = value
 
-        data["next_account_id"] = int(data.get("next_account_id", 100001))
-        data["next_transaction_number"] = int(data.get("next_transaction_number", 1))
-        data["next_saving_deposit_number"] = int(data.get("next_saving_deposit_number", 1))
+    data["next_account_id"] = int(data.get("next_account_id", 100001))
+    data["next_transaction_number"] = int(data.get("next_transaction_number", 1))
+    data["next_saving_deposit_number"] = int(data.get("next_saving_deposit_number", 1))
+    data["journal_seq"] = int(data.get("journal_seq", 0))
 
-        if not isinstance(data.get("accounts"), list):
-            data["accounts"] = []
-        if not isinstance(data.get("transactions"), list):
-            data["transactions"] = []
-        if not isinstance(data.get("saving_deposits"), list):
-            data["saving_deposits"] = []
+    if not isinstance(data.get("accounts"), list):
+        data["accounts"] = []
+    if not isinstance(data.get("transactions"), list):
+        data["transactions"] = []
+    if not isinstance(data.get("saving_deposits"), list):
+        data["saving_deposits"] = []
 
-        return data
+    return data
 
-    except Exception:
+
+def read_checkpoint_file_lazily(file_path: str) -> Optional[Tuple[Dict[str, Any], int, int, Optional[SnapshotIndex]]]:
+    """
+    Đọc nhanh một file bản chụp do write_checkpoint ghi (mỗi phần tử một dòng) mà không giải mã giao dịch:
+    tài khoản và sổ tiết kiệm được dựng thành đối tượng, còn mảng transactions thì không đọc.
+    Nếu file chỉ mục đi kèm khớp với bản chụp, số dòng và độ dài mảng transactions lấy từ chỉ mục
+    và việc đọc nhảy qua cả mảng; ngược lại mới đọc lướt để đếm dòng.
+    Trả về (dữ liệu không kèm giao dịch, vị trí byte dòng giao dịch đầu tiên, số dòng giao dịch,
+    chỉ mục nếu đã dùng được). Trả về None nếu file không theo định dạng này (ví dụ file ghi bằng save_bank_data);
+    ném lỗi nếu file hỏng.
+    """
+    model_types = {"accounts": Account, "saving_deposits": SavingDeposit}
+    data = create_default_bank_data()
+    transactions_offset = 0
+    transaction_count = 0
+    index = SnapshotIndex.read(get_snapshot_index_path(file_path), file_path)
+
+    with open(file_path, "rb") as file:
+        first_line = file.readline().strip()
+        if not first_line.startswith(b"{") or not first_line.endswith(b","):
+            return None
+        header = json.loads(first_line[:-1] + b"}")
+        for key in SNAPSHOT_HEADER_KEYS:
+            data[key] = int(header.get(key, DEFAULT_BANK_DATA[key]))
+
+        is_finished = False
+        while not is_finished:
+            line = file.readline().strip()
+            if line == b"}":
+                break
+            if not line.startswith(b'"') or not line.endswith(b":["):
+                raise ValueError("File bản chụp sai cấu trúc.")
+            key = json.loads(line[:-2])
+            if key == "transactions":
+                transactions_offset = file.tell()
+                if index is not None and index.transactions_offset == transactions_offset:
+                    # Nhảy thẳng tới dòng "]" đóng mảng; không đúng chỗ thì bỏ chỉ mục và quay lại đếm dòng.
+                    file.seek(transactions_offset + index.transactions_size)
+                    if file.readline().strip() == b"],":
+                        file.seek(transactions_offset + index.transactions_size)
+                        transaction_count = index.line_count
+                    else:
+                        file.seek(transactions_offset)
+                        index = None
+                else:
+                    index = None
+
+            while True:
+                line = file.readline().strip()
+                if line.startswith(b"]"):
+                    # Mảng cuối cùng đóng cùng dòng với cả object: "]}".
+                    is_finished = line == b"]}"
+                    break
+                if line.endswith(b","):
+                    line = line[:-1]
+                if not line.startswith(b"{") or not line.endswith(b"}"):
+                    raise ValueError("File bản chụp sai cấu trúc.")
+                if key == "transactions":
+                    transaction_count += 1
+                elif key in model_types:
+                    data[key].append(model_types[key].from_dictionary(json.loads(line)))
+
+    return data, transactions_offset, transaction_count, index
+
+
+def read_snapshot_for_load(
+    snapshot_path: str, lazy_transactions: bool
+) -> Tuple[Dict[str, Any], Optional[Tuple[int, int, Optional[SnapshotIndex]]]]:
+    """
+    Đọc một bản chụp. Ở chế độ đọc lười (và file đúng định dạng checkpoint),
+    trả kèm (vị trí byte, số dòng, chỉ mục nếu đã đọc được) của mảng giao dịch; ngược lại trả kèm None.
+    """
+    if lazy_transactions:
+        result = read_checkpoint_file_lazily(snapshot_path)
+        if result is not None:
+            data, transactions_offset, transaction_count, index = result
+            return data, (transactions_offset, transaction_count, index)
+    return read_snapshot_file(snapshot_path), None
+
+
+def load_checkpoint_and_journal(file_path: str, lazy_transactions: bool = False) -> Tuple[Dict[str, Any], int, int]:
+    """
+    Đọc bản chụp hợp lệ mới nhất rồi áp phần đuôi journal phía sau nó.
+    Trả về (dữ liệu, journal_seq của bản chụp, số bản ghi journal đã áp).
+    - lazy_transactions=True và bản chụp do write_checkpoint ghi: data["transactions"] là một
+      SnapshotTransactionSource, giao dịch cũ nằm yên trong file cho tới khi được hỏi tới.
+    - Nếu chưa có file nào: tạo dữ liệu mặc định.
+    - Nếu bản chụp mới nhất bị lỗi: đổi tên file lỗi và dùng bản chụp thế hệ trước.
+    - Nếu không còn bản chụp hợp lệ: tạo dữ liệu mới.
+    """
+    previous_path = get_previous_checkpoint_path(file_path)
+    if not os.path.exists(file_path) and not os.path.exists(previous_path):
+        ensure_folder_exists(file_path)
+        data = create_default_bank_data()
+        # Ghi ngay theo định dạng checkpoint để chế độ đọc lười dùng được từ lần mở sau.
+        write_checkpoint(file_path, build_snapshot_fragments_from_data(data))
+        repair_journal_tail(file_path)
+        replayed_count = replay_journal(file_path, data)
+        return data, 0, replayed_count
+
+    for snapshot_path in [file_path, previous_path]:
+        if not os.path.exists(snapshot_path):
+            continue
         try:
-            os.replace(file_path, file_path + ".broken")
+            data, transactions_span = read_snapshot_for_load(snapshot_path, lazy_transactions)
         except Exception:
-            pass
+            if snapshot_path == file_path:
+                try:
+                    os.replace(file_path, file_path + ".broken")
+                except Exception:
+                    pass
+            continue
 
-        ensure_folder_exists(file_path)
-        save_bank_data(file_path, DEFAULT_BANK_DATA)
-        return dict(DEFAULT_BANK_DATA)
+        snapshot_seq = int(data["journal_seq"])
+        repair_journal_tail(file_path)
+        replayed_count = replay_journal(file_path, data)
+        if transactions_span is not None:
+            # Giao dịch áp từ journal nằm trong data["transactions"], là phần đuôi sau các dòng trong file.
+            data["transactions"] = SnapshotTransactionSource(
+                snapshot_path, transactions_span[0], transactions_span[1], data["transactions"], transactions_span[2]
+            )
+        return data, snapshot_seq, replayed_count
+
+    # Journal chỉ có nghĩa khi đi kèm bản chụp của nó, nên cất đi cùng file lỗi.
+    try:
+        os.replace(get_journal_path(file_path), get_journal_path(file_path) + ".broken")
+    except Exception:
+        pass
+
+    ensure_folder_exists(file_path)
+    data = create_default_bank_data()
+    write_checkpoint(file_path, build_snapshot_fragments_from_data(data))
+    return data, 0, 0
+
+
+def load_bank_data(file_path: str, lazy_transactions: bool = False) -> Dict[str, Any]:
+    """
+    Đọc dữ liệu ngân hàng từ file JSON.
+    Các danh sách accounts / transactions / saving_deposits chứa sẵn đối tượng model,
+    BankService nhận trực tiếp mà không cần chuyển đổi lại.
+    - Nếu file chưa tồn tại: tạo dữ liệu mặc định.
+    - Nếu file bị lỗi: đổi tên file lỗi, dùng bản chụp trước đó hoặc tạo dữ liệu mới.
+    - Sau khi đọc bản chụp, áp tiếp các thay đổi còn nằm trong file journal.
+    - lazy_transactions=True: không dựng giao dịch cũ (xem load_checkpoint_and_journal).
+    """
+    data, _snapshot_seq, _replayed_count = load_checkpoint_and_journal(file_path, lazy_transactions)
+    return data
 
 
 def save_bank_data(file_path: str, data: Dict[str, Any]) -> None:
-    """Ghi dữ liệu ngân hàng ra file JSON."""
+    """
+    Ghi dữ liệu ngân hàng ra file JSON một cách an toàn:
+    ghi ra file tạm, fsync, rồi mới thay thế file cũ (os.replace).
+    Nếu mất điện giữa chừng, file cũ vẫn còn nguyên vẹn.
+    """
+    write_json_file_atomically(file_path, data, indent=2)
+
+
+def sync_folder(folder_path: str) -> None:
+    """fsync thư mục để việc đổi tên file cũng được ghi xuống đĩa (bỏ qua nếu hệ điều hành không hỗ trợ)."""
+    try:
+        folder_fd = os.open(folder_path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(folder_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(folder_fd)
+
+
+def sync_file(file_path: str) -> None:
+    """fsync một file đã ghi trước đó (kể cả khi được ghi qua một lần mở file khác)."""
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, "rb+") as file:
+        os.fsync(file.fileno())
+
+
+def convert_model_to_dictionary(item: Any) -> Dict[str, Any]:
+    """Cho phép json.dump ghi trực tiếp các đối tượng model (Account, Transaction, SavingDeposit)."""
+    if hasattr(item, "to_dictionary"):
+        return item.to_dictionary()
+    raise TypeError(f"Không ghi được kiểu dữ liệu {type(item).__name__} ra JSON.")
+
+
+def write_json_file_atomically(file_path: str, data: Dict[str, Any], indent: Optional[int] = None) -> None:
+    """Ghi JSON ra file tạm + fsync, rồi os.replace vào vị trí chính."""
     ensure_folder_exists(file_path)
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=2)
+    temp_path = file_path + ".tmp"
+    separators = None if indent is not None else (",", ":")
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=indent, separators=separators, default=convert_model_to_dictionary)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, file_path)
+    sync_folder(os.path.dirname(file_path))
+
+
+# -------------------------
+# Journal: ghi nối tiếp từng thay đổi
+# -------------------------
+def append_journal_records(file_path: str, records: List[Dict[str, Any]], sync: bool = False) -> int:
+    """
+    Ghi nối tiếp các bản ghi thay đổi vào file journal, mỗi dòng một bản ghi JSON gọn.
+    Chi phí chỉ phụ thuộc số thay đổi, không phụ thuộc kích thước cả ngân hàng.
+    sync=True: fsync ngay sau khi ghi. Trả về số byte đã ghi.
+    """
+    if len(records) == 0:
+        return 0
+    ensure_folder_exists(file_path)
+    lines = [encode_json_text(record) for record in records]
+    text = "\n".join(lines) + "\n"
+    with open(get_journal_path(file_path), "a", encoding="utf-8") as file:
+        file.write(text)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    return len(text.encode("utf-8"))
+
+
+def repair_journal_tail(file_path: str) -> None:
+    """
+    Cắt bỏ dòng cuối bị ghi dở (không kết thúc bằng xuống dòng) sau khi mất điện,
+    để các bản ghi ghi tiếp về sau không nằm sau một dòng hỏng.
+    """
+    journal_path = get_journal_path(file_path)
+    if not os.path.exists(journal_path):
+        return
+
+    with open(journal_path, "rb+") as file:
+        file.seek(0, os.SEEK_END)
+        file_size = file.tell()
+        if file_size == 0:
+            return
+        file.seek(file_size - 1)
+        if file.read(1) == b"\n":
+            return
+
+        position = file_size
+        keep_size = 0
+        while position > 0:
+            chunk_start = max(position - 65536, 0)
+            file.seek(chunk_start)
+            chunk = file.read(position - chunk_start)
+            newline_index = chunk.rfind(b"\n")
+            if newline_index >= 0:
+                keep_size = chunk_start + newline_index + 1
+                break
+            position = chunk_start
+
+        file.truncate(keep_size)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_record_seq(line: str) -> int:
+    """
+    Đọc nhanh số seq ở đầu dòng journal (dạng {"seq":123,...}) mà không cần parse cả dòng.
+    Trả về -1 nếu dòng không theo mẫu này.
+    """
+    prefix = '{"seq":'
+    if not line.startswith(prefix):
+        return -1
+    end_index = line.find(",", len(prefix))
+    seq_text = line[len(prefix):end_index]
+    if end_index < 0 or not seq_text.isdigit():
+        return -1
+    return int(seq_text)
+
+
+def read_journal_records(file_path: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+    """
+    Đọc các bản ghi trong file journal có seq > after_seq.
+    Các dòng cũ hơn bản chụp chỉ bị đọc lướt qua số seq, không bị parse.
+    Dừng ở dòng hỏng đầu tiên (thường là dòng cuối bị ghi dở khi mất điện).
+    """
+    journal_path = get_journal_path(file_path)
+    if not os.path.exists(journal_path):
+        return []
+
+    records = []
+    with open(journal_path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line == "":
+                continue
+            line_seq = read_record_seq(line)
+            if 0 <= line_seq <= after_seq:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not isinstance(record, dict) or "seq" not in record:
+                break
+            records.append(record)
+    return records
+
+
+def get_record_transaction_dicts(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Các giao dịch của một bản ghi journal theo thứ tự ghi nhận: giao dịch ghi đầy đủ,
+    rồi tới các giao dịch con của lần chi lương (nếu có) được dựng lại từ dạng [số tài khoản, số tiền],
+    rồi tới các giao dịch của lô (nếu có) được dựng lại từ dạng [loại thao tác, bên trừ, bên cộng, số tiền, ghi chú].
+    """
+    transaction_dicts = list(record.get("transactions", []))
+    payroll = record.get("payroll")
+    if payroll is not None:
+        number = int(payroll["first_number"])
+        for to_account_id, amount in payroll["items"]:
+            transaction_dicts.append({
+                "transaction_id": f"{TRANSACTION_ID_PREFIX}{number:08d}",
+                "transaction_type": "PAYROLL_IN",
+                "amount": int(amount),
+                "time_text": payroll["time_text"],
+                "note": payroll["parent_id"],
+                "from_account_id": None,
+                "to_account_id": to_account_id,
+            })
+            number += 1
+    batch = record.get("batch")
+    if batch is not None:
+        number = int(batch["first_number"])
+        for operation_type, from_account_id, to_account_id, amount, note in batch["items"]:
+            for transaction_type in BATCH_OPERATION_TRANSACTION_TYPES[operation_type]:
+                transaction_dicts.append({
+                    "transaction_id": f"{TRANSACTION_ID_PREFIX}{number:08d}",
+                    "transaction_type": transaction_type,
+                    "amount": int(amount),
+                    "time_text": batch["time_text"],
+                    "note": note,
+                    "from_account_id": from_account_id,
+                    "to_account_id": to_account_id,
+                })
+                number += 1
+    return transaction_dicts
+
+
+def apply_journal_record(
+    data: Dict[str, Any],
+    record: Dict[str, Any],
+    account_positions: Dict[str, int],
+    saving_positions: Dict[str, int],
+) -> None:
+    """Áp một bản ghi journal lên dữ liệu: cập nhật tài khoản / sổ, thêm giao dịch, cập nhật bộ đếm."""
+    for account_dict in record.get("accounts", []):
+        account = Account.from_dictionary(account_dict)
+        if account.account_id in account_positions:
+            data["accounts"][account_positions[account.account_id]] = account
+        else:
+            account_positions[account.account_id] = len(data["accounts"])
+            data["accounts"].append(account)
+
+    for transaction_dict in get_record_transaction_dicts(record):
+        data["transactions"].append(Transaction.from_dictionary(transaction_dict))
+
+    for saving_dict in record.get("saving_deposits", []):
+        saving_deposit = SavingDeposit.from_dictionary(saving_dict)
+        if saving_deposit.deposit_id in saving_positions:
+            data["saving_deposits"][saving_positions[saving_deposit.deposit_id]] = saving_deposit
+        else:
+            saving_positions[saving_deposit.deposit_id] = len(data["saving_deposits"])
+            data["saving_deposits"].append(saving_deposit)
+
+    for key in ["next_account_id", "next_transaction_number", "next_saving_deposit_number"]:
+        if key in record:
+            data[key] = int(record[key])
+    data["journal_seq"] = int(record["seq"])
+
+
+def replay_journal(file_path: str, data: Dict[str, Any]) -> int:
+    """
+    Áp các bản ghi journal mới hơn bản chụp (seq > journal_seq của bản chụp).
+    Trả về số bản ghi đã áp.
+    """
+    records = read_journal_records(file_path, int(data.get("journal_seq", 0)))
+    if len(records) == 0:
+        return 0
+
+    account_positions = {item.account_id: index for index, item in enumerate(data["accounts"])}
+    saving_positions = {item.deposit_id: index for index, item in enumerate(data["saving_deposits"])}
+
+    applied_count = 0
+    for record in records:
+        if int(record["seq"]) <= int(data.get("journal_seq", 0)):
+            continue
+        apply_journal_record(data, record, account_positions, saving_positions)
+        applied_count += 1
+    return applied_count
+
+
+def compact_journal(file_path: str, keep_after_seq: int) -> None:
+    """
+    Cắt bớt journal: chỉ giữ các bản ghi có seq > keep_after_seq.
+    Ghi ra file tạm rồi thay thế một lần (os.replace) để không bao giờ thấy journal dở dang.
+    """
+    journal_path = get_journal_path(file_path)
+    if not os.path.exists(journal_path):
+        return
+
+    temp_path = journal_path + ".tmp"
+    with open(journal_path, "r", encoding="utf-8") as source, open(temp_path, "w", encoding="utf-8") as target:
+        for line in source:
+            if line.strip() == "":
+                continue
+            line_seq = read_record_seq(line.strip())
+            if 0 <= line_seq <= keep_after_seq:
+                continue
+            target.write(line if line.endswith("\n") else line + "\n")
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(temp_path, journal_path)
+    sync_folder(os.path.dirname(journal_path))
+
+
+def build_snapshot_fragments_from_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Chuyển dữ liệu vừa đọc (load_bank_data) sang dạng bản chụp gồm các chuỗi JSON (giống BankService.build_snapshot_fragments)."""
+    transactions = data.get("transactions", [])
+    stored_transactions = None
+    if isinstance(transactions, SnapshotTransactionSource):
+        stored_transactions = transactions
+        transactions = []
+    transactions = [encode_json_text(item.to_dictionary()) for item in transactions]
+    return {
+        "header": {key: int(data.get(key, DEFAULT_BANK_DATA[key])) for key in SNAPSHOT_HEADER_KEYS},
+        "accounts": [encode_json_text(item.to_dictionary()) for item in data.get("accounts", [])],
+        "stored_transactions": stored_transactions,
+        "transactions": transactions,
+        "transaction_count": len(transactions),
+        "saving_deposits": [encode_json_text(item.to_dictionary()) for item in data.get("saving_deposits", [])],
+    }
+
+
+def write_fragment_list(file, key: str, fragments: Iterable[str], is_last: bool) -> None:
+    file.write(f'"{key}":[')
+    for index, fragment in enumerate(fragments):
+        file.write("\n" if index == 0 else ",\n")
+        file.write(fragment)
+    file.write("\n]" if is_last else "\n],\n")
+
+
+def write_transaction_fragments(
+    file, fragments: Iterable[str], carried_count: int, stored_count: int
+) -> Tuple[Dict[str, array], int, int]:
+    """
+    Ghi mảng transactions (giống write_fragment_list) và gom vị trí byte của từng dòng theo tài khoản,
+    tính từ dòng giao dịch đầu tiên. carried_count dòng đầu được chép y nguyên từ bản chụp trước,
+    vị trí của chúng đã có trong chỉ mục cũ nên không cần đọc lại số tài khoản.
+    Trả về (vị trí theo tài khoản, vị trí dòng thứ stored_count, vị trí dòng "]" đóng mảng).
+    """
+    offsets_by_account: Dict[str, array] = {}
+    line_offset = 0
+    stored_size = -1
+    file.write('"transactions":[')
+    for index, fragment in enumerate(fragments):
+        if index == stored_count:
+            stored_size = line_offset
+        file.write("\n" if index == 0 else ",\n")
+        file.write(fragment)
+        if index >= carried_count:
+            for account_id in get_fragment_account_ids(fragment):
+                offsets_by_account.setdefault(account_id, array("q")).append(line_offset)
+        # Dòng kế tiếp bắt đầu sau ",\n".
+        line_offset += (len(fragment) if fragment.isascii() else len(fragment.encode("utf-8"))) + 2
+    file.write("\n],\n")
+    # Dòng cuối kết thúc bằng "\n" chứ không phải ",\n".
+    transactions_size = max(line_offset - 1, 0)
+    return offsets_by_account, (transactions_size if stored_size < 0 else stored_size), transactions_size
+
+
+def prepare_checkpoint(file_path: str, snapshot: Dict[str, Any]) -> Tuple[int, int, int]:
+    """
+    Ghi bản chụp mới và file chỉ mục của nó ra file tạm (kèm fsync), chưa đụng tới bản chụp hiện tại.
+    Ghi từ các chuỗi JSON đã mã hóa sẵn (mỗi đối tượng một dòng), không phải mã hóa lại những đối tượng không đổi.
+    Nếu snapshot có "stored_transactions" (nguồn đọc lười), các giao dịch cũ được chép thẳng từ nguồn
+    rồi mới tới các giao dịch trong "transactions".
+    Trả về (vị trí byte của dòng giao dịch đầu tiên, tổng số dòng giao dịch, vị trí tính từ dòng đầu
+    nơi các giao dịch cũ kết thúc) để nguồn đọc lười chuyển sang file mới (SnapshotTransactionSource.relocate).
+    """
+    ensure_folder_exists(file_path)
+    temp_path = file_path + ".checkpoint.tmp"
+    header_text = encode_json_text(snapshot["header"])
+    transactions: Iterable[str] = islice(snapshot["transactions"], int(snapshot["transaction_count"]))
+    line_count = int(snapshot["transaction_count"])
+    stored_transactions = snapshot.get("stored_transactions")
+    carried_offsets = None
+    carried_count = 0
+    stored_count = 0
+    if stored_transactions is not None:
+        transactions = chain(stored_transactions.iter_encoded_transactions(), transactions)
+        stored_count = stored_transactions.count()
+        line_count += stored_count
+        carried_offsets = stored_transactions.snapshot.read_all_offsets()
+        carried_count = stored_transactions.snapshot.line_count
+
+    # newline="\n": luôn ghi LF để vị trí byte của từng dòng giống nhau trên mọi hệ điều hành.
+    with open(temp_path, "w", encoding="utf-8", newline="\n") as file:
+        file.write(header_text[:-1] + ",\n")
+        write_fragment_list(file, "accounts", snapshot["accounts"], False)
+        transactions_offset = file.tell() + len('"transactions":[\n')
+        offsets_by_account, stored_size, transactions_size = write_transaction_fragments(
+            file, transactions, carried_count, stored_count
+        )
+        write_fragment_list(file, "saving_deposits", snapshot["saving_deposits"], True)
+        file.write("}\n")
+        file.flush()
+        os.fsync(file.fileno())
+
+    write_snapshot_index(
+        get_snapshot_index_path(temp_path), temp_path, transactions_offset, line_count, transactions_size,
+        offsets_by_account, carried_offsets,
+    )
+    return transactions_offset, line_count, stored_size
+
+
+def install_checkpoint(file_path: str) -> None:
+    """
+    Đưa bản chụp do prepare_checkpoint ghi vào vị trí chính, giữ bản chụp hiện tại
+    (cùng chỉ mục của nó) làm thế hệ trước (.prev).
+    """
+    temp_path = file_path + ".checkpoint.tmp"
+    previous_path = get_previous_checkpoint_path(file_path)
+    if os.path.exists(file_path):
+        os.replace(file_path, previous_path)
+        if os.path.exists(get_snapshot_index_path(file_path)):
+            os.replace(get_snapshot_index_path(file_path), get_snapshot_index_path(previous_path))
+    os.replace(temp_path, file_path)
+    os.replace(get_snapshot_index_path(temp_path), get_snapshot_index_path(file_path))
+    sync_folder(os.path.dirname(file_path))
+
+
+def write_checkpoint(file_path: str, snapshot: Dict[str, Any]) -> int:
+    """
+    Ghi bản chụp mới (prepare_checkpoint) rồi đưa nó vào vị trí chính (install_checkpoint).
+    Trả về vị trí byte của dòng giao dịch đầu tiên trong file mới.
+    """
+    transactions_offset, _line_count, _stored_size = prepare_checkpoint(file_path, snapshot)
+    install_checkpoint(file_path)
+    return transactions_offset
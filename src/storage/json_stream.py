@@ -0,0 +1,104 @@
+import json
+import re
+from typing import Any, Iterator, TextIO, Tuple
+
+
+STREAMED_ARRAY_KEYS = ("accounts", "transactions", "saving_deposits")
+WHITESPACE_PATTERN = re.compile(r"[ \t\r\n]*")
+
+
+class JsonStreamReader:
+    """
+    Đọc JSON từ file theo từng khúc nhỏ (chunk), mỗi lần chỉ giải mã một giá trị.
+    Không bao giờ giữ cả nội dung file trong bộ nhớ.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = 65536):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.is_eof = False
+
+    def fill(self) -> bool:
+        """Đọc thêm một khúc vào bộ đệm, bỏ phần đã xử lý. Trả về False nếu đã hết file."""
+        chunk = self.file.read(self.chunk_size)
+        if chunk == "":
+            self.is_eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """Bỏ qua khoảng trắng và trả về ký tự kế tiếp (không tiêu thụ)."""
+        while True:
+            if self.position < len(self.buffer):
+                character = self.buffer[self.position]
+                if character not in " \t\r\n":
+                    return character
+                self.position = WHITESPACE_PATTERN.match(self.buffer, self.position).end()
+                if self.position < len(self.buffer):
+                    return self.buffer[self.position]
+            if not self.fill():
+                raise ValueError("File JSON kết thúc sớm.")
+
+    def expect(self, character: str) -> None:
+        if self.peek() != character:
+            raise ValueError(f"File JSON sai cấu trúc: cần '{character}' ở vị trí đang đọc.")
+        self.position += 1
+
+    def read_value(self) -> Any:
+        """Giải mã đúng một giá trị JSON tại vị trí hiện tại, đọc thêm file nếu giá trị bị cắt ngang khúc."""
+        self.peek()
+        while True:
+            try:
+                value, end_index = self.decoder.raw_decode(self.buffer, self.position)
+                # Số ở cuối bộ đệm có thể còn chữ số nằm ở khúc sau, nên phải đọc thêm để chắc chắn.
+                if end_index < len(self.buffer) or self.is_eof:
+                    self.position = end_index
+                    return value
+            except json.JSONDecodeError:
+                if self.is_eof:
+                    raise
+            self.fill()
+
+
+def iter_snapshot_items(file: TextIO) -> Iterator[Tuple[str, Any]]:
+    """
+    Duyệt một file bản chụp theo luồng.
+    - Với các mảng accounts / transactions / saving_deposits: trả về từng phần tử (khóa, phần tử).
+    - Với các khóa khác (bộ đếm...): trả về (khóa, giá trị).
+    """
+    reader = JsonStreamReader(file)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.read_value()
+        if not isinstance(key, str):
+            raise ValueError("File JSON sai cấu trúc: khóa phải là chuỗi.")
+        reader.expect(":")
+
+        if key in STREAMED_ARRAY_KEYS and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.read_value()
+                    if reader.peek() == ",":
+                        reader.expect(",")
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            yield key, reader.read_value()
+
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
@@ -0,0 +1,389 @@
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core.models import Transaction, encode_json_text
+from src.storage import json_storage
+from src.storage.group_commit import GroupCommitPolicy
+from src.storage.json_storage import DEFAULT_BANK_DATA, create_default_bank_data, ensure_folder_exists
+
+
+COUNTER_KEYS = ["next_account_id", "next_transaction_number", "next_saving_deposit_number", "journal_seq"]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    owner_name TEXT NOT NULL,
+    pin_code TEXT NOT NULL,
+    balance INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id TEXT NOT NULL UNIQUE,
+    transaction_type TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    time_text TEXT NOT NULL,
+    note TEXT NOT NULL,
+    from_account_id TEXT,
+    to_account_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_from_account ON transactions (from_account_id, time_text);
+CREATE INDEX IF NOT EXISTS idx_transactions_to_account ON transactions (to_account_id, time_text);
+CREATE INDEX IF NOT EXISTS idx_transactions_time ON transactions (time_text);
+CREATE TABLE IF NOT EXISTS saving_deposits (
+    deposit_id TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    principal_amount INTEGER NOT NULL,
+    annual_interest_rate REAL NOT NULL,
+    term_months INTEGER NOT NULL,
+    opened_at TEXT NOT NULL,
+    maturity_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    note TEXT NOT NULL,
+    settled_at TEXT,
+    interest_earned INTEGER NOT NULL,
+    maturity_amount INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_saving_deposits_account ON saving_deposits (account_id);
+"""
+
+ACCOUNT_COLUMNS = ["account_id", "owner_name", "pin_code", "balance", "created_at"]
+TRANSACTION_COLUMNS = [
+    "transaction_id",
+    "transaction_type",
+    "amount",
+    "time_text",
+    "note",
+    "from_account_id",
+    "to_account_id",
+]
+SAVING_COLUMNS = [
+    "deposit_id",
+    "account_id",
+    "principal_amount",
+    "annual_interest_rate",
+    "term_months",
+    "opened_at",
+    "maturity_at",
+    "status",
+    "note",
+    "settled_at",
+    "interest_earned",
+    "maturity_amount",
+]
+
+
+def build_upsert_sql(table_name: str, columns: List[str]) -> str:
+    """Upsert theo khóa chính (cột đầu tiên); giữ nguyên rowid nên thứ tự đọc ra không đổi."""
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+    return (
+        f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT({columns[0]}) DO UPDATE SET {updates}"
+    )
+
+
+UPSERT_ACCOUNT_SQL = build_upsert_sql("accounts", ACCOUNT_COLUMNS)
+UPSERT_SAVING_SQL = build_upsert_sql("saving_deposits", SAVING_COLUMNS)
+INSERT_TRANSACTION_SQL = (
+    f"INSERT OR IGNORE INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in TRANSACTION_COLUMNS)})"
+)
+
+
+def connect_database(file_path: str) -> sqlite3.Connection:
+    """Mở (hoặc tạo) file SQLite, bật chế độ WAL và tạo bảng nếu chưa có."""
+    ensure_folder_exists(file_path)
+    connection = sqlite3.connect(file_path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA_SQL)
+    with connection:
+        for key in COUNTER_KEYS:
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", (key, int(DEFAULT_BANK_DATA[key])))
+    return connection
+
+
+def get_row_values(item: Any, columns: List[str]) -> List[Any]:
+    """Lấy giá trị các cột từ dict hoặc từ đối tượng model."""
+    if not isinstance(item, dict):
+        item = item.to_dictionary()
+    return [item.get(column) for column in columns]
+
+
+def read_rows(connection: sqlite3.Connection, sql: str, columns: List[str]) -> List[Dict[str, Any]]:
+    return [dict(zip(columns, row)) for row in connection.execute(sql)]
+
+
+def read_bank_data(connection: sqlite3.Connection, include_transactions: bool = True) -> Dict[str, Any]:
+    """
+    Đọc toàn bộ dữ liệu ra đúng dạng dict mà BankService đang dùng.
+    include_transactions=False: bỏ qua bảng giao dịch (dùng cho chế độ đọc lười).
+    """
+    data = create_default_bank_data()
+    for key, value in connection.execute("SELECT key, value FROM meta"):
+        data[key] = int(value)
+
+    data["accounts"] = read_rows(connection, f"SELECT {', '.join(ACCOUNT_COLUMNS)} FROM accounts ORDER BY rowid", ACCOUNT_COLUMNS)
+    if include_transactions:
+        data["transactions"] = read_rows(connection, f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions ORDER BY rowid", TRANSACTION_COLUMNS)
+    data["saving_deposits"] = read_rows(connection, f"SELECT {', '.join(SAVING_COLUMNS)} FROM saving_deposits ORDER BY rowid", SAVING_COLUMNS)
+    return data
+
+
+def write_records(connection: sqlite3.Connection, records: List[Dict[str, Any]], commit: bool = True) -> None:
+    """
+    Áp các bản ghi thay đổi (cùng dạng với journal JSON) trong một giao dịch SQLite:
+    mỗi tài khoản / sổ bị ảnh hưởng là một lệnh upsert, mỗi giao dịch mới là một lệnh insert.
+    commit=False: để giao dịch mở, người gọi tự commit sau (gom nhóm).
+    Mỗi lần gọi nằm trong một SAVEPOINT: lỗi giữa chừng chỉ bỏ phần của lần gọi này,
+    các lần gọi trước đang chờ commit trong cùng giao dịch vẫn được giữ.
+    """
+    if len(records) == 0:
+        return
+    if not connection.in_transaction:
+        connection.execute("BEGIN")
+    connection.execute("SAVEPOINT write_records")
+    try:
+        for record in records:
+            for account_dict in record.get("accounts", []):
+                connection.execute(UPSERT_ACCOUNT_SQL, [account_dict.get(column) for column in ACCOUNT_COLUMNS])
+            connection.executemany(
+                INSERT_TRANSACTION_SQL,
+                ([transaction_dict.get(column) for column in TRANSACTION_COLUMNS] for transaction_dict in json_storage.get_record_transaction_dicts(record)),
+            )
+            for saving_dict in record.get("saving_deposits", []):
+                connection.execute(UPSERT_SAVING_SQL, [saving_dict.get(column) for column in SAVING_COLUMNS])
+
+        last_record = records[-1]
+        for key in ["next_account_id", "next_transaction_number", "next_saving_deposit_number"]:
+            if key in last_record:
+                connection.execute("UPDATE meta SET value = ? WHERE key = ?", (int(last_record[key]), key))
+        connection.execute("UPDATE meta SET value = ? WHERE key = ?", (int(last_record["seq"]), "journal_seq"))
+    except Exception:
+        connection.execute("ROLLBACK TO write_records")
+        connection.execute("RELEASE write_records")
+        raise
+    connection.execute("RELEASE write_records")
+    if commit:
+        connection.commit()
+
+
+def write_full_data(connection: sqlite3.Connection, data: Dict[str, Any]) -> None:
+    """Ghi toàn bộ dữ liệu (dùng khi chuyển dữ liệu từ JSON sang SQLite). Chấp nhận cả dict lẫn đối tượng model."""
+    with connection:
+        connection.executemany(UPSERT_ACCOUNT_SQL, (get_row_values(item, ACCOUNT_COLUMNS) for item in data.get("accounts", [])))
+        connection.executemany(INSERT_TRANSACTION_SQL, (get_row_values(item, TRANSACTION_COLUMNS) for item in data.get("transactions", [])))
+        connection.executemany(UPSERT_SAVING_SQL, (get_row_values(item, SAVING_COLUMNS) for item in data.get("saving_deposits", [])))
+        for key in COUNTER_KEYS:
+            connection.execute("UPDATE meta SET value = ? WHERE key = ?", (int(data.get(key, DEFAULT_BANK_DATA[key])), key))
+
+
+# -------------------------
+# Cùng bề mặt hàm với json_storage
+# -------------------------
+def load_bank_data(file_path: str) -> Dict[str, Any]:
+    """Đọc dữ liệu ngân hàng từ file SQLite (tạo file mới nếu chưa có)."""
+    connection = connect_database(file_path)
+    try:
+        return read_bank_data(connection)
+    finally:
+        connection.close()
+
+
+def save_bank_data(file_path: str, data: Dict[str, Any]) -> None:
+    """Ghi toàn bộ dữ liệu ngân hàng vào file SQLite."""
+    connection = connect_database(file_path)
+    try:
+        write_full_data(connection, data)
+    finally:
+        connection.close()
+
+
+def append_journal_records(file_path: str, records: List[Dict[str, Any]]) -> int:
+    """Áp các bản ghi thay đổi vào file SQLite. Trả về số bản ghi đã áp."""
+    connection = connect_database(file_path)
+    try:
+        write_records(connection, records)
+    finally:
+        connection.close()
+    return len(records)
+
+
+def import_json_file(json_file_path: str, sqlite_file_path: str) -> None:
+    """Chuyển dữ liệu từ file JSON (bản chụp + journal) sang file SQLite."""
+    save_bank_data(sqlite_file_path, json_storage.load_bank_data(json_file_path))
+
+
+class SqliteTransactionSource:
+    """
+    Nguồn giao dịch cho chế độ đọc lười của SQLite: giao dịch nằm yên trên đĩa,
+    lịch sử của một tài khoản được truy vấn qua chỉ mục from_account_id / to_account_id khi cần.
+    Chỉ đọc các dòng có rowid <= max_rowid (đã có lúc load); giao dịch phát sinh sau đó do BankService giữ.
+    """
+
+    def __init__(self, storage: "SqliteStorage", max_rowid: int, transaction_count: int):
+        self.storage = storage
+        self.max_rowid = int(max_rowid)
+        self.transaction_count = int(transaction_count)
+
+    def count(self) -> int:
+        return self.transaction_count
+
+    def read_transactions(self, where_sql: str, parameters: List[Any]) -> List[Transaction]:
+        sql = (
+            f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions "
+            f"WHERE rowid <= ? {where_sql} ORDER BY rowid"
+        )
+        # Kết nối dùng chung với luồng ghi nền nên phải giữ khóa của storage.
+        with self.storage.lock:
+            rows = self.storage.get_connection().execute(sql, [self.max_rowid] + parameters).fetchall()
+        return [Transaction.from_dictionary(dict(zip(TRANSACTION_COLUMNS, row))) for row in rows]
+
+    def load_account_transactions(self, account_id: str) -> List[Transaction]:
+        account_id_text = str(account_id)
+        return self.read_transactions(
+            "AND (from_account_id = ? OR to_account_id = ?)",
+            [account_id_text, account_id_text],
+        )
+
+    def load_all_transactions(self) -> List[Transaction]:
+        return self.read_transactions("", [])
+
+    def iter_encoded_transactions(self) -> Iterator[str]:
+        for transaction in self.load_all_transactions():
+            yield encode_json_text(transaction.to_dictionary())
+
+
+class SqliteStorage:
+    """
+    Lưu dữ liệu bằng SQLite, cùng cách dùng với CheckpointManager (load / persist / close).
+    Giữ một kết nối mở suốt phiên làm việc; mỗi lần lưu chỉ upsert các dòng thay đổi.
+    commit_policy cho phép gom nhiều lần lưu vào một lần commit.
+    Bản ghi của các lần lưu đang chờ commit được giữ lại tới khi commit xong: commit lỗi thì chúng được
+    ghi lại ở lần lưu sau (bản ghi đã rời bank_service, không còn ai khác giữ).
+    """
+
+    def __init__(self, file_path: str, commit_policy: Optional[GroupCommitPolicy] = None):
+        self.file_path = file_path
+        self.connection: Optional[sqlite3.Connection] = None
+        self.last_error: Optional[str] = None
+        self.commit_policy = commit_policy if commit_policy is not None else GroupCommitPolicy()
+        self.commit_timer: Optional[threading.Timer] = None
+        self.lock = threading.Lock()
+        # Bản ghi đã ghi vào giao dịch SQLite đang mở, và bản ghi phải ghi lại do lần commit trước bị lỗi.
+        self.uncommitted_records: List[Dict[str, Any]] = []
+        self.replay_records: List[Dict[str, Any]] = []
+
+    def get_connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = connect_database(self.file_path)
+        return self.connection
+
+    def load(self, lazy_transactions: bool = False) -> Dict[str, Any]:
+        """lazy_transactions=True: không đọc bảng giao dịch, chỉ đọc theo từng tài khoản khi cần (SqliteTransactionSource)."""
+        connection = self.get_connection()
+        if not lazy_transactions:
+            return read_bank_data(connection)
+
+        data = read_bank_data(connection, include_transactions=False)
+        max_rowid, transaction_count = connection.execute(
+            "SELECT COALESCE(MAX(rowid), 0), COUNT(*) FROM transactions"
+        ).fetchone()
+        data["transactions"] = SqliteTransactionSource(self, max_rowid, transaction_count)
+        return data
+
+    def persist(self, bank_service) -> None:
+        self.persist_changes(bank_service.take_journal_records())
+
+    def should_checkpoint_at(self, journal_seq: int) -> bool:
+        """SQLite không cần bản chụp riêng: mỗi thay đổi đã nằm đúng chỗ trong bảng."""
+        return False
+
+    def persist_changes(self, records: List[Dict[str, Any]], snapshot: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Ghi các bản ghi đã lấy sẵn từ bank_service (an toàn khi gọi từ luồng ghi nền).
+        Lỗi thì báo ra ngoài, và người gọi giữ lại đúng các bản ghi của lần gọi này để thử lại;
+        bản ghi của các lần gọi trước (đang chờ commit) do storage tự ghi lại.
+        """
+        if len(records) == 0 and len(self.replay_records) == 0:
+            return
+        with self.lock:
+            self.write_replay_records()
+            write_records(self.get_connection(), records, commit=False)
+            self.uncommitted_records.extend(records)
+            self.commit_policy.add_operations(len(records))
+            if self.commit_policy.is_commit_due():
+                try:
+                    self.commit()
+                except Exception:
+                    # Bản ghi của lần gọi này trả về cho người gọi, không ghi lại hai lần.
+                    del self.replay_records[len(self.replay_records) - len(records):]
+                    raise
+            elif self.commit_policy.max_delay_ms > 0 and self.commit_timer is None:
+                self.commit_timer = threading.Timer(self.commit_policy.get_delay_seconds(), self.flush_from_timer)
+                self.commit_timer.daemon = True
+                self.commit_timer.start()
+
+    def write_replay_records(self) -> None:
+        """Ghi lại các bản ghi của lần commit bị lỗi trước đó (chỉ gọi khi đang giữ self.lock)."""
+        if len(self.replay_records) == 0:
+            return
+        write_records(self.get_connection(), self.replay_records, commit=False)
+        self.uncommitted_records.extend(self.replay_records)
+        self.commit_policy.add_operations(len(self.replay_records))
+        self.replay_records = []
+
+    def commit(self) -> None:
+        """Commit một lần cho cả nhóm thay đổi đang chờ. Chỉ gọi khi đang giữ self.lock."""
+        if self.commit_timer is not None:
+            self.commit_timer.cancel()
+            self.commit_timer = None
+        if self.connection is not None:
+            try:
+                self.connection.commit()
+            except Exception:
+                # Giao dịch SQLite bị hủy: mọi bản ghi đang chờ commit phải được ghi lại ở lần lưu sau.
+                if self.connection.in_transaction:
+                    self.connection.rollback()
+                self.replay_records = self.uncommitted_records + self.replay_records
+                self.uncommitted_records = []
+                self.commit_policy.mark_committed()
+                raise
+        self.uncommitted_records = []
+        self.commit_policy.mark_committed()
+
+    def flush(self) -> None:
+        """Commit các thay đổi đang chờ (kể cả bản ghi phải ghi lại). Lỗi thì báo ra ngoài."""
+        with self.lock:
+            self.commit_timer = None
+            self.write_replay_records()
+            if self.commit_policy.has_pending():
+                self.commit()
+
+    def flush_from_timer(self) -> None:
+        # Luồng hẹn giờ không có ai nhận lỗi: ghi lại vào last_error, bản ghi vẫn được giữ để lần lưu sau thử lại.
+        try:
+            self.flush()
+            self.last_error = None
+        except Exception as error:
+            self.last_error = str(error)
+
+    def take_last_error(self) -> Optional[str]:
+        """Lấy (và xóa) lỗi của lần commit theo hẹn giờ gần nhất, None nếu không có."""
+        error = self.last_error
+        self.last_error = None
+        return error
+
+    def close(self, bank_service=None) -> None:
+        if bank_service is not None:
+            self.persist(bank_service)
+        self.flush()
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from src.storage.checkpoint import CheckpointManager
+from src.storage.sqlite_storage import SqliteStorage
+
+
+SQLITE_FILE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+# File dữ liệu mặc định của mọi chế độ chạy (giao diện, dòng lệnh, lô, máy chủ), tính từ thư mục dự án.
+DEFAULT_DATA_FILE_PATH = str(Path(__file__).resolve().parents[2] / "data" / "bank_data.json")
+
+
+def is_sqlite_file_path(file_path: str) -> bool:
+    return str(file_path).lower().endswith(SQLITE_FILE_EXTENSIONS)
+
+
+def create_storage(file_path: str):
+    """
+    Chọn cách lưu theo đuôi file dữ liệu:
+    - .db / .sqlite / .sqlite3: lưu bằng SQLite.
+    - Còn lại: lưu bằng JSON (bản chụp + journal + checkpoint).
+    Cả hai đều có load(), persist(bank_service) và close().
+    """
+    if is_sqlite_file_path(file_path):
+        return SqliteStorage(file_path)
+    return CheckpointManager(file_path)
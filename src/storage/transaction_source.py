@@ -0,0 +1,337 @@
+import json
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.models import Transaction, encode_json_text
+
+
+# Số byte của một vị trí trong file chỉ mục (array "q").
+OFFSET_SIZE = array("q").itemsize
+
+
+def strip_fragment_line(line: bytes) -> bytes:
+    """Bỏ khoảng trắng / xuống dòng và dấu phẩy ở cuối một dòng phần tử trong file bản chụp."""
+    line = line.strip()
+    if line.endswith(b","):
+        line = line[:-1]
+    return line
+
+
+def is_transaction_of_account(transaction: Transaction, account_id: str) -> bool:
+    return transaction.from_account_id == account_id or transaction.to_account_id == account_id
+
+
+def get_snapshot_index_path(snapshot_path: str) -> str:
+    """File chỉ mục nằm cạnh file bản chụp, ví dụ: data/bank_data.json.index"""
+    return snapshot_path + ".index"
+
+
+def get_fragment_account_ids(fragment: str) -> List[str]:
+    """
+    Các tài khoản (bên chuyển, bên nhận, không lặp) của một dòng giao dịch trong bản chụp.
+    Hai khóa này đứng cuối dòng (xem Transaction.to_dictionary), nên chỉ cần giải mã phần đuôi.
+    """
+    position = fragment.rfind('"from_account_id":')
+    try:
+        parts = json.loads("{" + fragment[position:]) if position >= 0 else json.loads(fragment)
+    except ValueError:
+        parts = json.loads(fragment)
+    account_ids: List[str] = []
+    for key in ("from_account_id", "to_account_id"):
+        account_id = parts.get(key)
+        if account_id is not None and str(account_id) not in account_ids:
+            account_ids.append(str(account_id))
+    return account_ids
+
+
+class SnapshotIndex:
+    """
+    Chỉ mục của một file bản chụp: vị trí byte các dòng giao dịch của từng tài khoản,
+    tính từ dòng giao dịch đầu tiên (nên chép nguyên sang bản chụp sau được, khi các dòng cũ được chép y nguyên).
+    File chỉ mục gồm một dòng JSON (vị trí, số dòng, độ dài mảng transactions và danh mục:
+    tài khoản -> [vị trí đầu, số dòng]) rồi tới mảng vị trí.
+    Chỉ danh mục nằm trong bộ nhớ; vị trí các dòng của một tài khoản được đọc từ file khi cần.
+    """
+
+    def __init__(self, index_path: str, header: Dict[str, Any], data_offset: int):
+        self.index_path = index_path
+        self.transactions_offset = int(header["transactions_offset"])
+        self.line_count = int(header["line_count"])
+        # Vị trí (tính từ dòng giao dịch đầu tiên) của dòng "]" đóng mảng transactions.
+        self.transactions_size = int(header["transactions_size"])
+        self.directory: Dict[str, List[int]] = header.get("accounts", {})
+        self.data_offset = int(data_offset)
+        self.byteorder = str(header.get("byteorder", sys.byteorder))
+
+    @staticmethod
+    def read(index_path: str, snapshot_path: str) -> Optional["SnapshotIndex"]:
+        """
+        Đọc danh mục của file chỉ mục. Trả về None nếu chưa có file, file hỏng, hoặc file không khớp với bản chụp
+        (khác kích thước hoặc thời điểm sửa, tức bản chụp đã bị ghi lại sau khi chỉ mục được ghi).
+        """
+        try:
+            with open(index_path, "rb") as file:
+                header = json.loads(file.readline())
+                data_offset = file.tell()
+            if [header.get("snapshot_size"), header.get("snapshot_mtime_ns")] != get_snapshot_signature(snapshot_path):
+                return None
+            return SnapshotIndex(index_path, header, data_offset)
+        except (OSError, ValueError, AttributeError, KeyError, TypeError):
+            return None
+
+    def swap_to_native(self, offsets: array) -> array:
+        if self.byteorder != sys.byteorder:
+            offsets.byteswap()
+        return offsets
+
+    def read_offsets(self, account_id: str) -> array:
+        """Vị trí (tính từ dòng giao dịch đầu tiên) các dòng của một tài khoản, theo thứ tự trong file."""
+        offsets = array("q")
+        span = self.directory.get(str(account_id))
+        if span is None or span[1] == 0:
+            return offsets
+        with open(self.index_path, "rb") as file:
+            file.seek(self.data_offset + span[0] * OFFSET_SIZE)
+            offsets.frombytes(file.read(span[1] * OFFSET_SIZE))
+        return self.swap_to_native(offsets)
+
+    def read_all_offsets(self) -> Dict[str, array]:
+        """Vị trí các dòng của mọi tài khoản, đọc mảng vị trí một lượt (dùng khi ghi checkpoint)."""
+        offsets = array("q")
+        with open(self.index_path, "rb") as file:
+            file.seek(self.data_offset)
+            offsets.frombytes(file.read())
+        self.swap_to_native(offsets)
+        return {account_id: offsets[span[0]:span[0] + span[1]] for account_id, span in self.directory.items()}
+
+
+def get_snapshot_signature(snapshot_path: str) -> List[int]:
+    """Kích thước và thời điểm sửa của file bản chụp, ghi trong file chỉ mục để biết chỉ mục còn khớp hay không."""
+    status = os.stat(snapshot_path)
+    return [status.st_size, status.st_mtime_ns]
+
+
+def write_snapshot_index(
+    index_path: str,
+    snapshot_path: str,
+    transactions_offset: int,
+    line_count: int,
+    transactions_size: int,
+    new_offsets: Dict[str, array],
+    carried_offsets: Optional[Dict[str, array]] = None,
+) -> None:
+    """
+    Ghi file chỉ mục (kèm fsync) cho bản chụp snapshot_path (đã ghi xong). Vị trí của mỗi tài khoản gồm phần chép từ carried_offsets
+    (các dòng đầu được chép y nguyên từ bản chụp trước) rồi tới new_offsets (các dòng ghi mới).
+    """
+    carried_offsets = carried_offsets if carried_offsets is not None else {}
+    snapshot_size, snapshot_mtime_ns = get_snapshot_signature(snapshot_path)
+    directory: Dict[str, List[int]] = {}
+    position = 0
+    for account_id in list(carried_offsets) + [key for key in new_offsets if key not in carried_offsets]:
+        count = len(carried_offsets.get(account_id, ())) + len(new_offsets.get(account_id, ()))
+        directory[account_id] = [position, count]
+        position += count
+
+    header = {
+        "transactions_offset": int(transactions_offset),
+        "line_count": int(line_count),
+        "transactions_size": int(transactions_size),
+        "snapshot_size": snapshot_size,
+        "snapshot_mtime_ns": snapshot_mtime_ns,
+        "byteorder": sys.byteorder,
+        "accounts": directory,
+    }
+    with open(index_path, "wb") as file:
+        file.write(encode_json_text(header).encode("utf-8") + b"\n")
+        for account_id in directory:
+            if account_id in carried_offsets:
+                file.write(carried_offsets[account_id].tobytes())
+            if account_id in new_offsets:
+                file.write(new_offsets[account_id].tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def build_snapshot_index(snapshot_path: str, transactions_offset: int, line_count: int) -> SnapshotIndex:
+    """
+    Dựng file chỉ mục cho bản chụp chưa có (bản chụp ghi trước khi có chỉ mục, hoặc chỉ mục bị hỏng / lệch):
+    đọc lướt một lần qua các dòng giao dịch. Các lần mở sau dùng lại file chỉ mục.
+    """
+    new_offsets: Dict[str, array] = {}
+    relative_offset = 0
+    with open(snapshot_path, "rb") as file:
+        file.seek(transactions_offset)
+        for line in islice(file, line_count):
+            for account_id in get_fragment_account_ids(strip_fragment_line(line).decode("utf-8")):
+                new_offsets.setdefault(account_id, array("q")).append(relative_offset)
+            relative_offset += len(line)
+
+    index_path = get_snapshot_index_path(snapshot_path)
+    temp_path = index_path + ".tmp"
+    write_snapshot_index(temp_path, snapshot_path, transactions_offset, line_count, relative_offset, new_offsets)
+    os.replace(temp_path, index_path)
+    return SnapshotIndex.read(index_path, snapshot_path)
+
+
+def load_snapshot_index(snapshot_path: str, transactions_offset: int, line_count: int) -> SnapshotIndex:
+    """Chỉ mục của một bản chụp: đọc file chỉ mục đi kèm, nếu không có hoặc không khớp thì dựng lại."""
+    index = SnapshotIndex.read(get_snapshot_index_path(snapshot_path), snapshot_path)
+    if index is None or (index.transactions_offset, index.line_count) != (int(transactions_offset), int(line_count)):
+        index = build_snapshot_index(snapshot_path, transactions_offset, line_count)
+    return index
+
+
+@dataclass
+class SnapshotFile:
+    """
+    Một thế hệ bản chụp mà nguồn đang đọc: file, vị trí dòng giao dịch đầu tiên, số dòng và chỉ mục.
+    Nguồn chỉ đọc line_count dòng đầu, kết thúc ở end_offset (tính từ dòng giao dịch đầu tiên); các dòng phía sau
+    là giao dịch phát sinh trong phiên đã được checkpoint ghi ra, BankService vẫn giữ chúng trong bộ nhớ.
+    """
+    path: str
+    transactions_offset: int
+    line_count: int
+    end_offset: int
+    index: SnapshotIndex
+
+    def trim_offsets(self, offsets: array) -> array:
+        if self.end_offset < self.index.transactions_size:
+            del offsets[bisect_left(offsets, self.end_offset):]
+        return offsets
+
+    def read_offsets(self, account_id: str) -> array:
+        """Vị trí các dòng của một tài khoản trong phần nguồn đọc (tăng dần vì dòng chép lại đứng trước dòng mới)."""
+        return self.trim_offsets(self.index.read_offsets(account_id))
+
+    def read_all_offsets(self) -> Dict[str, array]:
+        all_offsets = {account_id: self.trim_offsets(offsets) for account_id, offsets in self.index.read_all_offsets().items()}
+        return {account_id: offsets for account_id, offsets in all_offsets.items() if len(offsets) > 0}
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Đọc lần lượt các dòng giao dịch trong file bản chụp."""
+        if self.line_count == 0:
+            return
+        with open(self.path, "rb") as file:
+            file.seek(self.transactions_offset)
+            read_count = 0
+            for line in islice(file, self.line_count):
+                read_count += 1
+                yield line
+        if read_count < self.line_count:
+            raise ValueError("File bản chụp bị cắt ngắn, thiếu dòng giao dịch.")
+
+    def read_lines_at(self, relative_offsets: Iterable[int]) -> Iterator[bytes]:
+        with open(self.path, "rb") as file:
+            for relative_offset in relative_offsets:
+                file.seek(self.transactions_offset + relative_offset)
+                yield file.readline()
+
+
+class SnapshotTransactionSource:
+    """
+    Nguồn giao dịch cho chế độ đọc lười (lazy) của file JSON.
+    Giao dịch cũ nằm yên trong file bản chụp (mỗi giao dịch một dòng, xem write_checkpoint);
+    nguồn chỉ nhớ vị trí byte bắt đầu mảng transactions, số dòng và danh mục của file chỉ mục,
+    nên bộ nhớ không tăng theo lịch sử. Lịch sử của một tài khoản được đọc bằng cách nhảy thẳng tới
+    các dòng của nó (theo file chỉ mục), không quét cả file.
+    Các giao dịch áp lại từ journal (phát sinh sau bản chụp) được giữ trong tail_transactions.
+
+    self.lock chỉ được giữ khi lấy / đổi thế hệ bản chụp đang đọc, việc đọc file chạy ngoài khóa.
+    Checkpoint chờ các lượt đọc đang mở xong rồi mới đổi tên file (xem replacing_snapshot).
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str,
+        transactions_offset: int,
+        line_count: int,
+        tail_transactions: List[Transaction],
+        index: Optional[SnapshotIndex] = None,
+    ):
+        # index: chỉ mục đã đọc sẵn lúc load (read_checkpoint_file_lazily), không có thì đọc / dựng lại tại đây.
+        if index is None:
+            index = load_snapshot_index(snapshot_path, int(transactions_offset), int(line_count))
+        self.snapshot = SnapshotFile(snapshot_path, int(transactions_offset), int(line_count), index.transactions_size, index)
+        self.tail_transactions = tail_transactions
+        self.lock = threading.Lock()
+        self.readers_done = threading.Condition(self.lock)
+        self.active_readers = 0
+
+    def count(self) -> int:
+        return self.snapshot.line_count + len(self.tail_transactions)
+
+    @contextmanager
+    def open_snapshot(self) -> Iterator[Tuple[SnapshotFile, List[Transaction]]]:
+        """Giữ chỗ đọc thế hệ bản chụp hiện tại (và phần đuôi đi kèm) trong suốt khối with."""
+        with self.lock:
+            snapshot = self.snapshot
+            tail_transactions = self.tail_transactions
+            self.active_readers += 1
+        try:
+            yield snapshot, tail_transactions
+        finally:
+            with self.lock:
+                self.active_readers -= 1
+                if self.active_readers == 0:
+                    self.readers_done.notify_all()
+
+    @contextmanager
+    def replacing_snapshot(self) -> Iterator[None]:
+        """
+        Dùng khi checkpoint đưa bản chụp mới vào chỗ: chặn lượt đọc mới và chờ các lượt đang đọc xong,
+        vì file cũ sắp bị đổi tên (người đọc mở lại theo đường dẫn cũ sẽ đọc nhầm file mới).
+        """
+        with self.lock:
+            while self.active_readers > 0:
+                self.readers_done.wait()
+            yield
+
+    def load_account_transactions(self, account_id: str) -> List[Transaction]:
+        """Đọc các giao dịch của một tài khoản theo thứ tự ghi nhận, chỉ đọc đúng các dòng của tài khoản đó."""
+        account_id_text = str(account_id)
+        with self.open_snapshot() as (snapshot, tail_transactions):
+            offsets = snapshot.read_offsets(account_id_text)
+            result = [
+                Transaction.from_dictionary(json.loads(strip_fragment_line(line)))
+                for line in snapshot.read_lines_at(offsets)
+            ]
+
+        for transaction in tail_transactions:
+            if is_transaction_of_account(transaction, account_id_text):
+                result.append(transaction)
+        return result
+
+    def load_all_transactions(self) -> List[Transaction]:
+        with self.open_snapshot() as (snapshot, tail_transactions):
+            result = [Transaction.from_dictionary(json.loads(strip_fragment_line(line))) for line in snapshot.iter_lines()]
+        return result + tail_transactions
+
+    def iter_encoded_transactions(self) -> Iterator[str]:
+        """
+        Các chuỗi JSON gọn của mọi giao dịch cũ (dùng khi ghi checkpoint): snapshot.line_count dòng đầu
+        được chép y nguyên từ file, nên vị trí trong chỉ mục cũ vẫn đúng cho file mới.
+        Chỉ checkpoint gọi hàm này, và file cũ chỉ bị đổi tên sau khi đọc xong, nên không cần giữ chỗ đọc.
+        """
+        for line in self.snapshot.iter_lines():
+            yield strip_fragment_line(line).decode("utf-8")
+        for transaction in self.tail_transactions:
+            yield encode_json_text(transaction.to_dictionary())
+
+    def relocate(self, snapshot_path: str, transactions_offset: int, line_count: int, stored_size: int) -> None:
+        """
+        Chuyển sang đọc từ bản chụp vừa ghi (line_count dòng giao dịch, chỉ mục do prepare_checkpoint ghi sẵn):
+        các giao dịch cũ (kể cả phần đuôi journal) giờ là count() dòng đầu tiên, kết thúc ở stored_size.
+        Các dòng sau đó là giao dịch của phiên, BankService vẫn giữ trong bộ nhớ nên nguồn không đọc tới.
+        Gọi trong khối replacing_snapshot.
+        """
+        index = load_snapshot_index(snapshot_path, int(transactions_offset), int(line_count))
+        self.snapshot = SnapshotFile(snapshot_path, int(transactions_offset), self.count(), int(stored_size), index)
+        self.tail_transactions = []
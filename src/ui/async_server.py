@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.bank_service import BankService
+from src.storage.storage_backend import DEFAULT_DATA_FILE_PATH, create_storage
+from src.ui.bank_api import BankApi, RequestCounters, build_stats_response
+
+# Máy chủ asyncio: mỗi dòng là một yêu cầu JSON, mỗi dòng trả về là một kết quả JSON (xem AsyncBankServer).
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8081
+# Số thao tác đổi dữ liệu tối đa được gộp vào một lần lưu.
+MAX_WRITE_BATCH = 1000
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def encode_response(request_id: Any, status: int, payload: Dict[str, Any]) -> bytes:
+    return (json.dumps({"id": request_id, "status": status, "body": payload}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@dataclass
+class PendingChange:
+    """Một yêu cầu đổi dữ liệu đang chờ tác vụ ghi, kèm kết nối để trả kết quả."""
+    request_id: Any
+    route_name: str
+    method: str
+    path: str
+    parameters: Dict[str, Any]
+    token: str
+    writer: asyncio.StreamWriter
+    started_at: float
+
+
+class AsyncBankServer:
+    """
+    Máy chủ dạng luồng dữ liệu trên asyncio, dùng chung các endpoint với máy chủ HTTP (BankApi).
+    - Yêu cầu: {"id": ..., "method": "POST", "path": "/deposit", "token": "...", "params": {...}} trên một dòng.
+      Kết quả: {"id": ..., "status": 200, "body": {...}} trên một dòng, mang lại đúng id của yêu cầu.
+    - Client gửi liên tiếp nhiều yêu cầu trên một kết nối, không cần chờ kết quả (pipelining).
+    - Yêu cầu đọc được trả lời ngay; yêu cầu đổi dữ liệu vào hàng đợi của một tác vụ ghi duy nhất,
+      nên kết quả có thể về khác thứ tự gửi. Muốn đọc thấy thay đổi vừa gửi thì chờ kết quả của thay đổi đó.
+    - Chỉ một luồng (vòng lặp sự kiện) đụng vào bank_service, nên không cần khóa (thread_safe=False).
+    - Tác vụ ghi gom các thay đổi đang chờ thành lô, lưu cả lô một lần (ghi file ở luồng phụ),
+      và chỉ trả kết quả cho các thay đổi sau khi lô đã được lưu.
+    - Lưu thất bại thì các thay đổi của lô được trả về với status 503, "ok": false, "applied": true và save_error:
+      thay đổi đã áp trong bộ nhớ (sẽ được ghi ở lần lưu sau) nên client không được gửi lại.
+    """
+
+    def __init__(self, bank_service: BankService, storage: Any = None):
+        self.bank_service = bank_service
+        # storage=None: không lưu (dùng khi thử nghiệm).
+        self.storage = storage
+        self.api = BankApi(bank_service)
+        self.counters = RequestCounters()
+        self.write_queue: Optional[asyncio.Queue] = None
+        self.writer_task: Optional[asyncio.Task] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        # Kết nối đang mở: tác vụ xử lý -> (reader, writer), để close() dừng đọc và chờ trả lời nốt.
+        self.connections: Dict[asyncio.Task, Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = {}
+        # Bản ghi của lần lưu thất bại, được ghi lại ở lần lưu sau.
+        self.unsaved_records: List[Dict[str, Any]] = []
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> Tuple[str, int]:
+        """Mở cổng và chạy tác vụ ghi. Trả về (host, port) thật sự (port=0: tự chọn cổng trống)."""
+        self.write_queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self.run_writer())
+        self.server = await asyncio.start_server(self.handle_connection, host, int(port), limit=MAX_LINE_BYTES)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        """Ngừng nhận kết nối, dừng đọc ở các kết nối đang mở, chờ trả lời hết các yêu cầu đã nhận rồi đóng file dữ liệu."""
+        if self.server is not None:
+            self.server.close()
+        for reader, writer in list(self.connections.values()):
+            writer.transport.pause_reading()
+            reader.feed_eof()
+        if len(self.connections) > 0:
+            await asyncio.gather(*self.connections, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        if self.writer_task is not None:
+            await self.write_queue.put(None)
+            await self.writer_task
+        if self.storage is not None:
+            self.storage.close()
+
+    # -------------------------
+    # Kết nối
+    # -------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self.connections[task] = (reader, writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if line.strip() == b"":
+                    continue
+                self.handle_line(line, writer)
+                await writer.drain()
+            # Hàng đợi giữ đúng thứ tự: khi mốc này xong thì mọi thay đổi của kết nối đã được trả lời.
+            flushed = asyncio.get_running_loop().create_future()
+            self.write_queue.put_nowait(flushed)
+            await flushed
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.connections[task]
+            writer.close()
+
+    def handle_line(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        """Trả lời ngay yêu cầu đọc; yêu cầu đổi dữ liệu được đưa vào hàng đợi của tác vụ ghi."""
+        started_at = time.perf_counter()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            writer.write(encode_response(None, 400, {"ok": False, "message": "Mỗi dòng phải là một đối tượng JSON."}))
+            self.counters.record("invalid", False, time.perf_counter() - started_at)
+            return
+
+        request_id = request.get("id")
+        method = str(request.get("method", "GET")).upper()
+        path = str(request.get("path", "")).rstrip("/") or "/"
+        parameters = request.get("params") if isinstance(request.get("params"), dict) else {}
+        token = str(request.get("token", ""))
+
+        if method == "GET" and path == "/stats":
+            peer_name = writer.get_extra_info("peername")
+            status, payload = build_stats_response(self.counters, peer_name[0] if peer_name else None)
+            writer.write(encode_response(request_id, status, payload))
+            self.counters.record("stats", payload["ok"], time.perf_counter() - started_at)
+            return
+
+        route = self.api.get_route(method, path)
+        if route is None or not route.is_mutation:
+            status, payload = self.api.handle(method, path, parameters, token)
+            writer.write(encode_response(request_id, status, payload))
+            self.counters.record(route.name if route is not None else "not_found", payload["ok"], time.perf_counter() - started_at)
+            return
+
+        self.write_queue.put_nowait(PendingChange(request_id, route.name, method, path, parameters, token, writer, started_at))
+
+    # -------------------------
+    # Tác vụ ghi duy nhất
+    # -------------------------
+    async def run_writer(self) -> None:
+        """
+        Lấy các thay đổi đang chờ thành lô, áp lần lượt, lưu cả lô một lần rồi mới trả kết quả.
+        Ngoài PendingChange, hàng đợi còn chứa mốc (future: đánh dấu xong khi mọi thứ trước nó đã trả lời) và None (dừng).
+        """
+        is_closing = False
+        while not is_closing:
+            items = [await self.write_queue.get()]
+            while len(items) < MAX_WRITE_BATCH and not self.write_queue.empty():
+                items.append(self.write_queue.get_nowait())
+
+            results: List[Tuple[PendingChange, Tuple[int, Dict[str, Any]]]] = []
+            markers: List[asyncio.Future] = []
+            for item in items:
+                if item is None:
+                    is_closing = True
+                elif isinstance(item, asyncio.Future):
+                    markers.append(item)
+                else:
+                    try:
+                        result = self.api.handle(item.method, item.path, item.parameters, item.token)
+                    except Exception as error:
+                        result = (500, {"ok": False, "message": f"Lỗi máy chủ: {error}"})
+                    results.append((item, result))
+
+            save_error = await self.save_changes(results)
+            for change, (status, payload) in results:
+                if save_error is not None and payload.get("ok"):
+                    message = f"{payload.get('message', '')} Nhưng chưa lưu được, sẽ ghi lại ở lần lưu sau (không gửi lại)."
+                    status, payload = 503, dict(payload, ok=False, applied=True, message=message, save_error=save_error)
+                if not change.writer.is_closing():
+                    change.writer.write(encode_response(change.request_id, status, payload))
+                self.counters.record(change.route_name, payload["ok"], time.perf_counter() - change.started_at)
+            for marker in markers:
+                if not marker.done():
+                    marker.set_result(None)
+
+    async def save_changes(self, results: List[Tuple["PendingChange", Tuple[int, Dict[str, Any]]]]) -> Optional[str]:
+        """
+        Lấy bản ghi (và bản chụp khi cần checkpoint) ngay trên vòng lặp sự kiện, còn việc ghi file chạy ở luồng phụ.
+        Lưu thất bại thì thay đổi vẫn nằm trong bộ nhớ và được ghi ở lần lưu sau.
+        Trả về thông báo lỗi nếu lô chưa được lưu, None nếu đã lưu (hoặc không có gì để lưu).
+        """
+        if self.storage is None:
+            return None
+        records = self.unsaved_records + self.bank_service.take_journal_records()
+        self.unsaved_records = []
+        if len(records) == 0:
+            return None
+        snapshot = None
+        if self.storage.should_checkpoint_at(int(self.bank_service.bank_data.get("journal_seq", 0))):
+            snapshot = self.bank_service.build_snapshot_fragments()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.storage.persist_changes, records, snapshot)
+        except Exception as error:
+            self.unsaved_records = records
+            return f"Lưu dữ liệu thất bại: {error}"
+        # Lỗi của việc ghi chạy ngoài lượt này (commit theo hẹn giờ của SQLite...) cũng báo cho người gọi.
+        error = self.storage.take_last_error()
+        if error is not None:
+            return f"Lưu dữ liệu thất bại: {error}"
+        return None
+
+
+async def serve(data_file_path: str, host: str, port: int) -> None:
+    storage = create_storage(data_file_path)
+    bank_service = BankService(storage.load(lazy_transactions=True))
+    bank_service.process_matured_deposits()
+    server = AsyncBankServer(bank_service, storage)
+    try:
+        await server.save_changes([])
+        address = await server.start(host, port)
+        print(f"Mini Bank (asyncio) đang chạy tại {address[0]}:{address[1]} (Ctrl+C để dừng).", file=sys.stderr)
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mini Bank: máy chủ asyncio, mỗi dòng một yêu cầu JSON.")
+    parser.add_argument("--data", default=DEFAULT_DATA_FILE_PATH, help="file dữ liệu ngân hàng (.json hoặc .db)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    options = parser.parse_args(arguments)
+    try:
+        asyncio.run(serve(options.data, options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
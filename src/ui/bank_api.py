@@ -0,0 +1,256 @@
+import ipaddress
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.core.bank_service import BankService
+
+# Các endpoint JSON của Mini Bank, dùng chung cho máy chủ HTTP (http_server) và máy chủ asyncio (async_server).
+# Không import tkinter.
+DEFAULT_HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+# Phiên không dùng tới trong khoảng này thì hết hạn (mỗi lần dùng lại được gia hạn).
+DEFAULT_SESSION_TTL_SECONDS = 30 * 60
+
+
+@dataclass
+class ApiRoute:
+    """
+    Một endpoint: tên hàm xử lý trong BankApi, có đổi dữ liệu hay không, có cần đăng nhập hay không,
+    và hàm xử lý có nhận thêm mã phiên của người gọi hay không.
+    """
+    name: str
+    is_mutation: bool
+    needs_login: bool = True
+    needs_token: bool = False
+
+
+API_ROUTES = {
+    ("POST", "/login"): ApiRoute("login", False, needs_login=False),
+    ("POST", "/logout"): ApiRoute("logout", False, needs_token=True),
+    ("GET", "/balance"): ApiRoute("balance", False),
+    ("POST", "/deposit"): ApiRoute("deposit", True),
+    ("POST", "/withdraw"): ApiRoute("withdraw", True),
+    ("POST", "/transfer"): ApiRoute("transfer", True),
+    ("GET", "/history"): ApiRoute("history", False),
+    ("GET", "/savings"): ApiRoute("savings", False),
+    ("POST", "/savings/open"): ApiRoute("open_saving", True),
+    ("POST", "/savings/settle"): ApiRoute("settle_saving", True),
+}
+
+
+def read_number(parameters: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """
+    Giá trị số từ body JSON. JSON true / false bị đổi thành None (để hàm nghiệp vụ báo lỗi),
+    vì trong Python bool là int (True == 1) và sẽ lọt qua kiểm tra số của tầng nghiệp vụ.
+    """
+    value = parameters.get(key, default)
+    if isinstance(value, bool):
+        return None
+    return value
+
+
+def read_integer(parameters: Dict[str, Any], key: str, default: Optional[int] = None) -> Optional[int]:
+    """Số nguyên từ body JSON hoặc query string (chuỗi chữ số). Sai kiểu thì trả về nguyên giá trị để hàm nghiệp vụ báo lỗi."""
+    value = read_number(parameters, key, default)
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value.strip())
+    return value
+
+
+class RequestCounters:
+    """Đếm số yêu cầu, số lỗi và thời gian xử lý (tổng / lớn nhất) theo từng endpoint. Dùng được từ nhiều luồng."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters_by_route: Dict[str, Dict[str, float]] = {}
+
+    def record(self, route_name: str, ok: bool, seconds: float) -> None:
+        with self.lock:
+            counters = self.counters_by_route.get(route_name)
+            if counters is None:
+                counters = {"requests": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                self.counters_by_route[route_name] = counters
+            counters["requests"] += 1
+            if not ok:
+                counters["errors"] += 1
+            counters["total_seconds"] += seconds
+            counters["max_seconds"] = max(counters["max_seconds"], seconds)
+
+    def to_dictionary(self) -> Dict[str, Any]:
+        with self.lock:
+            routes = {}
+            total_requests = 0
+            for route_name, counters in sorted(self.counters_by_route.items()):
+                request_count = int(counters["requests"])
+                total_requests += request_count
+                routes[route_name] = {
+                    "requests": request_count,
+                    "errors": int(counters["errors"]),
+                    "average_ms": round(counters["total_seconds"] * 1000 / max(request_count, 1), 3),
+                    "max_ms": round(counters["max_seconds"] * 1000, 3),
+                }
+        return {"uptime_seconds": round(time.time() - self.started_at, 3), "requests": total_requests, "routes": routes}
+
+
+def is_loopback_address(host: Optional[str]) -> bool:
+    try:
+        return ipaddress.ip_address(str(host)).is_loopback
+    except ValueError:
+        return False
+
+
+def build_stats_response(counters: RequestCounters, client_host: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+    """Trả lời GET /stats. Số liệu vận hành chỉ dành cho người quản trị trên chính máy chủ (kết nối từ localhost)."""
+    if not is_loopback_address(client_host):
+        return 403, {"ok": False, "message": "Chỉ xem được /stats từ chính máy chủ (localhost)."}
+    return 200, {"ok": True, "message": "OK", "stats": counters.to_dictionary()}
+
+
+class BankApi:
+    """
+    Xử lý một yêu cầu đã được đọc xong: (phương thức, đường dẫn, tham số, mã phiên) -> (mã HTTP, dữ liệu JSON).
+    Không phụ thuộc cách nhận yêu cầu, nên máy chủ HTTP và máy chủ asyncio dùng chung.
+    Đăng nhập (POST /login) trả về token; các endpoint khác gửi token qua header "Authorization: Bearer <token>".
+    Phiên không dùng tới quá session_ttl_seconds thì hết hạn và bị dọn khi có yêu cầu tới.
+    Các hàm đọc giữ khóa của bank_service trong lúc đọc (không làm gì khi thread_safe=False):
+    lịch sử giữ khóa của tài khoản (chỉ mục riêng của tài khoản), sổ tiết kiệm giữ state_lock (chỉ mục sổ dùng chung).
+    """
+
+    def __init__(self, bank_service: BankService, session_ttl_seconds: float = DEFAULT_SESSION_TTL_SECONDS):
+        self.bank_service = bank_service
+        self.session_ttl_seconds = float(session_ttl_seconds)
+        # token -> (số tài khoản, hạn dùng). Xếp theo lần dùng gần nhất, nên phiên hết hạn luôn nằm ở đầu.
+        self.sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.sessions_lock = threading.Lock()
+
+    def get_route(self, method: str, path: str) -> Optional[ApiRoute]:
+        return API_ROUTES.get((method.upper(), path.rstrip("/") or "/"))
+
+    def get_session_account_id(self, token: str) -> Optional[str]:
+        """Số tài khoản của phiên còn hạn (và gia hạn phiên), None nếu không có hoặc đã hết hạn."""
+        now = time.monotonic()
+        with self.sessions_lock:
+            self.remove_expired_sessions(now)
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            self.sessions[token] = (session[0], now + self.session_ttl_seconds)
+            self.sessions.move_to_end(token)
+            return session[0]
+
+    def remove_expired_sessions(self, now: float) -> None:
+        """Bỏ các phiên đã hết hạn ở đầu danh sách (gọi khi đang giữ sessions_lock)."""
+        while len(self.sessions) > 0:
+            token, (_account_id, expires_at) = next(iter(self.sessions.items()))
+            if expires_at > now:
+                return
+            del self.sessions[token]
+
+    def handle(self, method: str, path: str, parameters: Dict[str, Any], token: str = "") -> Tuple[int, Dict[str, Any]]:
+        route = self.get_route(method, path)
+        if route is None:
+            return 404, {"ok": False, "message": "Không có endpoint này."}
+
+        account_id = None
+        if route.needs_login:
+            account_id = self.get_session_account_id(token)
+            if account_id is None:
+                return 401, {"ok": False, "message": "Chưa đăng nhập hoặc phiên đã hết hạn."}
+
+        handler: Callable[..., Dict[str, Any]] = getattr(self, f"handle_{route.name}")
+        result = handler(account_id, parameters, token) if route.needs_token else handler(account_id, parameters)
+        return (200 if result["ok"] else 400), result
+
+    # -------------------------
+    # Phiên đăng nhập
+    # -------------------------
+    def handle_login(self, _account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        account_id = str(parameters.get("account_id", "")).strip()
+        ok, message = self.bank_service.authenticate_login(account_id, str(parameters.get("pin_code", "")))
+        if not ok:
+            return {"ok": False, "message": message}
+        token = secrets.token_hex(16)
+        now = time.monotonic()
+        with self.sessions_lock:
+            self.remove_expired_sessions(now)
+            self.sessions[token] = (account_id, now + self.session_ttl_seconds)
+        return {"ok": True, "message": message, "token": token, "account_id": account_id}
+
+    def handle_logout(self, account_id: Optional[str], parameters: Dict[str, Any], token: str) -> Dict[str, Any]:
+        """Chỉ bỏ phiên của người gọi; các phiên khác của cùng tài khoản (thiết bị khác) vẫn dùng được."""
+        with self.sessions_lock:
+            self.sessions.pop(token, None)
+        return {"ok": True, "message": "Đã đăng xuất."}
+
+    # -------------------------
+    # Đọc dữ liệu
+    # -------------------------
+    def handle_balance(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        ok, message, balance = self.bank_service.get_balance(account_id)
+        return {"ok": ok, "message": message, "balance": balance}
+
+    def handle_history(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Một trang lịch sử, mới nhất trước. Gửi lại next_cursor để lấy trang sau (null = đã hết)."""
+        page_size = read_integer(parameters, "page_size", DEFAULT_HISTORY_PAGE_SIZE)
+        if not isinstance(page_size, int) or page_size <= 0:
+            return {"ok": False, "message": "page_size phải là số nguyên dương."}
+        cursor = str(parameters.get("cursor", "")).strip() or None
+        try:
+            with self.bank_service.lock_accounts([account_id]):
+                rows, next_cursor = self.bank_service.get_transaction_page(
+                    account_id,
+                    min(page_size, MAX_HISTORY_PAGE_SIZE),
+                    cursor,
+                    str(parameters.get("start_time", "")),
+                    str(parameters.get("end_time", "")),
+                )
+                transactions = [transaction.to_dictionary() for transaction in rows]
+        except ValueError as error:
+            return {"ok": False, "message": str(error)}
+        return {"ok": True, "message": "OK", "transactions": transactions, "next_cursor": next_cursor}
+
+    def handle_savings(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        only_active = str(parameters.get("only_active", "")).strip().lower() in ("1", "true")
+        with self.bank_service.state_lock:
+            saving_deposits = [saving.to_dictionary() for saving in self.bank_service.get_saving_deposits(account_id, only_active)]
+            summary = self.bank_service.get_savings_summary(account_id)
+        return {"ok": True, "message": "OK", "saving_deposits": saving_deposits, "summary": summary}
+
+    # -------------------------
+    # Thay đổi dữ liệu
+    # -------------------------
+    def handle_deposit(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        ok, message = self.bank_service.deposit_money(account_id, read_integer(parameters, "amount"), str(parameters.get("note", "")))
+        return {"ok": ok, "message": message}
+
+    def handle_withdraw(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        ok, message = self.bank_service.withdraw_money(account_id, read_integer(parameters, "amount"), str(parameters.get("note", "")))
+        return {"ok": ok, "message": message}
+
+    def handle_transfer(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        ok, message = self.bank_service.transfer_money(
+            account_id,
+            str(parameters.get("to_account_id", "")).strip(),
+            read_integer(parameters, "amount"),
+            str(parameters.get("note", "")),
+        )
+        return {"ok": ok, "message": message}
+
+    def handle_open_saving(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        ok, message, deposit_id = self.bank_service.create_saving_deposit(
+            account_id,
+            read_integer(parameters, "principal_amount"),
+            read_number(parameters, "annual_interest_rate"),
+            read_integer(parameters, "term_months"),
+            str(parameters.get("note", "")),
+        )
+        return {"ok": ok, "message": message, "deposit_id": deposit_id}
+
+    def handle_settle_saving(self, account_id: Optional[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        ok, message = self.bank_service.settle_saving_deposit(account_id, str(parameters.get("deposit_id", "")).strip())
+        return {"ok": ok, "message": message}
@@ -0,0 +1,215 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from src.core.bank_service import BankService
+from src.storage.storage_backend import DEFAULT_DATA_FILE_PATH, create_storage
+
+# Chế độ chạy không tương tác (cho lịch chạy tự động): không import tkinter hay ui_helpers.
+DEFAULT_COMMIT_INTERVAL = 1000
+DEFAULT_PROGRESS_INTERVAL = 10000
+
+INTEGER_FIELDS = ("initial_balance", "amount", "principal_amount", "term_months")
+FLOAT_FIELDS = ("annual_interest_rate",)
+RESULT_COLUMNS = ["line", "op", "ok", "message", "result"]
+
+
+def read_field_value(key: str, value: Any) -> Any:
+    """Ô đọc từ CSV (hoặc JSON ghi số dưới dạng chuỗi) được đổi sang số. Giá trị sai để nguyên cho BankService báo lỗi."""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    try:
+        if key in INTEGER_FIELDS:
+            return int(text)
+        if key in FLOAT_FIELDS:
+            return float(text)
+    except ValueError:
+        return text
+    return text
+
+
+def iter_operations(input_file: TextIO, file_format: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Đọc lần lượt từng thao tác (không nạp cả file): trả về (số dòng, thao tác).
+    Dòng JSON hỏng trả về thao tác None. Dòng trống được bỏ qua.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(input_file)
+        for row in reader:
+            operation = {key: read_field_value(key, value) for key, value in row.items() if key is not None and value not in (None, "")}
+            yield reader.line_num, operation
+        return
+
+    for line_number, line in enumerate(input_file, start=1):
+        if line.strip() == "":
+            continue
+        try:
+            operation = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        if not isinstance(operation, dict):
+            yield line_number, None
+            continue
+        yield line_number, {key: read_field_value(key, value) for key, value in operation.items()}
+
+
+def run_operation(bank_service: BankService, operation: Dict[str, Any]) -> Tuple[bool, str, Optional[str]]:
+    """Gọi đúng hàm nghiệp vụ cho một thao tác. Trả về (thành công, thông báo, mã tạo ra nếu có)."""
+    operation_type = str(operation.get("op", "")).strip().lower()
+    account_id = str(operation.get("account_id", "")).strip()
+    note = str(operation.get("note", ""))
+
+    if operation_type == "create_account":
+        initial_balance = operation.get("initial_balance", 0)
+        if not isinstance(initial_balance, int):
+            return False, "Số dư ban đầu phải là số nguyên.", None
+        return bank_service.create_account(str(operation.get("owner_name", "")), str(operation.get("pin_code", "")), initial_balance)
+    if operation_type == "deposit":
+        ok, message = bank_service.deposit_money(account_id, operation.get("amount"), note)
+        return ok, message, None
+    if operation_type == "withdraw":
+        ok, message = bank_service.withdraw_money(account_id, operation.get("amount"), note)
+        return ok, message, None
+    if operation_type == "transfer":
+        to_account_id = str(operation.get("to_account_id", "")).strip()
+        ok, message = bank_service.transfer_money(account_id, to_account_id, operation.get("amount"), note)
+        return ok, message, None
+    if operation_type == "open_saving":
+        return bank_service.create_saving_deposit(
+            account_id,
+            operation.get("principal_amount"),
+            operation.get("annual_interest_rate"),
+            operation.get("term_months"),
+            note,
+        )
+    if operation_type == "settle_saving":
+        ok, message = bank_service.settle_saving_deposit(account_id, str(operation.get("deposit_id", "")).strip())
+        return ok, message, None
+    return False, f"Loại thao tác không hợp lệ: {operation_type or '(trống)'}.", None
+
+
+def get_file_format(file_path: str, file_format: Optional[str]) -> str:
+    if file_format is not None:
+        return file_format
+    return "csv" if str(file_path).lower().endswith(".csv") else "jsonl"
+
+
+class ResultWriter:
+    """Ghi kết quả từng dòng ra file JSONL hoặc CSV (cùng các cột RESULT_COLUMNS)."""
+
+    def __init__(self, output_file: TextIO, file_format: str):
+        self.output_file = output_file
+        self.csv_writer = None
+        if file_format == "csv":
+            self.csv_writer = csv.DictWriter(output_file, fieldnames=RESULT_COLUMNS)
+            self.csv_writer.writeheader()
+
+    def write(self, result: Dict[str, Any]) -> None:
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(result)
+        else:
+            self.output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def print_progress(processed_count: int, started_at: float, log_file: TextIO) -> None:
+    elapsed = max(time.perf_counter() - started_at, 1e-9)
+    print(f"Đã xử lý {processed_count} thao tác ({processed_count / elapsed:.0f} thao tác/giây).", file=log_file)
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    data_file_path: str = DEFAULT_DATA_FILE_PATH,
+    commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+    progress_interval: int = DEFAULT_PROGRESS_INTERVAL,
+    input_format: Optional[str] = None,
+    log_file: TextIO = sys.stderr,
+) -> Dict[str, Any]:
+    """
+    Chạy lần lượt các thao tác trong file (JSONL hoặc CSV) qua BankService và ghi kết quả từng dòng.
+    - commit_interval: cứ sau từng ấy thao tác thì lưu các thay đổi một lần (cuối file luôn lưu).
+    - progress_interval: cứ sau từng ấy thao tác thì in tiến độ và tốc độ ra log_file (0 = không in).
+    Một dòng lỗi không làm dừng cả lô. Trả về số liệu tổng kết.
+    """
+    commit_interval = max(int(commit_interval), 1)
+    input_format = get_file_format(input_path, input_format)
+    storage = create_storage(data_file_path)
+    bank_service = BankService(storage.load(lazy_transactions=True))
+
+    # Như khi mở chương trình: tất toán các sổ tiết kiệm đã đến hạn trước khi chạy lô.
+    ok, message, processed_ids = bank_service.process_matured_deposits()
+    if ok and len(processed_ids) > 0:
+        storage.persist(bank_service)
+        print(message, file=log_file)
+
+    processed_count = 0
+    succeeded_count = 0
+    started_at = time.perf_counter()
+    try:
+        with open(input_path, "r", encoding="utf-8", newline="") as input_file, \
+                open(output_path, "w", encoding="utf-8", newline="") as output_file:
+            result_writer = ResultWriter(output_file, get_file_format(output_path, None))
+            for line_number, operation in iter_operations(input_file, input_format):
+                if operation is None:
+                    ok, message, result = False, "Dòng không phải đối tượng JSON hợp lệ.", None
+                    operation_type = ""
+                else:
+                    ok, message, result = run_operation(bank_service, operation)
+                    operation_type = str(operation.get("op", ""))
+                result_writer.write({"line": line_number, "op": operation_type, "ok": ok, "message": message, "result": result})
+
+                processed_count += 1
+                if ok:
+                    succeeded_count += 1
+                if processed_count % commit_interval == 0:
+                    storage.persist(bank_service)
+                if progress_interval > 0 and processed_count % progress_interval == 0:
+                    print_progress(processed_count, started_at, log_file)
+    finally:
+        storage.persist(bank_service)
+        storage.close()
+
+    elapsed = time.perf_counter() - started_at
+    summary = {
+        "processed": processed_count,
+        "succeeded": succeeded_count,
+        "failed": processed_count - succeeded_count,
+        "seconds": round(elapsed, 3),
+        "operations_per_second": round(processed_count / max(elapsed, 1e-9)),
+    }
+    print(
+        f"Xong: {summary['processed']} thao tác, {summary['succeeded']} thành công, {summary['failed']} lỗi, "
+        f"{summary['seconds']} giây ({summary['operations_per_second']} thao tác/giây).",
+        file=log_file,
+    )
+    return summary
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mini Bank: chạy một file thao tác không cần giao diện.")
+    parser.add_argument("input_path", help="file thao tác (.jsonl hoặc .csv)")
+    parser.add_argument("output_path", help="file kết quả (.jsonl hoặc .csv)")
+    parser.add_argument("--data", default=DEFAULT_DATA_FILE_PATH, help="file dữ liệu ngân hàng (.json hoặc .db)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="định dạng file thao tác (mặc định theo đuôi file)")
+    parser.add_argument("--commit-interval", type=int, default=DEFAULT_COMMIT_INTERVAL, help="lưu sau mỗi N thao tác")
+    parser.add_argument("--progress-interval", type=int, default=DEFAULT_PROGRESS_INTERVAL, help="in tiến độ sau mỗi N thao tác (0 = tắt)")
+    options = parser.parse_args(arguments)
+
+    summary = run_batch(
+        options.input_path,
+        options.output_path,
+        data_file_path=options.data,
+        commit_interval=options.commit_interval,
+        progress_interval=options.progress_interval,
+        input_format=options.format,
+    )
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,11 @@
 from typing import Optional, Tuple  
-from src.storage.json_storage import load_bank_data, save_bank_data
+from src.storage.storage_backend import DEFAULT_DATA_FILE_PATH, create_storage
 from src.core.bank_service import BankService
+from src.core.transaction_query import TransactionQuery
 from src.ui.ui_helpers import format_money_vnd, is_pin_format_valid  
 import re  
 
 
-DATA_FILE_PATH = "data/bank_data.json"
-
-
 def parse_money_text(text: str) -> Optional[int]:  
     """Parse số tiền cho CLI.
     Cho phép nhập 100000 hoặc 100.000 hoặc 100,000 hoặc '100 000'.
@@ -25,14 +23,26 @@ def parse_money_text(text: str) -> Optional[int]:
     return value  
 
 
+def save_changes(storage, bank_service: BankService) -> None:
+    """Chỉ ghi nối tiếp các thay đổi mới vào journal, không ghi lại toàn bộ file."""
+    storage.persist(bank_service)
+
+
 def wait_for_enter() -> None:
     input("\nNhấn Enter để tiếp tục...")
 
 
-def run_application() -> None:
-    bank_data = load_bank_data(DATA_FILE_PATH)
+def run_application(data_file_path: str = DEFAULT_DATA_FILE_PATH) -> None:
+    storage = create_storage(data_file_path)
+    bank_data = storage.load(lazy_transactions=True)
     bank_service = BankService(bank_data)
 
+    # Xử lý cuối kỳ: tất toán các sổ tiết kiệm đã đến hạn trong lúc chương trình không chạy.
+    ok, message, processed_ids = bank_service.process_matured_deposits()
+    if ok and len(processed_ids) > 0:
+        save_changes(storage, bank_service)
+        print(message)
+
     while True:
         print("\n" + "=" * 60)
         print("MINI BANK")
@@ -45,16 +55,17 @@ def run_application() -> None:
 
         if choice == "1":
             create_account_screen(bank_service)
-            save_bank_data(DATA_FILE_PATH, bank_service.build_snapshot_data())
+            save_changes(storage, bank_service)
 
         elif choice == "2":
             account_id = login_screen(bank_service)
             if account_id is not None:
-                session_menu(bank_service, account_id)
-                save_bank_data(DATA_FILE_PATH, bank_service.build_snapshot_data())
+                session_menu(storage, bank_service, account_id)
+                save_changes(storage, bank_service)
 
         elif choice == "3":
-            save_bank_data(DATA_FILE_PATH, bank_service.build_snapshot_data())
+            save_changes(storage, bank_service)
+            storage.close()
             print("Đã lưu dữ liệu. Tạm biệt.")
             return
 
@@ -122,7 +133,7 @@ def login_screen(bank_service: BankService) -> Optional[str]:
     return account_id
 
 
-def session_menu(bank_service: BankService, account_id: str) -> None:
+def session_menu(storage, bank_service: BankService, account_id: str) -> None:
     while True:
         account = bank_service.get_account(account_id)
         if account is None:
@@ -145,15 +156,15 @@ def session_menu(bank_service: BankService, account_id: str) -> None:
 
         if choice == "1":
             deposit_screen(bank_service, account_id)
-            save_bank_data(DATA_FILE_PATH, bank_service.build_snapshot_data())
+            save_changes(storage, bank_service)
 
         elif choice == "2":
             withdraw_screen(bank_service, account_id)
-            save_bank_data(DATA_FILE_PATH, bank_service.build_snapshot_data())
+            save_changes(storage, bank_service)
 
         elif choice == "3":
             transfer_screen(bank_service, account_id)
-            save_bank_data(DATA_FILE_PATH, bank_service.build_snapshot_data())
+            save_changes(storage, bank_service)
 
         elif choice == "4":
             ok, _, balance = bank_service.get_balance(account_id)
@@ -235,11 +246,66 @@ def transfer_screen(bank_service: BankService, from_account_id: str) -> None:
     wait_for_enter()
 
 
+HISTORY_TYPE_CHOICES = {
+    "1": ("DEPOSIT",),
+    "2": ("WITHDRAW",),
+    "3": ("TRANSFER_OUT",),
+    "4": ("TRANSFER_IN",),
+    "5": ("SAVINGS_OPEN", "SAVINGS_CLOSE"),
+    "6": ("PAYROLL_OUT", "PAYROLL_IN"),
+}
+
+
+def read_history_query(account_id: str) -> Optional[TransactionQuery]:
+    """Hỏi các điều kiện lọc lịch sử. Bỏ trống một ô nghĩa là không lọc theo ô đó. Trả về None nếu nhập sai."""
+    print("Loại: 1) Nạp  2) Rút  3) Chuyển đi  4) Nhận tiền  5) Tiết kiệm  6) Lương")
+    type_text = input("Loại giao dịch (Enter = tất cả): ").strip()
+    if type_text != "" and type_text not in HISTORY_TYPE_CHOICES:
+        print("Loại giao dịch không hợp lệ.")
+        return None
+
+    amounts = []
+    for prompt in ("Số tiền từ (Enter = bỏ qua): ", "Đến số tiền (Enter = bỏ qua): "):
+        amount_text = input(prompt).strip()
+        if amount_text == "":
+            amounts.append(None)
+            continue
+        amount = parse_money_text(amount_text)
+        if amount is None:
+            print("Số tiền không hợp lệ.")
+            return None
+        amounts.append(amount)
+
+    return TransactionQuery(
+        account_id=account_id,
+        transaction_types=HISTORY_TYPE_CHOICES.get(type_text, ()),
+        min_amount=amounts[0],
+        max_amount=amounts[1],
+        counterparty_id=input("Tài khoản đối ứng (Enter = bỏ qua): ").strip(),
+        start_time=input("Từ ngày YYYY-MM-DD (Enter = bỏ qua): ").strip(),
+        end_time=input("Đến ngày YYYY-MM-DD (Enter = bỏ qua): ").strip(),
+        keyword=input("Từ khóa (Enter = bỏ qua): ").strip(),
+    )
+
+
+def print_history_line(index: int, transaction) -> None:
+    line = (
+        f"{index:02d}) {transaction.time_text} | {transaction.transaction_id} | "
+        f"{transaction.transaction_type} | {format_money_vnd(transaction.amount)}"
+    )
+
+    if transaction.transaction_type.startswith("TRANSFER"):
+        line += f" | {transaction.from_account_id} -> {transaction.to_account_id}"
+
+    if transaction.note != "":
+        line += f" | Ghi chú: {transaction.note}"
+
+    print(line)
+
+
 def show_history_screen(bank_service: BankService, account_id: str) -> None:
     print("\n--- LỊCH SỬ GIAO DỊCH (mới nhất trước) ---")
-    history = bank_service.get_transaction_history(account_id)
-
-    if len(history) == 0:
+    if bank_service.get_account_transaction_count(account_id) == 0:
         print("Chưa có giao dịch.")
         return
 
@@ -254,17 +320,35 @@ def show_history_screen(bank_service: BankService, account_id: str) -> None:
     if limit < 1:
         limit = 10
 
-    show_list = history[:limit]
-    for index, transaction in enumerate(show_list, start=1):
-        line = (
-            f"{index:02d}) {transaction.time_text} | {transaction.transaction_id} | "
-            f"{transaction.transaction_type} | {format_money_vnd(transaction.amount)}"
-        )
-
-        if transaction.transaction_type.startswith("TRANSFER"):
-            line += f" | {transaction.from_account_id} -> {transaction.to_account_id}"
-
-        if transaction.note != "":
-            line += f" | Ghi chú: {transaction.note}"
+    # Có lọc: bộ truy vấn trả về đúng các giao dịch khớp, in dần từng trang.
+    results = None
+    if input("Lọc lịch sử? (c/K): ").strip().lower() == "c":
+        query = read_history_query(account_id)
+        if query is None:
+            return
+        ok, message, results = bank_service.query_transactions(query)
+        if not ok:
+            print(message)
+            return
+        if len(results) == 0:
+            print("Không có giao dịch phù hợp.")
+            return
 
-        print(line)
+    cursor = None
+    index = 0
+    while True:
+        if results is not None:
+            page = results[index:index + limit]
+        else:
+            # Mỗi lần chỉ lấy đúng một trang, không dựng cả lịch sử.
+            page, cursor = bank_service.get_transaction_page(account_id, limit, cursor)
+        for transaction in page:
+            index += 1
+            print_history_line(index, transaction)
+
+        has_more = index < len(results) if results is not None else cursor is not None
+        if not has_more:
+            break
+        more_text = input(f"Xem tiếp {limit} giao dịch cũ hơn? (c/K): ").strip().lower()
+        if more_text != "c":
+            break
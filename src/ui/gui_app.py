@@ -1,8 +1,8 @@
-from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-from src.storage.json_storage import load_bank_data, save_bank_data
+from src.storage.background_writer import BackgroundWriter
+from src.storage.storage_backend import DEFAULT_DATA_FILE_PATH, create_storage
 from src.core.bank_service import BankService
 from src.ui.screens_start import StartFrame
 from src.ui.screens_auth import RegisterFrame, LoginFrame
@@ -21,8 +21,8 @@ from src.ui.ui_helpers import (
     center_window,
 )
 
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-DATA_FILE_PATH = str(PROJECT_ROOT / 'data' / 'bank_data.json')
+# Chu kỳ kiểm tra sổ tiết kiệm đến hạn (mili giây).
+MATURITY_CHECK_INTERVAL_MS = 60000
 
 
 class MiniBankApplication(tk.Tk):
@@ -44,7 +44,8 @@ class MiniBankApplication(tk.Tk):
         self.setup_style()
         self.setup_menu()
 
-        bank_data = load_bank_data(DATA_FILE_PATH)
+        self.storage = create_storage(DEFAULT_DATA_FILE_PATH)
+        bank_data = self.storage.load(lazy_transactions=True)
         self.bank_service = BankService(bank_data)
 
         self.build_shell_layout()
@@ -62,6 +63,11 @@ class MiniBankApplication(tk.Tk):
         self.bind_all('<Escape>', self._handle_escape)
         self.bind_all('<Control-m>', lambda event: self.toggle_maximize())
         self.protocol('WM_DELETE_WINDOW', self.on_window_close)
+        # Luồng ghi nền không phải daemon: chỉ khởi động khi mọi bước dựng giao diện đã xong,
+        # để lỗi lúc khởi động không để lại một luồng giữ tiến trình mãi không thoát.
+        self.background_writer = BackgroundWriter(self.storage)
+        self.after(200, self.poll_save_results)
+        self.after(1000, self.process_matured_deposits)
 
     def setup_style(self) -> None:
         style = ttk.Style(self)
@@ -197,7 +203,7 @@ class MiniBankApplication(tk.Tk):
             'Mini Bank',
             'Mini Bank - bản nâng cấp giao diện phong cách BIDV.\n'
             'Dự án giữ nguyên lõi nghiệp vụ nhưng thay mới giao diện, bảng điều khiển và các hộp thoại giao dịch.\n\n'
-            f'Tệp dữ liệu hiện dùng:\n{DATA_FILE_PATH}',
+            f'Tệp dữ liệu hiện dùng:\n{DEFAULT_DATA_FILE_PATH}',
             parent=self,
         )
 
@@ -223,7 +229,7 @@ class MiniBankApplication(tk.Tk):
 
     def update_quick_summary(self) -> None:
         account_count = len(self.bank_service.accounts_by_id)
-        transaction_count = len(self.bank_service.transaction_list)
+        transaction_count = self.bank_service.get_transaction_count()
         saving_count = len(self.bank_service.saving_deposits)
         self.quick_summary_text.set(f'Tài khoản: {account_count} | Giao dịch: {transaction_count} | Sổ tiết kiệm: {saving_count}')
         self.update_header_context()
@@ -301,12 +307,35 @@ class MiniBankApplication(tk.Tk):
         self.set_status(f'Đang ở màn hình: {self.page_title_var.get()}')
 
     def save_data(self) -> None:
-        save_bank_data(DATA_FILE_PATH, self.bank_service.build_snapshot_data())
+        self.background_writer.request_save(self.bank_service)
         self.update_quick_summary()
-        self.set_status('Đã lưu dữ liệu.')
+        self.set_status('Đang lưu dữ liệu...')
+
+    def poll_save_results(self) -> None:
+        for ok, message in self.background_writer.take_results():
+            self.set_status(message)
+            if not ok:
+                messagebox.showwarning('Lỗi lưu dữ liệu', message, parent=self)
+        self.after(200, self.poll_save_results)
+
+    def process_matured_deposits(self) -> None:
+        """Định kỳ tất toán các sổ tiết kiệm đã đến hạn (chỉ xem đỉnh lịch đáo hạn nếu chưa có sổ nào đến hạn)."""
+        ok, message, processed_ids = self.bank_service.process_matured_deposits()
+        if ok and len(processed_ids) > 0:
+            self.save_data()
+            self.refresh_current_frame()
+            self.set_status(message)
+        self.after(MATURITY_CHECK_INTERVAL_MS, self.process_matured_deposits)
 
     def on_window_close(self) -> None:
         self.save_data()
+        self.set_status('Đang ghi nốt dữ liệu trước khi thoát...')
+        self.update_idletasks()
+        try:
+            self.background_writer.close()
+            self.storage.close()
+        except Exception as error:
+            messagebox.showerror('Lỗi lưu dữ liệu', f'Không thể ghi dữ liệu: {error}', parent=self)
         self.destroy()
 
 
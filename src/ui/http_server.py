@@ -0,0 +1,247 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from src.core.bank_service import BankService
+from src.storage.background_writer import BackgroundWriter
+from src.storage.storage_backend import DEFAULT_DATA_FILE_PATH, create_storage
+from src.ui.bank_api import BankApi, RequestCounters, build_stats_response
+
+# Máy chủ JSON qua HTTP (chỉ dùng thư viện chuẩn) để quầy giao dịch, ATM, tác vụ theo lô cùng dùng một ngân hàng.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_MAX_WORKERS = 8
+# Số kết nối được chờ thêm khi mọi luồng xử lý đang bận; quá mức này thì vòng nhận kết nối dừng lại chờ.
+DEFAULT_QUEUED_CONNECTIONS = 64
+# Thời gian chờ (giây) mỗi lần đọc header / body của một yêu cầu.
+REQUEST_TIMEOUT_SECONDS = 5
+# Kết nối keep-alive im lặng giữa hai yêu cầu quá thời gian này (giây) thì đóng, để trả luồng xử lý cho kết nối khác.
+KEEP_ALIVE_IDLE_SECONDS = 1
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class BankRequestHandler(BaseHTTPRequestHandler):
+    """
+    Đọc một yêu cầu JSON, chuyển cho BankApi và trả kết quả. HTTP/1.1 nên kết nối được giữ lại (keep-alive),
+    trừ khi đang có kết nối khác chờ luồng xử lý (xem BankHTTPServer).
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = REQUEST_TIMEOUT_SECONDS
+    # Header và body được gửi thành hai lần ghi; tắt Nagle để lần ghi thứ hai không phải chờ ACK trễ (~40 ms).
+    disable_nagle_algorithm = True
+    server: "BankHTTPServer"
+
+    def do_GET(self) -> None:
+        self.handle_api_request()
+
+    def do_POST(self) -> None:
+        self.handle_api_request()
+
+    def handle(self) -> None:
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            # Chờ yêu cầu kế tiếp ngắn hơn chờ đọc một yêu cầu: kết nối im lặng đang giữ một luồng xử lý.
+            self.connection.settimeout(KEEP_ALIVE_IDLE_SECONDS)
+            self.handle_one_request()
+
+    def parse_request(self) -> bool:
+        # Đã nhận dòng đầu của yêu cầu: phần còn lại (header, body) được chờ theo REQUEST_TIMEOUT_SECONDS.
+        self.connection.settimeout(self.timeout)
+        return super().parse_request()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Số liệu yêu cầu đã có ở /stats; không in từng dòng log ra stderr.
+        return
+
+    def read_parameters(self, query_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Tham số từ query string, cộng thêm body JSON (nếu có).
+        Trả về None nếu Content-Length không phải số hoặc body không phải đối tượng JSON.
+        """
+        parameters: Dict[str, Any] = dict(parse_qsl(query_text))
+        try:
+            body_length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return None
+        if body_length <= 0:
+            return parameters
+        if body_length > MAX_BODY_BYTES:
+            return None
+        try:
+            body = json.loads(self.rfile.read(body_length).decode("utf-8"))
+        except ValueError:
+            return None
+        if not isinstance(body, dict):
+            return None
+        parameters.update(body)
+        return parameters
+
+    def handle_api_request(self) -> None:
+        started_at = time.perf_counter()
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        parameters = self.read_parameters(url.query)
+
+        if parameters is None:
+            route_name = "invalid"
+            status, payload = 400, {"ok": False, "message": "Body phải là một đối tượng JSON."}
+            self.close_connection = True
+        elif self.command == "GET" and path == "/stats":
+            route_name = "stats"
+            status, payload = build_stats_response(self.server.counters, self.client_address[0])
+        else:
+            route = self.server.api.get_route(self.command, path)
+            route_name = route.name if route is not None else "not_found"
+            token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+            try:
+                status, payload = self.server.api.handle(self.command, path, parameters, token)
+            except Exception as error:
+                status, payload = 500, {"ok": False, "message": f"Lỗi máy chủ: {error}"}
+            if route is not None and route.is_mutation and payload.get("ok"):
+                self.server.request_save()
+
+        self.send_json(status, payload)
+        self.server.counters.record(route_name, status < 500 and payload.get("ok", False), time.perf_counter() - started_at)
+
+    def send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.has_waiting_connections():
+            # Nhóm luồng đã kín: trả luồng này cho kết nối đang chờ thay vì giữ keep-alive.
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class BankHTTPServer(HTTPServer):
+    """
+    HTTPServer với một nhóm luồng xử lý có giới hạn (ThreadPoolExecutor) thay cho mỗi kết nối một luồng.
+    Mỗi kết nối mở giữ một luồng, kể cả lúc im lặng giữa hai yêu cầu keep-alive, nên tối đa max_workers kết nối
+    được phục vụ cùng lúc. Để kết nối mới không phải chờ lâu:
+    - kết nối keep-alive im lặng quá KEEP_ALIVE_IDLE_SECONDS thì bị đóng;
+    - khi có kết nối đang chờ luồng, mỗi câu trả lời kèm "Connection: close" để trả luồng ngay sau yêu cầu đó.
+    Khi cả nhóm luồng lẫn hàng chờ (queued_connections) đều đầy, vòng nhận kết nối dừng lại chờ.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        server_address: Any,
+        bank_service: BankService,
+        storage: Any = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        queued_connections: int = DEFAULT_QUEUED_CONNECTIONS,
+    ):
+        # Tạo trước khi mở cổng: mở cổng lỗi thì TCPServer gọi server_close, hàm này cần executor.
+        self.max_workers = max(int(max_workers), 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bank-http")
+        self.connection_slots = threading.BoundedSemaphore(self.max_workers + max(int(queued_connections), 0))
+        # Số kết nối đã nhận mà chưa xử lý xong (đang giữ luồng hoặc đang chờ luồng).
+        self.open_connections = 0
+        self.open_connections_lock = threading.Lock()
+        super().__init__(server_address, BankRequestHandler)
+        self.bank_service = bank_service
+        # storage=None: không lưu (dùng khi thử nghiệm).
+        self.storage = storage
+        self.api = BankApi(bank_service)
+        self.counters = RequestCounters()
+        # Luồng ghi nền không phải daemon nên khởi động sau cùng (xem create_server với lỗi sau bước này).
+        self.background_writer = BackgroundWriter(storage) if storage is not None else None
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.connection_slots.acquire()
+        with self.open_connections_lock:
+            self.open_connections += 1
+        self.executor.submit(self.process_request_in_worker, request, client_address)
+
+    def has_waiting_connections(self) -> bool:
+        """Có kết nối đã nhận nhưng đang chờ vì mọi luồng xử lý đều bận hay không."""
+        with self.open_connections_lock:
+            return self.open_connections > self.max_workers
+
+    def process_request_in_worker(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self.open_connections_lock:
+                self.open_connections -= 1
+            self.connection_slots.release()
+
+    def request_save(self) -> None:
+        """Gửi các thay đổi mới cho luồng ghi nền (các lần lưu sát nhau được gộp thành một lần ghi)."""
+        if self.background_writer is not None:
+            self.background_writer.request_save(self.bank_service)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+    def close(self) -> None:
+        """Đóng máy chủ (chờ các yêu cầu đang xử lý) rồi ghi nốt dữ liệu còn chờ và đóng file dữ liệu."""
+        self.server_close()
+        if self.background_writer is not None:
+            self.request_save()
+            self.background_writer.close()
+            self.storage.close()
+
+
+def create_server(
+    data_file_path: str = DEFAULT_DATA_FILE_PATH,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> BankHTTPServer:
+    """Đọc dữ liệu, tất toán sổ đã đến hạn và dựng máy chủ (port=0: tự chọn cổng trống, xem server.server_address)."""
+    storage = create_storage(data_file_path)
+    bank_service = BankService(storage.load(lazy_transactions=True), thread_safe=True)
+    try:
+        server = BankHTTPServer((host, int(port)), bank_service, storage, max_workers)
+    except Exception:
+        storage.close()
+        raise
+    try:
+        ok, _message, processed_ids = bank_service.process_matured_deposits()
+        if ok and len(processed_ids) > 0:
+            server.request_save()
+    except Exception:
+        # Luồng ghi nền đã chạy: phải dừng nó, nếu không tiến trình không thoát được.
+        server.close()
+        raise
+    return server
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mini Bank: máy chủ JSON qua HTTP.")
+    parser.add_argument("--data", default=DEFAULT_DATA_FILE_PATH, help="file dữ liệu ngân hàng (.json hoặc .db)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="số luồng xử lý yêu cầu")
+    options = parser.parse_args(arguments)
+
+    server = create_server(options.data, options.host, options.port, options.workers)
+    print(f"Mini Bank đang chạy tại http://{server.server_address[0]}:{server.server_address[1]} (Ctrl+C để dừng).", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -147,11 +147,13 @@ class DashboardFrame(ttk.Frame):
         account_id = self.get_logged_account_id()
         if account_id == '':
             return
-        history = self.app.bank_service.get_transaction_history(account_id)
-        for transaction in history[:5]:
+        recent_page, _next_cursor = self.app.bank_service.get_transaction_page(account_id, 5)
+        shown_count = 0
+        for transaction in recent_page:
+            shown_count += 1
             note_text = str(transaction.note).strip() if str(transaction.note).strip() != '' else '-'
             self.transaction_tree.insert('', 'end', values=(transaction.time_text, get_transaction_type_display(transaction.transaction_type), format_money_vnd(transaction.amount), note_text))
-        if len(history) == 0:
+        if shown_count == 0:
             self.transaction_tree.insert('', 'end', values=('-', '-', '-', 'Chưa có giao dịch nào'))
 
     def refresh_information(self) -> None:
@@ -164,7 +166,7 @@ class DashboardFrame(ttk.Frame):
             self.refresh_recent_transactions()
             return
 
-        history = self.app.bank_service.get_transaction_history(account.account_id)
+        transaction_count = self.app.bank_service.get_account_transaction_count(account.account_id)
         savings_summary = self.app.bank_service.get_savings_summary(account.account_id)
         self.welcome_label.configure(text=f'Xin chào, {account.owner_name}!')
         self.info_line_label.configure(
@@ -176,7 +178,7 @@ class DashboardFrame(ttk.Frame):
         )
         self.account_id_value.configure(text=account.account_id)
         self.balance_value.configure(text=format_money_vnd(account.balance))
-        self.transaction_count_value.configure(text=str(len(history)))
+        self.transaction_count_value.configure(text=str(transaction_count))
         self.savings_count_value.configure(text=str(savings_summary['active_count']))
         self.refresh_recent_transactions()
         self.app.set_status('Đã làm mới thông tin tài khoản.')
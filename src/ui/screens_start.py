@@ -144,8 +144,8 @@ class StartFrame(ttk.Frame):
 
     def refresh_summary(self) -> None:
         account_count = len(self.app.bank_service.accounts_by_id)
-        transaction_count = len(self.app.bank_service.transaction_list)
-        total_balance = sum(int(account.balance) for account in self.app.bank_service.accounts_by_id.values())
+        transaction_count = self.app.bank_service.get_transaction_count()
+        total_balance = self.app.bank_service.get_total_balance()
         self.account_value.configure(text=str(account_count))
         self.transaction_value.configure(text=str(transaction_count))
         self.balance_value.configure(text=format_money_vnd(total_balance))
@@ -79,23 +79,12 @@ def get_transaction_type_display(transaction_type: str) -> str:
         'transfer': 'Chuyển khoản',
         'savings_open': 'Gửi tiết kiệm',
         'savings_close': 'Tất toán tiết kiệm',
+        'payroll_out': 'Chi lương',
+        'payroll_in': 'Nhận lương',
     }
     return mapping.get(raw, str(transaction_type))
 
 
-def build_transaction_search_text(transaction) -> str:
-    parts = [
-        str(getattr(transaction, 'transaction_id', '')),
-        str(getattr(transaction, 'time_text', '')),
-        str(getattr(transaction, 'transaction_type', '')),
-        str(getattr(transaction, 'amount', '')),
-        str(getattr(transaction, 'note', '')),
-        str(getattr(transaction, 'from_account_id', '')),
-        str(getattr(transaction, 'to_account_id', '')),
-    ]
-    return ' '.join(parts).lower()
-
-
 def short_account_text(account_id: str) -> str:
     raw = str(account_id).strip()
     if len(raw) <= 4:
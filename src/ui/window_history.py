@@ -1,7 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-from src.ui.ui_helpers import apply_responsive_toplevel, center_window, build_transaction_search_text, format_money_vnd, get_transaction_type_display
+from src.core.transaction_query import TransactionQuery
+from src.ui.ui_helpers import apply_responsive_toplevel, center_window, format_money_vnd, get_transaction_type_display, read_money_amount
+
+HISTORY_PAGE_SIZE = 200
+# Lựa chọn trong ô "Loại giao dịch" và các loại giao dịch tương ứng (rỗng = không lọc).
+HISTORY_TYPE_FILTERS = {
+    'Tất cả': (),
+    'Nạp tiền': ('DEPOSIT',),
+    'Rút tiền': ('WITHDRAW',),
+    'Chuyển đi': ('TRANSFER_OUT',),
+    'Nhận tiền': ('TRANSFER_IN',),
+    'Tiết kiệm': ('SAVINGS_OPEN', 'SAVINGS_CLOSE'),
+    'Lương': ('PAYROLL_OUT', 'PAYROLL_IN'),
+}
 
 
 class HistoryWindow(tk.Toplevel):
@@ -18,13 +31,24 @@ class HistoryWindow(tk.Toplevel):
         self.search_var = tk.StringVar()
         self.summary_var = tk.StringVar(value='')
         self.filter_var = tk.StringVar(value='Tất cả')
-        self.all_history = []
+        self.start_date_var = tk.StringVar(value='')
+        self.end_date_var = tk.StringVar(value='')
+        self.min_amount_var = tk.StringVar(value='')
+        self.max_amount_var = tk.StringVar(value='')
+        self.counterparty_var = tk.StringVar(value='')
+        # Chỉ giữ các trang đã hiển thị; history_cursor là con trỏ để tải trang kế tiếp (None = đã hết).
+        # Khi có điều kiện lọc, kết quả lấy từ bank_service.query_transactions (query_results) rồi hiển thị dần từng trang.
+        self.shown_history = []
+        self.history_cursor = None
+        self.has_more_history = False
+        self.query_results = None
+        self.history_query = None
 
         main = ttk.Frame(self, style='Card.TFrame', padding=(20, 18))
         main.pack(fill='both', expand=True)
 
         ttk.Label(main, text=f'Lịch sử giao dịch của tài khoản {self.account_id}', style='SectionTitle.TLabel').pack(anchor='w')
-        ttk.Label(main, text='Bạn có thể lọc theo loại giao dịch hoặc tìm kiếm theo thời gian, ghi chú và mã tài khoản.', style='Surface.TLabel', wraplength=860, justify='left').pack(anchor='w', pady=(6, 14))
+        ttk.Label(main, text='Bạn có thể lọc theo loại giao dịch, khoảng ngày, số tiền, tài khoản đối ứng hoặc tìm kiếm theo thời gian, ghi chú và mã tài khoản.', style='Surface.TLabel', wraplength=860, justify='left').pack(anchor='w', pady=(6, 14))
 
         filter_frame = ttk.LabelFrame(main, text='Tìm kiếm và lọc', style='Card.TLabelframe')
         filter_frame.pack(fill='x')
@@ -36,13 +60,42 @@ class HistoryWindow(tk.Toplevel):
         search_entry.bind('<KeyRelease>', lambda event: self.apply_filters())
 
         ttk.Label(filter_frame, text='Loại giao dịch', style='Surface.TLabel').grid(row=0, column=2, padx=8, pady=8, sticky='w')
-        filter_combo = ttk.Combobox(filter_frame, textvariable=self.filter_var, values=['Tất cả', 'Nạp tiền', 'Rút tiền', 'Chuyển đi', 'Nhận tiền', 'Tiết kiệm'], width=18, state='readonly')
+        filter_combo = ttk.Combobox(filter_frame, textvariable=self.filter_var, values=list(HISTORY_TYPE_FILTERS), width=18, state='readonly')
         filter_combo.grid(row=0, column=3, padx=8, pady=8, sticky='w')
         filter_combo.bind('<<ComboboxSelected>>', lambda event: self.apply_filters())
 
         ttk.Button(filter_frame, text='Làm mới', command=self.refresh_history, style='Secondary.TButton').grid(row=0, column=4, padx=8, pady=8)
         ttk.Button(filter_frame, text='Xóa lọc', command=self.clear_filters, style='Light.TButton').grid(row=0, column=5, padx=8, pady=8)
 
+        ttk.Label(filter_frame, text='Từ ngày', style='Surface.TLabel').grid(row=1, column=0, padx=8, pady=(0, 8), sticky='w')
+        start_date_entry = ttk.Entry(filter_frame, textvariable=self.start_date_var, width=20)
+        start_date_entry.grid(row=1, column=1, padx=8, pady=(0, 8), sticky='w')
+        start_date_entry.bind('<Return>', lambda event: self.apply_filters())
+        start_date_entry.bind('<FocusOut>', lambda event: self.apply_filters())
+
+        ttk.Label(filter_frame, text='Đến ngày', style='Surface.TLabel').grid(row=1, column=2, padx=8, pady=(0, 8), sticky='w')
+        end_date_entry = ttk.Entry(filter_frame, textvariable=self.end_date_var, width=20)
+        end_date_entry.grid(row=1, column=3, padx=8, pady=(0, 8), sticky='w')
+        end_date_entry.bind('<Return>', lambda event: self.apply_filters())
+        end_date_entry.bind('<FocusOut>', lambda event: self.apply_filters())
+        ttk.Label(filter_frame, text='(YYYY-MM-DD)', style='Surface.TLabel').grid(row=1, column=4, columnspan=2, padx=8, pady=(0, 8), sticky='w')
+
+        ttk.Label(filter_frame, text='Số tiền từ', style='Surface.TLabel').grid(row=2, column=0, padx=8, pady=(0, 8), sticky='w')
+        min_amount_entry = ttk.Entry(filter_frame, textvariable=self.min_amount_var, width=20)
+        min_amount_entry.grid(row=2, column=1, padx=8, pady=(0, 8), sticky='w')
+
+        ttk.Label(filter_frame, text='Đến số tiền', style='Surface.TLabel').grid(row=2, column=2, padx=8, pady=(0, 8), sticky='w')
+        max_amount_entry = ttk.Entry(filter_frame, textvariable=self.max_amount_var, width=20)
+        max_amount_entry.grid(row=2, column=3, padx=8, pady=(0, 8), sticky='w')
+
+        ttk.Label(filter_frame, text='TK đối ứng', style='Surface.TLabel').grid(row=2, column=4, padx=8, pady=(0, 8), sticky='w')
+        counterparty_entry = ttk.Entry(filter_frame, textvariable=self.counterparty_var, width=14)
+        counterparty_entry.grid(row=2, column=5, padx=8, pady=(0, 8), sticky='w')
+
+        for entry in (min_amount_entry, max_amount_entry, counterparty_entry):
+            entry.bind('<Return>', lambda event: self.apply_filters())
+            entry.bind('<FocusOut>', lambda event: self.apply_filters())
+
         table_card = ttk.Frame(main, style='Card.TFrame', padding=(0, 14, 0, 0))
         table_card.pack(fill='both', expand=True)
 
@@ -69,9 +122,11 @@ class HistoryWindow(tk.Toplevel):
 
         action_frame = ttk.Frame(bottom_frame, style='Card.TFrame')
         action_frame.pack(side='right')
-        ttk.Button(action_frame, text='Xem chi tiết', command=self.show_selected_detail, style='Secondary.TButton').grid(row=0, column=0, padx=(0, 10))
-        ttk.Button(action_frame, text='Copy dòng đã chọn', command=self.copy_selected_row, style='Light.TButton').grid(row=0, column=1, padx=(0, 10))
-        ttk.Button(action_frame, text='Đóng', command=self.destroy, style='Light.TButton').grid(row=0, column=2)
+        self.load_more_button = ttk.Button(action_frame, text=f'Tải thêm {HISTORY_PAGE_SIZE} dòng', command=self.load_history_page, style='Light.TButton')
+        self.load_more_button.grid(row=0, column=0, padx=(0, 10))
+        ttk.Button(action_frame, text='Xem chi tiết', command=self.show_selected_detail, style='Secondary.TButton').grid(row=0, column=1, padx=(0, 10))
+        ttk.Button(action_frame, text='Copy dòng đã chọn', command=self.copy_selected_row, style='Light.TButton').grid(row=0, column=2, padx=(0, 10))
+        ttk.Button(action_frame, text='Đóng', command=self.destroy, style='Light.TButton').grid(row=0, column=3)
 
         self.refresh_history()
         center_window(self, parent=parent)
@@ -79,47 +134,114 @@ class HistoryWindow(tk.Toplevel):
         self.focus_force()
 
     def refresh_history(self) -> None:
-        self.all_history = self.bank_service.get_transaction_history(self.account_id)
         self.apply_filters()
 
     def clear_filters(self) -> None:
         self.search_var.set('')
         self.filter_var.set('Tất cả')
+        self.start_date_var.set('')
+        self.end_date_var.set('')
+        self.min_amount_var.set('')
+        self.max_amount_var.set('')
+        self.counterparty_var.set('')
         self.apply_filters()
 
-    def matches_selected_type(self, transaction, selected_type: str) -> bool:
-        if selected_type == 'Tất cả':
-            return True
-        display_type = get_transaction_type_display(transaction.transaction_type)
-        if selected_type == 'Tiết kiệm':
-            return str(transaction.transaction_type).upper().startswith('SAVINGS_')
-        return display_type == selected_type
+    def build_query(self):
+        """Gom các ô lọc thành TransactionQuery. Trả về (hợp lệ?, thông báo, query)."""
+        amounts = []
+        for amount_text in (self.min_amount_var.get(), self.max_amount_var.get()):
+            if amount_text.strip() == '':
+                amounts.append(None)
+                continue
+            amount = read_money_amount(amount_text)
+            if amount < 0:
+                return False, 'Số tiền lọc không hợp lệ.', None
+            amounts.append(amount)
+
+        query = TransactionQuery(
+            account_id=self.account_id,
+            transaction_types=HISTORY_TYPE_FILTERS.get(self.filter_var.get().strip(), ()),
+            min_amount=amounts[0],
+            max_amount=amounts[1],
+            counterparty_id=self.counterparty_var.get().strip(),
+            start_time=self.start_date_var.get(),
+            end_time=self.end_date_var.get(),
+            keyword=self.search_var.get().strip(),
+        )
+        return True, 'OK', query
+
+    def show_filter_error(self, message: str) -> None:
+        self.has_more_history = False
+        self.load_more_button.configure(state='disabled')
+        self.tree.insert('', 'end', values=('-', '-', '-', message))
+        self.summary_var.set(message)
 
     def apply_filters(self) -> None:
-        keyword = self.search_var.get().strip().lower()
-        selected_type = self.filter_var.get().strip()
+        """Lọc lại từ đầu: xóa bảng và chỉ tải trang đầu tiên."""
         for item_id in self.tree.get_children():
             self.tree.delete(item_id)
+        self.shown_history = []
+        self.history_cursor = None
+        self.has_more_history = True
+        self.query_results = None
 
-        filtered_history = []
-        for transaction in self.all_history:
-            display_type = get_transaction_type_display(transaction.transaction_type)
-            search_text = build_transaction_search_text(transaction)
-            if not self.matches_selected_type(transaction, selected_type):
-                continue
-            if keyword != '' and keyword not in search_text and keyword not in display_type.lower():
-                continue
-            filtered_history.append(transaction)
+        is_valid, message, self.history_query = self.build_query()
+        if not is_valid:
+            self.show_filter_error(message)
+            return
+
+        if self.history_query.has_filters():
+            # Có điều kiện lọc: bộ truy vấn tự chọn chỉ mục hẹp nhất, chỉ tốn theo số ứng viên.
+            is_valid, message, self.query_results = self.bank_service.query_transactions(self.history_query)
+            if not is_valid:
+                self.show_filter_error(message)
+                return
+            # Xếp cũ trước để pop() lấy giao dịch mới nhất còn lại.
+            self.query_results.reverse()
+        else:
+            # Chỉ lọc theo ngày: phân trang thẳng trên chỉ mục thời gian, nên chỉ cần kiểm tra khoảng ngày.
+            is_valid, message, _ = self.bank_service.read_time_range(self.history_query.start_time, self.history_query.end_time)
+            if not is_valid:
+                self.show_filter_error(message)
+                return
+        self.load_history_page()
+
+    def load_history_page(self) -> None:
+        """
+        Tải thêm một trang giao dịch phù hợp bộ lọc (mới nhất trước) và nối vào cuối bảng.
+        Có điều kiện lọc: lấy tiếp từ query_results. Không có: lấy một trang lịch sử qua con trỏ.
+        """
+        if not self.has_more_history:
+            return
+
+        page_history = []
+        if self.query_results is not None:
+            while len(page_history) < HISTORY_PAGE_SIZE and len(self.query_results) > 0:
+                page_history.append(self.query_results.pop())
+            self.has_more_history = len(self.query_results) > 0
+        else:
+            page, self.history_cursor = self.bank_service.get_transaction_page(
+                self.account_id,
+                HISTORY_PAGE_SIZE,
+                self.history_cursor,
+                start_time=self.history_query.start_time,
+                end_time=self.history_query.end_time,
+            )
+            page_history.extend(page)
+            self.has_more_history = self.history_cursor is not None
 
-        for transaction in filtered_history:
+        for transaction in page_history:
             note_text = str(transaction.note).strip() if str(transaction.note).strip() != '' else '-'
             self.tree.insert('', 'end', values=(transaction.time_text, get_transaction_type_display(transaction.transaction_type), format_money_vnd(transaction.amount), note_text))
+        self.shown_history.extend(page_history)
 
-        if len(filtered_history) == 0:
+        if len(self.shown_history) == 0:
             self.tree.insert('', 'end', values=('-', '-', '-', 'Không có giao dịch phù hợp'))
 
-        total_amount = sum(int(getattr(item, 'amount', 0)) for item in filtered_history)
-        self.summary_var.set(f'Số giao dịch hiển thị: {len(filtered_history)} | Tổng giá trị: {format_money_vnd(total_amount)}')
+        self.load_more_button.configure(state='normal' if self.has_more_history else 'disabled')
+        total_amount = sum(int(getattr(item, 'amount', 0)) for item in self.shown_history)
+        more_text = ' | Còn giao dịch cũ hơn' if self.has_more_history else ''
+        self.summary_var.set(f'Số giao dịch hiển thị: {len(self.shown_history)} | Tổng giá trị: {format_money_vnd(total_amount)}{more_text}')
 
     def get_selected_values(self):
         selected_items = self.tree.selection()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Dự án không đóng gói (không có setup.py / pyproject): đưa thư mục gốc vào sys.path để import được "src".
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def data_file_path(tmp_path) -> str:
+    """File dữ liệu JSON riêng cho mỗi bài kiểm tra (journal, .prev, .index nằm cạnh nó)."""
+    return str(tmp_path / "bank_data.json")
+
+
+def get_histories(bank_service, account_ids):
+    """Lịch sử từng tài khoản ở dạng so sánh được (mã, loại, số tiền, bên chuyển, bên nhận)."""
+    return {
+        account_id: [
+            (t.transaction_id, t.transaction_type, t.amount, t.from_account_id, t.to_account_id)
+            for t in bank_service.get_account_transactions(account_id)
+        ]
+        for account_id in account_ids
+    }
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+from src.core.bank_service import BankService
+from src.storage.checkpoint import CheckpointManager
+from src.ui.async_server import AsyncBankServer
+
+
+class FailingCheckpointManager(CheckpointManager):
+    """CheckpointManager thật, nhưng failing_saves lần lưu đầu tiên báo lỗi như khi đầy đĩa."""
+
+    def __init__(self, file_path: str, failing_saves: int):
+        super().__init__(file_path)
+        self.failing_saves = failing_saves
+
+    def persist_changes(self, records, snapshot=None) -> None:
+        if self.failing_saves > 0:
+            self.failing_saves -= 1
+            raise OSError("No space left on device")
+        super().persist_changes(records, snapshot)
+
+
+async def exchange(address, requests):
+    """Gửi liên tiếp các yêu cầu trên một kết nối (không chờ từng kết quả), trả về kết quả theo id."""
+    reader, writer = await asyncio.open_connection(*address)
+    for request in requests:
+        writer.write((json.dumps(request) + "\n").encode("utf-8"))
+    await writer.drain()
+    responses = {}
+    for _ in requests:
+        response = json.loads(await reader.readline())
+        responses[response["id"]] = response
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+async def run_with_server(bank_service, storage, scenario):
+    server = AsyncBankServer(bank_service, storage)
+    address = await server.start("127.0.0.1", 0)
+    try:
+        return await scenario(address)
+    finally:
+        await server.close()
+
+
+# -------------------------
+# Lưu thất bại
+# -------------------------
+def test_failed_save_is_not_reported_as_success(data_file_path):
+    storage = FailingCheckpointManager(data_file_path, failing_saves=1)
+    bank_service = BankService(storage.load())
+    account_id = bank_service.create_account("Khách", "1234", 1000)[2]
+    storage.persist(bank_service)
+
+    async def scenario(address):
+        login = await exchange(address, [{"id": 0, "method": "POST", "path": "/login", "params": {"account_id": account_id, "pin_code": "1234"}}])
+        token = login[0]["body"]["token"]
+        first = await exchange(address, [{"id": 1, "method": "POST", "path": "/deposit", "token": token, "params": {"amount": 50}}])
+        second = await exchange(address, [{"id": 2, "method": "POST", "path": "/deposit", "token": token, "params": {"amount": 25}}])
+        return first[1], second[2]
+
+    first, second = asyncio.run(run_with_server(bank_service, storage, scenario))
+    assert first["status"] == 503
+    assert first["body"]["ok"] is False and first["body"]["applied"] is True and "save_error" in first["body"]
+    # Lần lưu sau ghi cả thay đổi chưa lưu được: không mất, không phải gửi lại.
+    assert second["status"] == 200 and second["body"]["ok"] is True
+    reloaded = BankService(CheckpointManager(data_file_path).load())
+    assert reloaded.get_account(account_id).balance == 1075
+
+
+# -------------------------
+# Nhiều yêu cầu gửi liên tiếp trên nhiều kết nối
+# -------------------------
+def test_pipelined_requests_are_all_answered_by_id(data_file_path):
+    storage = CheckpointManager(data_file_path)
+    bank_service = BankService(storage.load())
+    account_ids = [bank_service.create_account("Khách", "1234", 1000)[2] for _ in range(2)]
+    storage.persist(bank_service)
+
+    async def scenario(address):
+        logins = await exchange(address, [
+            {"id": f"login-{index}", "method": "POST", "path": "/login", "params": {"account_id": account_id, "pin_code": "1234"}}
+            for index, account_id in enumerate(account_ids)
+        ])
+        tokens = [logins[f"login-{index}"]["body"]["token"] for index in range(2)]
+
+        def build_requests(index: int):
+            token = tokens[index]
+            other_account_id = account_ids[1 - index]
+            requests = []
+            for number in range(30):
+                request_id = f"{index}-{number}"
+                if number % 3 == 0:
+                    requests.append({"id": request_id, "method": "POST", "path": "/deposit", "token": token, "params": {"amount": 10}})
+                elif number % 3 == 1:
+                    requests.append({"id": request_id, "method": "POST", "path": "/transfer", "token": token,
+                                     "params": {"to_account_id": other_account_id, "amount": 7}})
+                else:
+                    requests.append({"id": request_id, "method": "GET", "path": "/balance", "token": token})
+            requests.append({"id": f"{index}-bad", "method": "POST", "path": "/withdraw", "token": token, "params": {"amount": "nhiều"}})
+            requests.append({"id": f"{index}-missing", "method": "GET", "path": "/nowhere", "token": token})
+            requests.append({"id": f"{index}-anonymous", "method": "POST", "path": "/deposit", "params": {"amount": 10}})
+            return requests
+
+        answers = await asyncio.gather(*(exchange(address, build_requests(index)) for index in range(2)))
+        balances = await exchange(address, [
+            {"id": index, "method": "GET", "path": "/balance", "token": token} for index, token in enumerate(tokens)
+        ])
+        return answers, balances
+
+    answers, balances = asyncio.run(run_with_server(bank_service, storage, scenario))
+    for index, responses in enumerate(answers):
+        assert len(responses) == 33
+        assert all(responses[f"{index}-{number}"]["status"] == 200 for number in range(30))
+        assert responses[f"{index}-bad"]["status"] == 400
+        assert responses[f"{index}-missing"]["status"] == 404
+        assert responses[f"{index}-anonymous"]["status"] == 401
+    # Mỗi tài khoản: 10 lần nạp 10, chuyển đi 10 lần 7 và nhận lại 10 lần 7.
+    assert [balances[index]["body"]["balance"] for index in range(2)] == [1100, 1100]
+    reloaded = BankService(CheckpointManager(data_file_path).load())
+    assert [reloaded.get_account(account_id).balance for account_id in account_ids] == [1100, 1100]
+    assert reloaded.get_transaction_count() == bank_service.get_transaction_count() == 2 + 20 + 40
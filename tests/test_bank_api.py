@@ -0,0 +1,50 @@
+import pytest
+
+from src.core.bank_service import BankService
+from src.storage.json_storage import create_default_bank_data
+from src.ui.bank_api import BankApi
+
+
+@pytest.fixture
+def bank_api():
+    bank_service = BankService(create_default_bank_data(), thread_safe=True)
+    bank_service.create_account("Khách", "1234", 1000)
+    bank_service.create_account("Người nhận", "1234", 0)
+    return BankApi(bank_service)
+
+
+def login(bank_api: BankApi, account_id: str = "100001") -> str:
+    status, payload = bank_api.handle("POST", "/login", {"account_id": account_id, "pin_code": "1234"})
+    assert status == 200, payload
+    return payload["token"]
+
+
+# -------------------------
+# Phiên đăng nhập
+# -------------------------
+def test_logout_ends_only_the_callers_session(bank_api):
+    phone_token = login(bank_api)
+    counter_token = login(bank_api)
+
+    status, payload = bank_api.handle("POST", "/logout", {}, phone_token)
+    assert status == 200 and payload["ok"] is True
+    assert bank_api.handle("GET", "/balance", {}, phone_token)[0] == 401
+    status, payload = bank_api.handle("GET", "/balance", {}, counter_token)
+    assert status == 200 and payload["balance"] == 1000
+
+
+# -------------------------
+# Kiểm tra tham số
+# -------------------------
+@pytest.mark.parametrize("path, parameters", [
+    ("/deposit", {"amount": True}),
+    ("/withdraw", {"amount": True}),
+    ("/transfer", {"amount": True, "to_account_id": "100002"}),
+    ("/savings/open", {"principal_amount": 100, "annual_interest_rate": True, "term_months": 6}),
+    ("/savings/open", {"principal_amount": 100, "annual_interest_rate": 5, "term_months": True}),
+])
+def test_json_booleans_are_not_accepted_as_numbers(bank_api, path, parameters):
+    token = login(bank_api)
+    status, payload = bank_api.handle("POST", path, parameters, token)
+    assert status == 400 and payload["ok"] is False
+    assert bank_api.bank_service.get_balance("100001")[2] == 1000
@@ -0,0 +1,238 @@
+import random
+import threading
+
+from conftest import get_histories
+
+from src.core.bank_service import BankService
+from src.storage.checkpoint import CheckpointManager
+from src.storage.json_storage import create_default_bank_data, get_record_transaction_dicts, load_bank_data
+from src.storage.sqlite_storage import SqliteStorage
+
+
+def create_service(account_count: int = 3, balance: int = 1000, thread_safe: bool = False):
+    bank_service = BankService(create_default_bank_data(), thread_safe=thread_safe)
+    account_ids = [bank_service.create_account(f"Khách {index}", "1234", balance)[2] for index in range(account_count)]
+    return bank_service, account_ids
+
+
+# -------------------------
+# Phân trang theo con trỏ khi nhiều giao dịch cùng thời điểm
+# -------------------------
+def test_cursor_pages_do_not_skip_or_repeat_same_time_transactions():
+    bank_service, account_ids = create_service()
+    # Cả lô dùng chung một thời điểm, nên ranh giới trang rơi giữa các giao dịch trùng thời gian.
+    operations = [{"op": "deposit", "account_id": account_ids[0], "amount": index + 1, "note": "lô"} for index in range(23)]
+    ok, message, _results = bank_service.apply_batch(operations)
+    assert ok, message
+
+    expected = [t.transaction_id for t in bank_service.get_transaction_history(account_ids[0])]
+    for page_size in (1, 4, 7, 24, 50):
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = bank_service.get_transaction_page(account_ids[0], page_size, cursor)
+            page = [t.transaction_id for t in rows]
+            assert 0 < len(page) <= page_size
+            seen.extend(page)
+            if cursor is None:
+                break
+        assert seen == expected
+
+
+# -------------------------
+# Bản ghi journal rút gọn (chi lương, lô)
+# -------------------------
+def test_payroll_journal_record_expands_to_same_transactions():
+    bank_service, account_ids = create_service(account_count=4)
+    bank_service.take_journal_records()
+    ok, message, parent_id = bank_service.pay_payroll(
+        account_ids[0], [(account_ids[1], 100), (account_ids[2], 200), (account_ids[1], 50)], "Lương tháng 5"
+    )
+    assert ok, message
+
+    records = bank_service.take_journal_records()
+    assert len(records) == 1 and "payroll" in records[0]
+    expanded = get_record_transaction_dicts(records[0])
+    added = bank_service.transaction_list[-4:]
+    assert expanded == [transaction.to_dictionary() for transaction in added]
+    assert [item["note"] for item in expanded[1:]] == [parent_id] * 3
+
+
+def test_batch_journal_record_expands_to_same_transactions():
+    bank_service, account_ids = create_service()
+    bank_service.take_journal_records()
+    operations = [
+        {"op": "transfer", "account_id": account_ids[0], "to_account_id": account_ids[1], "amount": 30, "note": "chuyển"},
+        {"op": "withdraw", "account_id": account_ids[1], "amount": 20, "note": "rút"},
+        {"op": "deposit", "account_id": account_ids[2], "amount": 10, "note": "nạp"},
+    ]
+    ok, message, _results = bank_service.apply_batch(operations)
+    assert ok, message
+
+    records = bank_service.take_journal_records()
+    assert len(records) == 1 and records[0]["transactions"] == []
+    expanded = get_record_transaction_dicts(records[0])
+    assert expanded == [transaction.to_dictionary() for transaction in bank_service.transaction_list[-4:]]
+
+
+def test_compact_records_replay_in_json_and_sqlite(tmp_path):
+    for file_path, create_storage in ((tmp_path / "bank_data.json", CheckpointManager), (tmp_path / "bank_data.db", SqliteStorage)):
+        storage = create_storage(str(file_path))
+        bank_service = BankService(storage.load())
+        account_ids = [bank_service.create_account("Khách", "1234", 1000)[2] for _ in range(3)]
+        bank_service.pay_payroll(account_ids[0], [(account_ids[1], 100), (account_ids[2], 200)], "Lương")
+        bank_service.apply_batch([
+            {"op": "transfer", "account_id": account_ids[1], "to_account_id": account_ids[2], "amount": 40, "note": "lô"},
+        ])
+        storage.persist(bank_service)
+        storage.close()
+
+        reloaded = BankService(create_storage(str(file_path)).load())
+        assert get_histories(reloaded, account_ids) == get_histories(bank_service, account_ids)
+        assert [reloaded.get_account(account_id).balance for account_id in account_ids] == [700, 1060, 1240]
+
+
+def get_state(bank_service, account_ids):
+    """Những gì một thao tác bị từ chối không được đụng tới: số dư, lịch sử, journal, bộ đếm mã."""
+    return (
+        [bank_service.get_account(account_id).balance for account_id in account_ids],
+        get_histories(bank_service, account_ids),
+        bank_service.get_transaction_count(),
+        bank_service.get_total_balance(),
+        bank_service.bank_data["next_transaction_number"],
+    )
+
+
+# -------------------------
+# Lô thao tác: tất cả hoặc không gì cả
+# -------------------------
+def test_batch_with_a_failing_operation_changes_nothing():
+    bank_service, account_ids = create_service()
+    bank_service.take_journal_records()
+    before = get_state(bank_service, account_ids)
+
+    # Dòng 2 hợp lệ khi đứng riêng, nhưng sau dòng 0 và 1 thì tài khoản đầu không còn đủ số dư.
+    operations = [
+        {"op": "transfer", "account_id": account_ids[0], "to_account_id": account_ids[1], "amount": 600, "note": ""},
+        {"op": "deposit", "account_id": account_ids[2], "amount": 5, "note": ""},
+        {"op": "withdraw", "account_id": account_ids[0], "amount": 500, "note": ""},
+    ]
+    ok, _message, results = bank_service.apply_batch(operations)
+    assert not ok
+    assert [result["ok"] for result in results] == [False, False, False]
+    assert results[2]["message"] == "Không đủ số dư."
+    assert get_state(bank_service, account_ids) == before
+    assert bank_service.take_journal_records() == []
+
+    operations[1]["account_id"] = "999999"
+    operations[2]["amount"] = 400
+    ok, _message, results = bank_service.apply_batch(operations)
+    assert not ok and results[1]["message"] == "Không tồn tại số tài khoản."
+    assert get_state(bank_service, account_ids) == before
+
+    operations[1]["account_id"] = account_ids[2]
+    ok, message, _results = bank_service.apply_batch(operations)
+    assert ok, message
+    assert [bank_service.get_account(account_id).balance for account_id in account_ids] == [0, 1600, 1005]
+    assert len(bank_service.take_journal_records()) == 1
+    ok, message, _drifted = bank_service.verify_aggregates()
+    assert ok, message
+
+
+def test_rejected_payroll_changes_nothing():
+    bank_service, account_ids = create_service(account_count=4)
+    bank_service.take_journal_records()
+    before = get_state(bank_service, account_ids)
+
+    rejected_payrolls = [
+        (account_ids[0], [(account_ids[1], 600), (account_ids[2], 401)]),
+        (account_ids[0], [(account_ids[1], 100), ("999999", 100)]),
+        (account_ids[0], [(account_ids[1], 100), (account_ids[0], 100)]),
+        (account_ids[0], [(account_ids[1], 100), (account_ids[2], 0)]),
+        (account_ids[0], []),
+        ("999999", [(account_ids[1], 100)]),
+    ]
+    for from_account_id, payments in rejected_payrolls:
+        ok, _message, parent_id = bank_service.pay_payroll(from_account_id, payments, "Lương")
+        assert not ok and parent_id is None
+        assert get_state(bank_service, account_ids) == before
+    assert bank_service.take_journal_records() == []
+
+    ok, message, _parent_id = bank_service.pay_payroll(account_ids[0], [(account_ids[1], 600), (account_ids[2], 400)], "Lương")
+    assert ok, message
+    assert [bank_service.get_account(account_id).balance for account_id in account_ids] == [0, 1600, 1400, 1000]
+    assert len(bank_service.take_journal_records()) == 1
+
+
+# -------------------------
+# Bất biến ở chế độ nhiều luồng
+# -------------------------
+def test_concurrent_operations_keep_balances_and_aggregates_consistent():
+    bank_service, account_ids = create_service(account_count=6, balance=10000, thread_safe=True)
+    total_before = bank_service.get_total_balance()
+    deposited = []
+
+    def run_operations(seed: int) -> None:
+        generator = random.Random(seed)
+        for _ in range(400):
+            from_account_id, to_account_id = generator.sample(account_ids, 2)
+            choice = generator.random()
+            if choice < 0.6:
+                bank_service.transfer_money(from_account_id, to_account_id, generator.randint(1, 50), "chuyển")
+            elif choice < 0.8:
+                amount = generator.randint(1, 50)
+                if bank_service.deposit_money(from_account_id, amount, "nạp")[0]:
+                    deposited.append(amount)
+            else:
+                amount = generator.randint(1, 50)
+                if bank_service.withdraw_money(from_account_id, amount, "rút")[0]:
+                    deposited.append(-amount)
+
+    threads = [threading.Thread(target=run_operations, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    balances = [bank_service.get_account(account_id).balance for account_id in account_ids]
+    assert all(balance >= 0 for balance in balances)
+    assert sum(balances) == total_before + sum(deposited) == bank_service.get_total_balance()
+    ok, message, _drifted = bank_service.verify_aggregates()
+    assert ok, message
+
+    # Mã giao dịch không trùng, và mỗi giao dịch nằm đúng trong lịch sử các tài khoản liên quan.
+    transaction_ids = [t.transaction_id for t in bank_service.transaction_list]
+    assert len(set(transaction_ids)) == len(transaction_ids)
+    for account_id in account_ids:
+        expected = [t for t in bank_service.transaction_list if account_id in (t.from_account_id, t.to_account_id)]
+        assert sorted(t.transaction_id for t in bank_service.get_account_transactions(account_id)) == sorted(
+            t.transaction_id for t in expected
+        )
+
+
+def test_concurrent_saves_reload_to_same_state(data_file_path):
+    storage = CheckpointManager(data_file_path, checkpoint_records=50)
+    bank_service = BankService(storage.load(), thread_safe=True)
+    account_ids = [bank_service.create_account("Khách", "1234", 5000)[2] for _ in range(4)]
+    save_lock = threading.Lock()
+
+    def run_transfers(seed: int) -> None:
+        generator = random.Random(seed)
+        for _ in range(150):
+            from_account_id, to_account_id = generator.sample(account_ids, 2)
+            bank_service.transfer_money(from_account_id, to_account_id, generator.randint(1, 20), "chuyển")
+            with save_lock:
+                storage.persist_changes(bank_service.take_journal_records())
+
+    threads = [threading.Thread(target=run_transfers, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    storage.close(bank_service)
+
+    reloaded = BankService(load_bank_data(data_file_path))
+    assert [reloaded.get_account(account_id).balance for account_id in account_ids] == [
+        bank_service.get_account(account_id).balance for account_id in account_ids
+    ]
+    assert reloaded.get_transaction_count() == bank_service.get_transaction_count()
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+from src.core.bank_service import BankService
+from src.storage.json_storage import load_bank_data
+from src.storage.sqlite_storage import SqliteStorage
+from src.ui import batch_app
+
+
+def read_results(output_path):
+    with open(output_path, "r", encoding="utf-8", newline="") as output_file:
+        if str(output_path).endswith(".csv"):
+            return list(csv.DictReader(output_file))
+        return [json.loads(line) for line in output_file]
+
+
+# -------------------------
+# Chạy file thao tác không cần giao diện
+# -------------------------
+def test_run_batch_jsonl_reports_each_line_and_keeps_going(tmp_path, data_file_path):
+    input_path = tmp_path / "ops.jsonl"
+    lines = [
+        {"op": "create_account", "owner_name": "An", "pin_code": "1234", "initial_balance": 1000},
+        {"op": "create_account", "owner_name": "Bình", "pin_code": "1234", "initial_balance": "0"},
+        {"op": "transfer", "account_id": "100001", "to_account_id": "100002", "amount": 300, "note": "tiền nhà"},
+        {"op": "withdraw", "account_id": "100002", "amount": 5000},
+        "không phải JSON",
+        {"op": "open_saving", "account_id": "100001", "principal_amount": "500", "annual_interest_rate": "6", "term_months": 12},
+        {"op": "bay", "account_id": "100001"},
+    ]
+    input_path.write_text(
+        "\n".join(line if isinstance(line, str) else json.dumps(line, ensure_ascii=False) for line in lines) + "\n\n",
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "results.jsonl"
+    log_file = io.StringIO()
+
+    summary = batch_app.run_batch(str(input_path), str(output_path), data_file_path=data_file_path, commit_interval=2, progress_interval=3, log_file=log_file)
+    assert (summary["processed"], summary["succeeded"], summary["failed"]) == (7, 4, 3)
+    results = read_results(output_path)
+    assert [result["line"] for result in results] == [1, 2, 3, 4, 5, 6, 7]
+    assert [result["ok"] for result in results] == [True, True, True, False, False, True, False]
+    assert results[0]["result"] == "100001" and results[5]["result"].startswith("STK_")
+    assert "Đã xử lý 3 thao tác" in log_file.getvalue() and "Xong: 7 thao tác" in log_file.getvalue()
+
+    reloaded = BankService(load_bank_data(data_file_path))
+    assert [reloaded.get_account(account_id).balance for account_id in ("100001", "100002")] == [200, 300]
+    assert len(reloaded.get_saving_deposits("100001", only_active=True)) == 1
+
+
+def test_run_batch_csv_against_sqlite_storage(tmp_path):
+    input_path = tmp_path / "ops.csv"
+    input_path.write_text(
+        "op,owner_name,pin_code,initial_balance,account_id,to_account_id,amount,note\n"
+        "create_account,An,1234,1000,,,,\n"
+        "create_account,Bình,1234,0,,,,\n"
+        "deposit,,,,100002,,250,lương\n"
+        "transfer,,,,100002,100001,abc,sai số tiền\n",
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "results.csv"
+    data_path = str(tmp_path / "bank_data.db")
+
+    assert batch_app.main([str(input_path), str(output_path), "--data", data_path, "--progress-interval", "0"]) == 1
+    results = read_results(output_path)
+    assert [(result["line"], result["ok"]) for result in results] == [("2", "True"), ("3", "True"), ("4", "True"), ("5", "False")]
+
+    reloaded = BankService(SqliteStorage(data_path).load())
+    assert [reloaded.get_account(account_id).balance for account_id in ("100001", "100002")] == [1000, 250]
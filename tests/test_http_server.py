@@ -0,0 +1,162 @@
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from src.core.bank_service import BankService
+from src.storage.checkpoint import CheckpointManager
+from src.storage.json_storage import create_default_bank_data, load_bank_data
+from src.ui.http_server import KEEP_ALIVE_IDLE_SECONDS, REQUEST_TIMEOUT_SECONDS, BankHTTPServer, create_server
+
+
+@pytest.fixture
+def http_server():
+    bank_service = BankService(create_default_bank_data(), thread_safe=True)
+    server = BankHTTPServer(("127.0.0.1", 0), bank_service, max_workers=2, queued_connections=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.close()
+    thread.join()
+
+
+def send_raw_request(server: BankHTTPServer, request: bytes) -> bytes:
+    with socket.create_connection(server.server_address, timeout=5) as connection:
+        connection.sendall(request)
+        response = b""
+        while True:
+            chunk = connection.recv(65536)
+            if chunk == b"":
+                return response
+            response += chunk
+
+
+# -------------------------
+# Yêu cầu sai định dạng
+# -------------------------
+def test_non_numeric_content_length_gets_400(http_server):
+    response = send_raw_request(
+        http_server, b"POST /login HTTP/1.1\r\nHost: localhost\r\nContent-Length: abc\r\n\r\n{}"
+    )
+    head, _separator, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400")
+    assert json.loads(body)["ok"] is False
+
+
+# -------------------------
+# Kết nối keep-alive và nhóm luồng có giới hạn
+# -------------------------
+def open_connection(server: BankHTTPServer) -> http.client.HTTPConnection:
+    return http.client.HTTPConnection(*server.server_address, timeout=REQUEST_TIMEOUT_SECONDS * 2)
+
+
+def get_response(connection: http.client.HTTPConnection, path: str = "/balance"):
+    connection.request("GET", path)
+    response = connection.getresponse()
+    response.read()
+    return response
+
+
+def test_idle_keep_alive_connections_do_not_block_new_clients(http_server):
+    # Hai kết nối keep-alive im lặng giữ cả hai luồng xử lý.
+    idle_connections = [open_connection(http_server) for _ in range(2)]
+    for connection in idle_connections:
+        assert get_response(connection).getheader("Connection") is None
+
+    started_at = time.monotonic()
+    response = get_response(open_connection(http_server))
+    assert response.status == 401
+    # Kết nối mới chỉ chờ tới khi kết nối im lặng bị đóng, không phải REQUEST_TIMEOUT_SECONDS.
+    assert time.monotonic() - started_at < KEEP_ALIVE_IDLE_SECONDS + 1 < REQUEST_TIMEOUT_SECONDS
+    for connection in idle_connections:
+        connection.close()
+
+
+def test_busy_pool_closes_keep_alive_after_each_response(http_server):
+    first = open_connection(http_server)
+    second = open_connection(http_server)
+    assert get_response(first).getheader("Connection") is None
+    assert get_response(second).getheader("Connection") is None
+
+    # Kết nối thứ ba phải chờ luồng: câu trả lời kế tiếp trên kết nối đang giữ luồng kèm "Connection: close".
+    waiting = open_connection(http_server)
+    waiting.connect()
+    deadline = time.monotonic() + 2
+    while not http_server.has_waiting_connections() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert http_server.has_waiting_connections()
+    assert get_response(first).getheader("Connection") == "close"
+    assert get_response(waiting).status == 401
+    for connection in (first, second, waiting):
+        connection.close()
+
+
+# -------------------------
+# Một phiên làm việc đầy đủ qua HTTP, dữ liệu được lưu xuống file
+# -------------------------
+def call_api(connection: http.client.HTTPConnection, method: str, path: str, body=None, token: str = ""):
+    headers = {"Content-Type": "application/json"}
+    if token != "":
+        headers["Authorization"] = f"Bearer {token}"
+    connection.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_http_round_trip_persists_changes(data_file_path):
+    storage = CheckpointManager(data_file_path)
+    bank_service = BankService(storage.load())
+    bank_service.create_account("Khách", "1234", 1000)
+    bank_service.create_account("Người nhận", "1234", 0)
+    storage.close(bank_service)
+
+    server = create_server(data_file_path, host="127.0.0.1", port=0, max_workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = open_connection(server)
+        assert call_api(connection, "POST", "/login", {"account_id": "100001", "pin_code": "0000"})[0] == 400
+        status, payload = call_api(connection, "POST", "/login", {"account_id": "100001", "pin_code": "1234"})
+        assert status == 200
+        token = payload["token"]
+
+        assert call_api(connection, "POST", "/deposit", {"amount": 250, "note": "lương"}, token)[0] == 200
+        assert call_api(connection, "POST", "/transfer", {"to_account_id": "100002", "amount": 400, "note": "tiền nhà"}, token)[0] == 200
+        status, payload = call_api(connection, "POST", "/withdraw", {"amount": 10 ** 6}, token)
+        assert status == 400 and payload["ok"] is False
+        status, payload = call_api(connection, "POST", "/savings/open", {"principal_amount": 300, "annual_interest_rate": 6, "term_months": 12}, token)
+        assert status == 200 and payload["deposit_id"].startswith("STK_")
+        assert call_api(connection, "GET", "/balance", token=token)[1]["balance"] == 550
+
+        # Lịch sử theo trang qua query string, mới nhất trước, không sót không lặp.
+        seen = []
+        cursor = ""
+        while True:
+            status, payload = call_api(connection, "GET", f"/history?page_size=2&cursor={cursor}", token=token)
+            assert status == 200
+            seen.extend(item["transaction_type"] for item in payload["transactions"])
+            if payload["next_cursor"] is None:
+                break
+            cursor = payload["next_cursor"]
+        assert seen == ["SAVINGS_OPEN", "TRANSFER_IN", "TRANSFER_OUT", "DEPOSIT", "DEPOSIT"]
+
+        status, payload = call_api(connection, "GET", "/savings?only_active=1", token=token)
+        assert status == 200 and payload["summary"]["active_count"] == 1
+        assert call_api(connection, "GET", "/nowhere", token=token)[0] == 404
+        status, payload = call_api(connection, "GET", "/stats")
+        assert status == 200 and payload["stats"]["routes"]["deposit"]["requests"] == 1
+        assert call_api(connection, "POST", "/logout", {}, token)[0] == 200
+        assert call_api(connection, "GET", "/balance", token=token)[0] == 401
+        connection.close()
+    finally:
+        server.shutdown()
+        server.close()
+        thread.join()
+
+    reloaded = BankService(load_bank_data(data_file_path))
+    assert [reloaded.get_account(account_id).balance for account_id in ("100001", "100002")] == [550, 400]
+    assert len(reloaded.get_saving_deposits("100001", only_active=True)) == 1
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from src.core import interest_engine
+from src.core.models import SavingDeposit
+
+numpy = pytest.importorskip("numpy")
+
+
+def create_deposit(index: int, principal: int, rate: float, term: int, opened_at: str) -> SavingDeposit:
+    return SavingDeposit(
+        deposit_id=f"SAVING_{index:06d}",
+        account_id="100001",
+        principal_amount=principal,
+        annual_interest_rate=rate,
+        term_months=term,
+        opened_at=opened_at,
+        maturity_at="",
+        status="ACTIVE",
+        note="",
+    )
+
+
+def build_deposits():
+    # Các trường hợp làm tròn: đúng nửa (0.5, 1.5, 2.5 -> làm tròn về số chẵn), sát nửa, lãi âm (về 0), số lớn.
+    cases = [
+        (3, 100.0, 2, "2024-01-31 08:00:00"),        # 0.5 -> 0
+        (9, 100.0, 2, "2024-03-31 23:59:59"),        # 1.5 -> 2
+        (15, 100.0, 2, "2023-01-31 00:00:00"),       # 2.5 -> 2
+        (1000, 0.06, 10, "2024-02-29 12:00:00"),     # 0.5 (sai số thực)
+        (1000001, 7.3, 13, "2024-12-31 10:10:10"),
+        (100, -5.0, 12, "2024-05-15 09:00:00"),      # lãi âm -> 0
+        (2 ** 52, 4.5, 36, "2020-02-29 00:00:00"),
+        (500000, 5.5, 6, "ngày sai định dạng"),      # không rõ ngày mở
+        (0, 6.0, 0, "2024-08-31 00:00:00"),
+    ]
+    generator = random.Random(7)
+    for index in range(2000):
+        cases.append((
+            generator.randint(1, 10 ** 10),
+            round(generator.uniform(0, 15), generator.choice([0, 1, 2, 3])),
+            generator.randint(0, 60),
+            f"{generator.randint(1990, 2060)}-{generator.randint(1, 12):02d}-{generator.choice([1, 15, 28, 29, 30, 31]):02d} 07:30:00",
+        ))
+    return [create_deposit(index, *case) for index, case in enumerate(cases)]
+
+
+def project_without_numpy(monkeypatch, deposits, **options):
+    with monkeypatch.context() as patch:
+        patch.setattr(interest_engine, "numpy", None)
+        return interest_engine.project_savings_book(deposits, **options)
+
+
+# -------------------------
+# NumPy và vòng lặp từng sổ cho cùng kết quả
+# -------------------------
+@pytest.mark.parametrize("annual_interest_rate", [None, 6.5])
+def test_numpy_projection_matches_scalar_path(monkeypatch, annual_interest_rate):
+    deposits = build_deposits()
+    assert interest_engine.numpy is numpy
+    vectorized = interest_engine.project_savings_book(deposits, annual_interest_rate=annual_interest_rate)
+    scalar = project_without_numpy(monkeypatch, deposits, annual_interest_rate=annual_interest_rate)
+
+    assert vectorized == scalar
+    assert all(type(value) is int for value in vectorized["interests"] + vectorized["maturity_keys"])
+    if annual_interest_rate is None:
+        assert vectorized["interests"][:3] == [0, 2, 2]
+    assert interest_engine.group_payouts_by_month(vectorized["maturity_keys"], vectorized["payouts"]) == (
+        interest_engine.group_payouts_by_month(scalar["maturity_keys"], scalar["payouts"])
+    )
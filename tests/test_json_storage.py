@@ -0,0 +1,204 @@
+import json
+import os
+
+from conftest import get_histories
+
+from src.core.bank_service import BankService
+from src.storage import transaction_source
+from src.storage.checkpoint import CheckpointManager
+from src.storage.json_storage import (
+    append_journal_records,
+    compact_journal,
+    get_journal_path,
+    get_previous_checkpoint_path,
+    load_bank_data,
+    read_journal_records,
+)
+from src.storage.transaction_source import SnapshotTransactionSource, get_snapshot_index_path
+
+
+def create_bank(data_file_path: str, checkpoint_records: int = 1000):
+    storage = CheckpointManager(data_file_path, checkpoint_records=checkpoint_records)
+    bank_service = BankService(storage.load())
+    account_ids = [bank_service.create_account(f"Khách {index}", "1234", 1000)[2] for index in range(3)]
+    storage.persist(bank_service)
+    return storage, bank_service, account_ids
+
+
+def read_journal_seqs(data_file_path: str):
+    with open(get_journal_path(data_file_path), "r", encoding="utf-8") as file:
+        return [json.loads(line)["seq"] for line in file if line.strip()]
+
+
+
+# -------------------------
+# Bản chụp hỏng: dùng thế hệ trước (.prev)
+# -------------------------
+def test_broken_snapshot_falls_back_to_previous_generation(data_file_path):
+    storage, bank_service, account_ids = create_bank(data_file_path, checkpoint_records=4)
+    for index in range(12):
+        bank_service.transfer_money(account_ids[index % 3], account_ids[(index + 1) % 3], 5, "chuyển")
+        storage.persist(bank_service)
+        storage.wait()
+    storage.close()
+    assert os.path.exists(get_previous_checkpoint_path(data_file_path))
+    expected = get_histories(bank_service, account_ids)
+
+    with open(data_file_path, "w", encoding="utf-8") as file:
+        file.write("{hỏng")
+
+    for lazy_transactions in (False, True):
+        reloaded = BankService(CheckpointManager(data_file_path).load(lazy_transactions=lazy_transactions))
+        assert get_histories(reloaded, account_ids) == expected
+        assert [reloaded.get_account(account_id).balance for account_id in account_ids] == [1000, 1000, 1000]
+        if lazy_transactions:
+            assert isinstance(reloaded.transaction_source, SnapshotTransactionSource)
+        # Lần đầu đã đổi tên file hỏng; lần sau đọc tiếp từ .prev.
+        assert os.path.exists(data_file_path + ".broken")
+
+
+# -------------------------
+# Cắt journal khi checkpoint
+# -------------------------
+def test_compact_journal_keeps_records_after_boundary(data_file_path):
+    append_journal_records(data_file_path, [{"seq": seq, "op": "test"} for seq in range(1, 11)])
+
+    compact_journal(data_file_path, 0)
+    assert read_journal_seqs(data_file_path) == list(range(1, 11))
+    compact_journal(data_file_path, 4)
+    assert read_journal_seqs(data_file_path) == list(range(5, 11))
+    assert [record["seq"] for record in read_journal_records(data_file_path, 7)] == [8, 9, 10]
+    compact_journal(data_file_path, 10)
+    assert read_journal_seqs(data_file_path) == []
+
+
+def test_checkpoint_keeps_journal_after_previous_checkpoint(data_file_path):
+    storage, bank_service, account_ids = create_bank(data_file_path, checkpoint_records=3)
+    for _ in range(10):
+        bank_service.deposit_money(account_ids[1], 1, "nạp")
+        storage.persist(bank_service)
+        storage.wait()
+
+    # Journal giữ đúng các bản ghi sau checkpoint thế hệ trước (để khôi phục được từ .prev).
+    seqs = read_journal_seqs(data_file_path)
+    assert seqs == list(range(storage.previous_checkpoint_seq + 1, storage.last_appended_seq + 1))
+    assert storage.previous_checkpoint_seq < storage.checkpoint_seq
+    storage.close()
+
+
+# -------------------------
+# Journal bị ghi dở ở cuối
+# -------------------------
+def test_replay_skips_torn_journal_tail(data_file_path):
+    storage, bank_service, account_ids = create_bank(data_file_path)
+    for index in range(5):
+        bank_service.deposit_money(account_ids[0], 10, f"nạp {index}")
+        storage.persist(bank_service)
+    storage.close()
+    expected = get_histories(bank_service, account_ids)
+
+    # Mất điện giữa lúc ghi: dòng cuối không có xuống dòng.
+    with open(get_journal_path(data_file_path), "a", encoding="utf-8") as file:
+        file.write('{"seq":999,"op":"deposit_money","accounts":[{"account_id"')
+
+    storage = CheckpointManager(data_file_path)
+    reloaded = BankService(storage.load())
+    assert get_histories(reloaded, account_ids) == expected
+    assert reloaded.get_account(account_ids[0]).balance == 1050
+    with open(get_journal_path(data_file_path), "rb") as file:
+        assert file.read().endswith(b"\n")
+
+    # Ghi tiếp sau khi đã cắt dòng hỏng vẫn đọc lại được.
+    reloaded.withdraw_money(account_ids[0], 50, "rút")
+    storage.persist(reloaded)
+    storage.close()
+    assert BankService(load_bank_data(data_file_path)).get_account(account_ids[0]).balance == 1000
+
+
+# -------------------------
+# Đọc lười theo chỉ mục của bản chụp
+# -------------------------
+def test_lazy_history_matches_full_load_across_checkpoints(data_file_path):
+    storage, bank_service, account_ids = create_bank(data_file_path, checkpoint_records=5)
+    storage.close()
+    storage = CheckpointManager(data_file_path, checkpoint_records=5)
+    bank_service = BankService(storage.load(lazy_transactions=True))
+    # Đọc lười dùng được ngay từ bản chụp đầu tiên.
+    assert isinstance(bank_service.transaction_source, SnapshotTransactionSource)
+    for index in range(30):
+        bank_service.transfer_money(account_ids[index % 3], account_ids[(index + 2) % 3], 3, "lương tháng")
+        storage.persist(bank_service)
+        storage.wait()
+    storage.close()
+
+    full = load_bank_data(data_file_path)["transactions"]
+    os.remove(get_snapshot_index_path(data_file_path))
+    lazy = BankService(CheckpointManager(data_file_path).load(lazy_transactions=True))
+    for account_id in account_ids:
+        expected = [t.transaction_id for t in full if account_id in (t.from_account_id, t.to_account_id)]
+        assert [t.transaction_id for t in lazy.get_account_transactions(account_id)] == expected
+    # Thiếu chỉ mục thì dựng lại khi mở.
+    assert os.path.exists(get_snapshot_index_path(data_file_path))
+
+
+def test_checkpoint_after_session_writes_reuses_written_index(data_file_path, monkeypatch):
+    storage, bank_service, account_ids = create_bank(data_file_path)
+    storage.close()
+    rebuilt = []
+    build_snapshot_index = transaction_source.build_snapshot_index
+    monkeypatch.setattr(
+        transaction_source, "build_snapshot_index", lambda *args: rebuilt.append(args) or build_snapshot_index(*args)
+    )
+
+    storage = CheckpointManager(data_file_path, checkpoint_records=4)
+    bank_service = BankService(storage.load(lazy_transactions=True))
+    for index in range(14):
+        bank_service.transfer_money(account_ids[index % 3], account_ids[(index + 1) % 3], 7, "chuyển")
+        storage.persist(bank_service)
+        storage.wait()
+    # Giao dịch của phiên đã nằm trong bản chụp mới nhưng vẫn chỉ xuất hiện một lần trong lịch sử.
+    session_histories = get_histories(bank_service, account_ids)
+    storage.close()
+
+    full = BankService(load_bank_data(data_file_path))
+    assert session_histories == get_histories(full, account_ids)
+    reloaded = BankService(CheckpointManager(data_file_path).load(lazy_transactions=True))
+    assert get_histories(reloaded, account_ids) == get_histories(full, account_ids)
+    # Chỉ mục do checkpoint ghi khớp với bản chụp: không phải quét lại, cả lúc checkpoint lẫn lúc khởi động.
+    assert rebuilt == []
+
+
+def test_lazy_start_trusts_matching_index_header(data_file_path, monkeypatch):
+    storage, bank_service, account_ids = create_bank(data_file_path, checkpoint_records=1)
+    for index in range(6):
+        bank_service.deposit_money(account_ids[index % 3], 10, "nạp")
+        storage.persist(bank_service)
+        storage.wait()
+    storage.close()
+    transaction_count = bank_service.get_transaction_count()
+
+    # Làm hỏng một dòng giao dịch nhưng giữ nguyên kích thước và thời điểm sửa:
+    # chỉ mục vẫn khớp nên lúc khởi động không đọc tới mảng transactions.
+    status = os.stat(data_file_path)
+    with open(data_file_path, "r+b") as file:
+        content = file.read()
+        position = content.index(b'\n{"transaction_id"') + 1
+        file.seek(position)
+        file.write(b"x")
+    os.utime(data_file_path, ns=(status.st_atime_ns, status.st_mtime_ns))
+    lazy = BankService(CheckpointManager(data_file_path).load(lazy_transactions=True))
+    assert lazy.get_transaction_count() == transaction_count
+
+    # File bị sửa sau khi ghi chỉ mục (khác thời điểm sửa): không tin chỉ mục, đếm lại và dựng lại chỉ mục.
+    with open(data_file_path, "r+b") as file:
+        file.seek(position)
+        file.write(b"{")
+    os.utime(data_file_path, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    rebuilt = []
+    build_snapshot_index = transaction_source.build_snapshot_index
+    monkeypatch.setattr(
+        transaction_source, "build_snapshot_index", lambda *args: rebuilt.append(args) or build_snapshot_index(*args)
+    )
+    lazy = BankService(CheckpointManager(data_file_path).load(lazy_transactions=True))
+    assert lazy.get_transaction_count() == transaction_count
+    assert len(rebuilt) == 1
@@ -0,0 +1,114 @@
+import random
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.core.models import (
+    EPOCH_DATETIME,
+    MISSING_TIMESTAMP_KEY,
+    TRANSACTION_TYPES,
+    Transaction,
+    add_months_to_timestamp,
+    datetime_to_timestamp,
+    get_transaction_time_key,
+    get_transaction_type_code,
+    time_text_to_timestamp,
+    timestamp_to_time_text,
+)
+
+
+# -------------------------
+# Mã loại giao dịch
+# -------------------------
+def test_unknown_transaction_types_get_distinct_codes_across_threads():
+    # Đổi luồng thật dày để các luồng chen nhau giữa lúc đọc và lúc cấp mã.
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        type_names = [f"LEGACY_TYPE_{index}" for index in range(40)]
+        barrier = threading.Barrier(8)
+        codes_by_thread = []
+
+        def register_types(seed: int) -> None:
+            barrier.wait()
+            codes_by_thread.append({name: get_transaction_type_code(name) for name in type_names[seed:] + type_names[:seed]})
+
+        threads = [threading.Thread(target=register_types, args=(seed * 5,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    codes = codes_by_thread[0]
+    assert all(thread_codes == codes for thread_codes in codes_by_thread)
+    assert len(set(codes.values())) == len(type_names)
+    assert all(TRANSACTION_TYPES[code] == name for name, code in codes.items())
+
+
+# -------------------------
+# Đọc / ghi thời gian theo định dạng cố định
+# -------------------------
+def test_timestamp_parser_matches_strptime_and_round_trips():
+    generator = random.Random(5)
+    for _ in range(3000):
+        timestamp = generator.randint(-10 ** 9, 4 * 10 ** 9)
+        time_text = timestamp_to_time_text(timestamp)
+        assert time_text_to_timestamp(time_text) == timestamp
+        parsed = datetime.strptime(time_text, "%Y-%m-%d %H:%M:%S")
+        assert datetime_to_timestamp(parsed) == int((parsed - EPOCH_DATETIME).total_seconds()) == timestamp
+
+
+@pytest.mark.parametrize(
+    "time_text",
+    [
+        "",
+        "2024-01-05",
+        "2024-1-05 08:00:00",
+        "2024-01-05T08:00:00",
+        "2024-01-05 08:00:0",
+        "2024-01-05 08:00:000",
+        "2024-02-30 08:00:00",
+        "2023-02-29 08:00:00",
+        "2024-13-01 08:00:00",
+        "2024-01-05 24:00:00",
+        "2024-01-05 23:60:00",
+        "2024-01-05 23:59:60",
+        "2024-01-05 -1:00:00",
+        "2024-01-05 ab:cd:ef",
+        "2024/01/05 08:00:00",
+    ],
+)
+def test_timestamp_parser_rejects_malformed_text(time_text):
+    assert time_text_to_timestamp(time_text) is None
+
+
+def test_add_months_clamps_to_month_end_and_keeps_time_of_day():
+    cases = [
+        ("2024-01-31 10:20:30", 1, "2024-02-29 10:20:30"),
+        ("2023-01-31 10:20:30", 1, "2023-02-28 10:20:30"),
+        ("2024-02-29 00:00:00", 12, "2025-02-28 00:00:00"),
+        ("2024-08-31 23:59:59", 13, "2025-09-30 23:59:59"),
+        ("2024-12-15 08:00:00", 1, "2025-01-15 08:00:00"),
+        ("1969-12-31 23:00:00", 2, "1970-02-28 23:00:00"),
+    ]
+    for time_text, months, expected in cases:
+        assert timestamp_to_time_text(add_months_to_timestamp(time_text_to_timestamp(time_text), months)) == expected
+
+
+def test_transaction_keeps_malformed_time_text_and_sorts_it_first():
+    transaction = Transaction.from_dictionary({
+        "transaction_id": "TRANSACTION_00000001",
+        "transaction_type": "DEPOSIT",
+        "amount": 10,
+        "time_text": "05/01/2024 08:00",
+        "note": "dữ liệu cũ",
+        "from_account_id": None,
+        "to_account_id": "100001",
+    })
+    assert transaction.time_text == "05/01/2024 08:00"
+    assert get_transaction_time_key(transaction) == MISSING_TIMESTAMP_KEY
+    assert transaction.to_dictionary()["time_text"] == "05/01/2024 08:00"
@@ -0,0 +1,159 @@
+from src.core.bank_service import BankService
+from src.storage.json_storage import create_default_bank_data
+
+ACCOUNT_IDS = ["100001", "100002"]
+
+
+def create_deposit_dict(number: int, account_id: str, opened_at: str, maturity_at: str, status: str = "ACTIVE"):
+    principal_amount = 1000 * number
+    interest_earned = 10 * number
+    return {
+        "deposit_id": f"STK_{number:06d}",
+        "account_id": account_id,
+        "principal_amount": principal_amount,
+        "annual_interest_rate": 6.0,
+        "term_months": 12,
+        "opened_at": opened_at,
+        "maturity_at": maturity_at,
+        "status": status,
+        "note": "",
+        "settled_at": None if status == "ACTIVE" else maturity_at,
+        "interest_earned": interest_earned,
+        "maturity_amount": principal_amount + interest_earned,
+    }
+
+
+def create_service(deposit_dicts) -> BankService:
+    bank_data = create_default_bank_data()
+    bank_data["accounts"] = [
+        {"account_id": account_id, "owner_name": "Khách", "pin_code": "1234", "balance": 0, "created_at": "2020-01-01 00:00:00"}
+        for account_id in ACCOUNT_IDS
+    ]
+    bank_data["saving_deposits"] = deposit_dicts
+    bank_data["next_account_id"] = 100003
+    bank_data["next_saving_deposit_number"] = len(deposit_dicts) + 1
+    return BankService(bank_data)
+
+
+# -------------------------
+# Chỉ mục sổ theo mã và theo tài khoản
+# -------------------------
+def test_saving_deposit_lookups_only_return_the_owner_deposits():
+    bank_service = create_service([
+        create_deposit_dict(1, "100001", "2024-01-05 08:00:00", "2025-01-05 08:00:00"),
+        create_deposit_dict(2, "100002", "2024-02-05 08:00:00", "2025-02-05 08:00:00"),
+        create_deposit_dict(3, "100001", "2024-03-05 08:00:00", "2025-03-05 08:00:00", status="CLOSED"),
+        create_deposit_dict(4, "100001", "2024-03-05 08:00:00", "2099-03-05 08:00:00"),
+    ])
+
+    assert bank_service.get_saving_deposit("100001", "STK_000001").principal_amount == 1000
+    assert bank_service.get_saving_deposit("100002", "STK_000001") is None
+    assert bank_service.get_saving_deposit("100001", "STK_999999") is None
+    # Mới mở trước; cùng thời điểm mở thì theo thứ tự mở.
+    assert [item.deposit_id for item in bank_service.get_saving_deposits("100001")] == ["STK_000003", "STK_000004", "STK_000001"]
+    assert [item.deposit_id for item in bank_service.get_saving_deposits("100001", only_active=True)] == ["STK_000004", "STK_000001"]
+    assert bank_service.get_saving_deposits("100003") == []
+
+    ok, message = bank_service.settle_saving_deposit("100001", "STK_000004")
+    assert ok, message
+    assert [item.deposit_id for item in bank_service.get_saving_deposits("100001", only_active=True)] == ["STK_000001"]
+    assert [item.deposit_id for item in bank_service.get_saving_deposits("100001")] == ["STK_000003", "STK_000004", "STK_000001"]
+    ok, _message = bank_service.settle_saving_deposit("100001", "STK_000004")
+    assert not ok
+    ok, _message = bank_service.settle_saving_deposit("100002", "STK_000001")
+    assert not ok
+
+
+# -------------------------
+# Số liệu tổng hợp cập nhật dần
+# -------------------------
+def test_aggregates_follow_every_operation_and_detect_drift():
+    bank_service = BankService(create_default_bank_data())
+    account_ids = [bank_service.create_account("Khách", "1234", 5000)[2] for _ in range(3)]
+    # Dựng bộ đếm giao dịch trước các thao tác để chúng được cập nhật dần, không phải đếm lại.
+    assert bank_service.get_transaction_type_counts() == {"DEPOSIT": 3}
+    assert bank_service.get_transaction_type_counts(account_ids[0]) == {"DEPOSIT": 1}
+
+    bank_service.deposit_money(account_ids[0], 700, "nạp")
+    bank_service.withdraw_money(account_ids[1], 200, "rút")
+    bank_service.transfer_money(account_ids[0], account_ids[2], 300, "chuyển")
+    bank_service.apply_batch([
+        {"op": "deposit", "account_id": account_ids[1], "amount": 50, "note": "lô"},
+        {"op": "transfer", "account_id": account_ids[2], "to_account_id": account_ids[0], "amount": 25, "note": "lô"},
+    ])
+    bank_service.pay_payroll(account_ids[2], [(account_ids[0], 100), (account_ids[1], 150)], "Lương")
+    _ok, _message, first_deposit_id = bank_service.create_saving_deposit(account_ids[0], 1200, 6.0, 12, "")
+    bank_service.create_saving_deposit(account_ids[1], 800, 5.0, 6, "")
+    bank_service.settle_saving_deposit(account_ids[0], first_deposit_id)
+
+    balances = [bank_service.get_account(account_id).balance for account_id in account_ids]
+    assert bank_service.get_total_balance() == sum(balances) == 15000 + 700 - 200 + 50 - 800
+    assert bank_service.get_bank_savings_summary() == {
+        "active_count": 1, "total_principal": 800, "total_interest": 20, "total_maturity": 820,
+    }
+    assert bank_service.get_savings_summary(account_ids[0])["active_count"] == 0
+    assert bank_service.get_transaction_type_counts(account_ids[0]) == {
+        "DEPOSIT": 2, "TRANSFER_OUT": 2, "TRANSFER_IN": 2, "PAYROLL_IN": 1,
+        "SAVINGS_OPEN": 1, "SAVINGS_CLOSE": 1,
+    }
+    ok, message, drifted = bank_service.verify_aggregates()
+    assert ok and drifted == [], message
+
+    # Sửa số dư bên ngoài nghiệp vụ: chế độ kiểm tra phải phát hiện, repair=True thì tính lại cho khớp.
+    bank_service.get_account(account_ids[1]).balance += 5
+    bank_service.aggregates.transaction_type_counts_by_account[account_ids[0]]["DEPOSIT"] += 1
+    ok, _message, drifted = bank_service.verify_aggregates()
+    assert not ok and drifted == ["total_balance", "transaction_type_counts_by_account"]
+    ok, _message, drifted = bank_service.verify_aggregates(repair=True)
+    assert not ok and len(drifted) == 2
+    assert bank_service.verify_aggregates()[0]
+    assert bank_service.get_total_balance() == sum(balances) + 5
+
+
+# -------------------------
+# Lịch đáo hạn và tất toán hàng loạt
+# -------------------------
+def test_process_matured_deposits_settles_due_deposits_in_maturity_order():
+    bank_service = create_service([
+        create_deposit_dict(1, "100001", "2023-03-01 08:00:00", "2024-03-01 08:00:00"),
+        create_deposit_dict(2, "100002", "2022-01-01 08:00:00", "2023-01-01 08:00:00"),
+        create_deposit_dict(3, "100001", "2023-02-01 08:00:00", "2024-02-01 08:00:00"),
+        create_deposit_dict(4, "100002", "2098-01-01 08:00:00", "2099-01-01 08:00:00"),
+        create_deposit_dict(5, "100001", "2022-06-01 08:00:00", "2023-06-01 08:00:00"),
+        create_deposit_dict(6, "100002", "2022-06-01 08:00:00", "ngày hỏng"),
+    ])
+    # Sổ tất toán tay trước đợt xử lý vẫn nằm trong heap và phải được bỏ qua.
+    ok, message = bank_service.settle_saving_deposit("100001", "STK_000005")
+    assert ok, message
+    bank_service.take_journal_records()
+    assert bank_service.maturity_scheduler.get_next_maturity_key() == bank_service.get_time_key("2023-01-01 08:00:00")
+
+    ok, message, processed_ids = bank_service.process_matured_deposits()
+    assert ok, message
+    assert processed_ids == ["STK_000002", "STK_000003", "STK_000001"]
+    assert len(bank_service.take_journal_records()) == 1
+    assert bank_service.get_account("100001").balance == 5050 + 3030 + 1010
+    assert bank_service.get_account("100002").balance == 2020
+    assert [item.deposit_id for item in bank_service.get_saving_deposits("100002", only_active=True)] == ["STK_000004", "STK_000006"]
+    assert len(bank_service.maturity_scheduler) == 1
+
+    assert bank_service.process_matured_deposits() == (True, "Không có sổ tiết kiệm đến hạn.", [])
+    assert bank_service.take_journal_records() == []
+
+
+def test_rollover_reopens_until_the_new_deposit_is_not_yet_due():
+    bank_service = create_service([create_deposit_dict(1, "100001", "2019-05-10 09:00:00", "2020-05-10 09:00:00")])
+    ok, message, processed_ids = bank_service.process_matured_deposits(rollover=True)
+    assert ok, message
+
+    active_deposits = bank_service.get_saving_deposits("100001", only_active=True)
+    assert len(active_deposits) == 1 and not bank_service.is_saving_matured(active_deposits[0])
+    assert processed_ids[0] == "STK_000001" and len(processed_ids) == len(bank_service.saving_deposits) - 1
+    # Mỗi sổ mới mở đúng ngày đáo hạn của sổ trước, với gốc là tiền nhận được của sổ trước.
+    deposits = sorted(bank_service.saving_deposits, key=lambda item: item.deposit_id)
+    for previous, current in zip(deposits, deposits[1:]):
+        assert current.opened_at == previous.maturity_at
+        assert current.principal_amount == previous.maturity_amount
+    assert bank_service.get_account("100001").balance == 0
+    ok, message, _drifted = bank_service.verify_aggregates()
+    assert ok, message
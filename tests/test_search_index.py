@@ -0,0 +1,62 @@
+from src.core.bank_service import BankService
+from src.storage.json_storage import create_default_bank_data
+
+
+def create_service():
+    bank_service = BankService(create_default_bank_data())
+    account_ids = [bank_service.create_account(f"Khách {index}", "1234", 1000)[2] for index in range(3)]
+    return bank_service, account_ids
+
+
+def search(bank_service: BankService, account_id: str, keyword: str):
+    ok, message, rows = bank_service.search_account_transactions(account_id, keyword)
+    assert ok, message
+    return rows
+
+
+# -------------------------
+# Từ tìm kiếm theo loại giao dịch
+# -------------------------
+def test_transfer_search_term_matches_both_directions():
+    bank_service, account_ids = create_service()
+    bank_service.transfer_money(account_ids[0], account_ids[1], 100, "tiền nhà")
+    bank_service.transfer_money(account_ids[1], account_ids[0], 40, "trả lại")
+
+    # Mỗi lần chuyển ghi hai giao dịch (đi / nhận) và cả hai đều thuộc lịch sử hai tài khoản.
+    rows = search(bank_service, account_ids[0], "chuyển khoản")
+    assert sorted(t.transaction_type for t in rows) == ["TRANSFER_IN", "TRANSFER_IN", "TRANSFER_OUT", "TRANSFER_OUT"]
+    assert {t.transaction_type for t in search(bank_service, account_ids[0], "chuyen di")} == {"TRANSFER_OUT"}
+    assert {t.transaction_type for t in search(bank_service, account_ids[0], "nhận tiền")} == {"TRANSFER_IN"}
+
+
+# -------------------------
+# Chỉ mục đảo: tiền tố, không dấu, cập nhật dần
+# -------------------------
+def test_search_matches_prefixes_without_accents_and_requires_every_word():
+    bank_service, account_ids = create_service()
+    bank_service.deposit_money(account_ids[0], 250, "Tiền điện tháng 5")
+    bank_service.deposit_money(account_ids[0], 300, "tiền nước tháng 5")
+    bank_service.withdraw_money(account_ids[0], 40, "Điện thoại")
+
+    assert [t.note for t in search(bank_service, account_ids[0], "dien thang")] == ["Tiền điện tháng 5"]
+    assert sorted(t.note for t in search(bank_service, account_ids[0], "ĐIỆN")) == ["Tiền điện tháng 5", "Điện thoại"]
+    assert [t.amount for t in search(bank_service, account_ids[0], "rút")] == [40]
+    assert [t.note for t in search(bank_service, account_ids[0], "nu")] == ["tiền nước tháng 5"]
+    assert search(bank_service, account_ids[0], "điện nước") == []
+
+
+def test_search_index_picks_up_transactions_added_after_it_was_built():
+    bank_service, account_ids = create_service()
+    bank_service.deposit_money(account_ids[0], 100, "học phí")
+    assert len(search(bank_service, account_ids[0], "hoc phi")) == 1
+    search_index = bank_service.get_account_search_index(account_ids[0])
+
+    bank_service.deposit_money(account_ids[0], 200, "Học phí kỳ 2")
+    bank_service.apply_batch([{"op": "deposit", "account_id": account_ids[0], "amount": 300, "note": "học phí kỳ 3"}])
+    bank_service.transfer_money(account_ids[1], account_ids[0], 400, "hoc phi ky 4")
+
+    assert bank_service.get_account_search_index(account_ids[0]) is search_index
+    assert len(search_index) == len(bank_service.get_account_transactions(account_ids[0]))
+    assert sorted(t.amount for t in search(bank_service, account_ids[0], "hoc phi ky")) == [200, 300, 400, 400]
+    # Tài khoản kia chỉ thấy giao dịch chuyển khoản liên quan tới mình.
+    assert sorted(t.transaction_type for t in search(bank_service, account_ids[1], "hoc phi")) == ["TRANSFER_IN", "TRANSFER_OUT"]
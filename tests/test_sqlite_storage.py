@@ -0,0 +1,74 @@
+import sqlite3
+
+from conftest import get_histories
+
+from src.core.bank_service import BankService
+from src.storage.checkpoint import CheckpointManager
+from src.storage.sqlite_storage import SqliteStorage, import_json_file
+from src.storage.storage_backend import create_storage
+
+
+def fill_service(bank_service: BankService):
+    account_ids = [bank_service.create_account(f"Khách {index}", "1234", 1000)[2] for index in range(3)]
+    bank_service.transfer_money(account_ids[0], account_ids[1], 150, "tiền nhà")
+    bank_service.withdraw_money(account_ids[2], 80, "rút")
+    ok, message, deposit_id = bank_service.create_saving_deposit(account_ids[1], 500, 6.0, 12, "sổ 12 tháng")
+    assert ok, message
+    return account_ids, deposit_id
+
+
+def get_snapshot(bank_service: BankService):
+    return (
+        [account.to_dictionary() for account in bank_service.accounts_by_id.values()],
+        [saving_deposit.to_dictionary() for saving_deposit in bank_service.saving_deposits],
+    )
+
+
+# -------------------------
+# Lưu / đọc lại bằng SQLite
+# -------------------------
+def test_sqlite_round_trip_upserts_changed_rows(tmp_path):
+    file_path = str(tmp_path / "bank_data.db")
+    storage = create_storage(file_path)
+    assert isinstance(storage, SqliteStorage)
+    bank_service = BankService(storage.load())
+    account_ids, deposit_id = fill_service(bank_service)
+    storage.persist(bank_service)
+
+    # Tất toán sổ và chuyển tiền tiếp: tài khoản / sổ được cập nhật tại chỗ, không sinh dòng trùng.
+    ok, message = bank_service.settle_saving_deposit(account_ids[1], deposit_id)
+    assert ok, message
+    bank_service.transfer_money(account_ids[1], account_ids[2], 70, "trả lại")
+    storage.close(bank_service)
+
+    connection = sqlite3.connect(file_path)
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM accounts").fetchone()[0] == 3
+        assert connection.execute("SELECT COUNT(*) FROM saving_deposits").fetchone()[0] == 1
+        assert connection.execute("SELECT status FROM saving_deposits").fetchone()[0] == "CLOSED"
+        index_names = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_transactions_from_account", "idx_transactions_to_account", "idx_saving_deposits_account"} <= index_names
+    finally:
+        connection.close()
+
+    for lazy_transactions in (False, True):
+        reloaded = BankService(SqliteStorage(file_path).load(lazy_transactions=lazy_transactions))
+        assert get_snapshot(reloaded) == get_snapshot(bank_service)
+        assert get_histories(reloaded, account_ids) == get_histories(bank_service, account_ids)
+        assert reloaded.get_transaction_count() == bank_service.get_transaction_count()
+        # Bộ đếm mã được đọc lại: mã mới không trùng mã đã có.
+        assert reloaded.create_new_transaction_id() not in {t.transaction_id for t in bank_service.get_all_transactions()}
+
+
+def test_import_json_file_keeps_all_data(tmp_path):
+    json_file_path = str(tmp_path / "bank_data.json")
+    storage = CheckpointManager(json_file_path)
+    bank_service = BankService(storage.load())
+    account_ids, _deposit_id = fill_service(bank_service)
+    storage.close(bank_service)
+
+    sqlite_file_path = str(tmp_path / "bank_data.db")
+    import_json_file(json_file_path, sqlite_file_path)
+    reloaded = BankService(SqliteStorage(sqlite_file_path).load())
+    assert get_snapshot(reloaded) == get_snapshot(bank_service)
+    assert get_histories(reloaded, account_ids) == get_histories(bank_service, account_ids)
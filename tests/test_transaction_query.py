@@ -0,0 +1,137 @@
+import random
+
+from src.core import bank_service as bank_service_module
+from src.core.bank_service import BankService
+from src.core.models import get_transaction_time_key, time_text_to_timestamp
+from src.core.transaction_query import TransactionQuery, get_counterparty_id
+from src.storage.json_storage import create_default_bank_data
+
+ACCOUNT_IDS = ["100001", "100002", "100003", "100004"]
+NOTES = ["tiền nhà", "Tiền điện", "học phí", "ăn trưa", "quà sinh nhật"]
+
+
+def create_service(transaction_count: int = 600, seed: int = 3) -> BankService:
+    """Lịch sử dựng sẵn với thời gian rải trong năm 2024 (nhiều giao dịch trùng giây) cho tài khoản 100001."""
+    generator = random.Random(seed)
+    bank_data = create_default_bank_data()
+    bank_data["accounts"] = [
+        {"account_id": account_id, "owner_name": "Khách", "pin_code": "1234", "balance": 10 ** 9, "created_at": "2024-01-01 00:00:00"}
+        for account_id in ACCOUNT_IDS
+    ]
+    transactions = []
+    for number in range(1, transaction_count + 1):
+        time_text = f"2024-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d} {generator.randint(8, 9):02d}:00:{generator.randint(0, 3):02d}"
+        transaction_type = generator.choice(["DEPOSIT", "WITHDRAW", "TRANSFER_OUT", "TRANSFER_IN"])
+        from_account_id = to_account_id = None
+        if transaction_type == "DEPOSIT":
+            to_account_id = "100001"
+        elif transaction_type == "WITHDRAW":
+            from_account_id = "100001"
+        elif transaction_type == "TRANSFER_OUT":
+            from_account_id, to_account_id = "100001", generator.choice(ACCOUNT_IDS[1:])
+        else:
+            from_account_id, to_account_id = generator.choice(ACCOUNT_IDS[1:]), "100001"
+        transactions.append({
+            "transaction_id": f"TRANSACTION_{number:08d}",
+            "transaction_type": transaction_type,
+            "amount": generator.choice([10, 50, 100, 500, 1000, 2500]),
+            "time_text": time_text,
+            "note": generator.choice(NOTES),
+            "from_account_id": from_account_id,
+            "to_account_id": to_account_id,
+        })
+    bank_data["transactions"] = transactions
+    bank_data["next_transaction_number"] = transaction_count + 1
+    bank_data["next_account_id"] = 100005
+    return BankService(bank_data)
+
+
+def run_query(bank_service: BankService, **fields):
+    ok, message, rows = bank_service.query_transactions(TransactionQuery(account_id="100001", **fields))
+    assert ok, message
+    return [t.transaction_id for t in rows]
+
+
+def filter_directly(bank_service: BankService, query: TransactionQuery):
+    """Cách làm thẳng: duyệt cả lịch sử và kiểm tra từng điều kiện."""
+    start_key = bank_service.parse_time_bound(query.start_time, is_end=False) if query.start_time else None
+    end_key = bank_service.parse_time_bound(query.end_time, is_end=True) if query.end_time else None
+    keyword_ids = None
+    if query.keyword:
+        keyword_ids = {t.transaction_id for t in bank_service.get_account_search_index(query.account_id).search(query.keyword)}
+    result = []
+    for transaction in bank_service.get_transaction_history(query.account_id):
+        if query.transaction_types and transaction.transaction_type not in query.transaction_types:
+            continue
+        if query.min_amount is not None and transaction.amount < query.min_amount:
+            continue
+        if query.max_amount is not None and transaction.amount > query.max_amount:
+            continue
+        if query.counterparty_id and get_counterparty_id(transaction, query.account_id) != query.counterparty_id:
+            continue
+        time_key = get_transaction_time_key(transaction)
+        if (start_key is not None and time_key < start_key) or (end_key is not None and time_key > end_key):
+            continue
+        if keyword_ids is not None and transaction.transaction_id not in keyword_ids:
+            continue
+        result.append(transaction.transaction_id)
+    return result
+
+
+# -------------------------
+# Kết quả giống cách duyệt thẳng, với mọi tổ hợp điều kiện
+# -------------------------
+def test_query_results_match_direct_filter():
+    bank_service = create_service()
+    generator = random.Random(11)
+    for _ in range(300):
+        fields = {}
+        if generator.random() < 0.4:
+            fields["transaction_types"] = tuple(generator.sample(["DEPOSIT", "WITHDRAW", "TRANSFER_OUT", "TRANSFER_IN"], generator.randint(1, 2)))
+        if generator.random() < 0.4:
+            fields["min_amount"] = generator.choice([10, 100, 600])
+        if generator.random() < 0.4:
+            fields["max_amount"] = generator.choice([100, 1000, 5000])
+        if generator.random() < 0.3:
+            fields["counterparty_id"] = generator.choice(ACCOUNT_IDS[1:] + ["999999"])
+        if generator.random() < 0.5:
+            month = generator.randint(1, 12)
+            fields["start_time"] = f"2024-{month:02d}-{generator.randint(1, 28):02d}"
+            fields["end_time"] = f"2024-{min(month + generator.randint(0, 2), 12):02d}-28 09:00:01"
+        if generator.random() < 0.3:
+            fields["keyword"] = generator.choice(["tien", "hoc phi", "chuyển", "quà"])
+        if fields.get("min_amount", 0) > fields.get("max_amount", 10 ** 9):
+            continue
+        query = TransactionQuery(account_id="100001", **fields)
+        assert run_query(bank_service, **fields) == filter_directly(bank_service, query), fields
+
+
+def test_query_reads_only_the_narrowest_index(monkeypatch):
+    bank_service = create_service()
+    # Thêm giao dịch với một tài khoản đối ứng hiếm sau khi các chỉ mục đã dựng: phải được cập nhật dần.
+    run_query(bank_service, counterparty_id="100002")
+    rare_account_id = bank_service.create_account("Khách hiếm", "1234", 0)[2]
+    bank_service.transfer_money("100001", rare_account_id, 70, "hiếm")
+    bank_service.transfer_money("100001", rare_account_id, 30, "hiếm")
+
+    checked = []
+    original = bank_service_module.matches_transaction_query
+
+    def count_checks(query, transaction, start_key, end_key):
+        checked.append(transaction.transaction_id)
+        return original(query, transaction, start_key, end_key)
+
+    monkeypatch.setattr(bank_service_module, "matches_transaction_query", count_checks)
+    rows = run_query(bank_service, counterparty_id=rare_account_id, transaction_types=("TRANSFER_OUT",), min_amount=10)
+    assert len(rows) == 2 and len(checked) == 4
+    checked.clear()
+    rows = run_query(bank_service, min_amount=2500, max_amount=2500, start_time="2024-01-01")
+    assert len(checked) == len(rows) > 0
+
+
+def test_query_rejects_bad_ranges():
+    bank_service = create_service(transaction_count=10)
+    for fields in ({"min_amount": 100, "max_amount": 10}, {"start_time": "2024-13-01"}, {"start_time": "2024-05-02", "end_time": "2024-05-01"}):
+        ok, _message, rows = bank_service.query_transactions(TransactionQuery(account_id="100001", **fields))
+        assert not ok and rows == []
+    assert time_text_to_timestamp("2024-13-01 00:00:00") is None